@@ -120,34 +120,17 @@ class PTICSHDCSLU(SLUInterface):
         abs_utts = copy.deepcopy(utterance)
         category_labels = set()
 
-        start = 0
-        while start < len(utterance):
-            end = len(utterance)
-            while end > start:
-                f = tuple(utterance[start:end])
-                #print start, end
-                #print f
-
-                if f in self.cldb.form2value2cl:
-                    for v in self.cldb.form2value2cl[f]:
-                        for c in self.cldb.form2value2cl[f][v]:
-                            abs_utts = abs_utts.replace(f, (c.upper() + '='+v,))
-
-                            category_labels.add(c.upper())
-                            break
-                        else:
-                            continue
+        for start, end, f in self.cldb.iter_longest_forms(utterance):
+            for v in self.cldb.form2value2cl[f]:
+                for c in self.cldb.form2value2cl[f][v]:
+                    abs_utts = abs_utts.replace(f, (c.upper() + '='+v,))
 
-                        break
-
-                    #print f
-
-                    # skip all substring for this form
-                    start = end
+                    category_labels.add(c.upper())
                     break
-                end -= 1
-            else:
-                start += 1
+                else:
+                    continue
+
+                break
 
         return abs_utts, category_labels
 
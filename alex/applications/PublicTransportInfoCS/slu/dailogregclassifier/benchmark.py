@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import glob
+import os
+import time
+import xml.dom.minidom
+
+from alex.applications.PublicTransportInfoCS.preprocessing import PTICSSLUPreprocessing
+from alex.components.asr.utterance import Utterance, UtteranceNBList, UtteranceConfusionNetwork
+from alex.components.slu.base import CategoryLabelDatabase
+from alex.components.slu.dailrclassifier import DAILogRegClassifier
+from alex.corpustools.wavaskey import load_wavaskey
+
+
+def benchmark_parse_X(fn_model, fn_input, constructor, limit=100000, repeat=3, tolerance=1e-6):
+    """
+    Compares the latency of the per-classifier loop in DAILogRegClassifier with the compiled inference mode which
+    evaluates all classifiers by a single matrix product. It also checks that both modes produce the same dialogue act
+    confusion networks.
+
+    :param fn_model: the trained model
+    :param fn_input: the utterances or n-best lists to be parsed
+    :param constructor: Utterance or UtteranceNBList
+    :param limit: the maximum number of parsed inputs
+    :param repeat: how many times the whole input is parsed in each mode
+    :param tolerance: the maximum allowed difference of the probabilities
+    :return: none
+    """
+    print "="*120
+    print "Benchmarking DAILogRegClassifier: ", fn_model, fn_input
+    print "-"*120
+
+    cldb = CategoryLabelDatabase('../../data/database.py')
+    preprocessing = PTICSSLUPreprocessing(cldb)
+    slu = DAILogRegClassifier(cldb, preprocessing)
+    slu.load_model(fn_model)
+
+    test_utterances = load_wavaskey(fn_input, constructor, limit=limit)
+    obss = [utt for utt_key, utt in sorted(test_utterances.iteritems())]
+
+    # check the results and warm up the caches
+    mismatches = 0
+    for obs in obss:
+        slu.compiled = False
+        da_confnet_loop = slu.parse_X(obs)
+        slu.compiled = True
+        da_confnet_compiled = slu.parse_X(obs)
+
+        if [dai for p, dai in da_confnet_loop] != [dai for p, dai in da_confnet_compiled] or \
+                any(abs(p1 - p2) > tolerance for (p1, dai1), (p2, dai2) in zip(da_confnet_loop, da_confnet_compiled)):
+            mismatches += 1
+            print '*' * 120
+            print unicode(obs)
+            print unicode(da_confnet_loop)
+            print unicode(da_confnet_compiled)
+
+    times = {}
+    for compiled in [False, True]:
+        slu.compiled = compiled
+        start = time.time()
+        for i in range(repeat):
+            for obs in obss:
+                slu.parse_X(obs)
+        times[compiled] = (time.time() - start) / (repeat * max(len(obss), 1))
+
+    print "Number of classifiers:      ", len(slu.trained_classifiers)
+    print "Number of shared features:  ", len(slu.compiled_features_mapping)
+    print "Number of parsed inputs:    ", len(obss)
+    print "Number of mismatches:       ", mismatches
+    print "Loop     latency per input:  %8.3f ms" % (times[False] * 1000.0)
+    print "Compiled latency per input:  %8.3f ms" % (times[True] * 1000.0)
+    print "Speed-up:                    %8.2f" % (times[False] / times[True] if times[True] else 0.0)
+
+
+def load_call_log_confnets(call_logs_dir, limit=100000):
+    """
+    Loads the ASR confusion networks stored in the session.xml files of the recorded call logs.
+
+    :param call_logs_dir: the directory with the call logs, it is searched recursively
+    :param limit: the maximum number of loaded confusion networks
+    :return: a list of UtteranceConfusionNetwork instances
+    """
+    files = []
+    for depth in range(6):
+        files.extend(glob.glob(os.path.join(call_logs_dir, *(['*', ] * depth + ['session.xml', ]))))
+
+    confnets = []
+    for fn in sorted(files):
+        doc = xml.dom.minidom.parse(fn)
+        for cn_el in doc.getElementsByTagName("confnet"):
+            confnet = UtteranceConfusionNetwork()
+            for was in cn_el.getElementsByTagName("word_alternatives"):
+                hyps = []
+                for wa in was.getElementsByTagName("word"):
+                    word = wa.firstChild.nodeValue.strip() if wa.firstChild else ''
+                    hyps.append([float(wa.getAttribute("p")), word])
+                confnet.add(hyps)
+
+            confnets.append(confnet)
+            if len(confnets) >= limit:
+                return confnets
+
+    return confnets
+
+
+def clear_caches(slu):
+    """
+    Clears the caches of the parser so that the confusion networks are parsed as new turns.
+
+    :param slu: a DAILogRegClassifier instance
+    :return: none
+    """
+    slu.get_fvc.clear()
+    slu.get_confnet_nblist.clear()
+    slu.get_confnet_lattice_features.clear()
+
+
+def benchmark_parse_confnet(fn_nbl_model, fn_cn_model, call_logs_dir, limit=100000, repeat=3, tolerance=0.05):
+    """
+    Compares the per-turn latency of parsing the confusion networks through the n-best list expansion with the native
+    confusion network parsing based on the expected n-gram counts. Each mode uses the model trained for it. The caches
+    are cleared before every parsed confusion network, therefore, the latency is that of a new turn.
+
+    The models differ, therefore, the probabilities of the dialogue act items are only required to be within
+    the tolerance.
+
+    :param fn_nbl_model: the model trained on the n-best lists
+    :param fn_cn_model: the model trained on the confusion networks, see train.py
+    :param call_logs_dir: the directory with the recorded call logs
+    :param limit: the maximum number of parsed confusion networks
+    :param repeat: how many times the whole input is parsed in each mode
+    :param tolerance: the maximum allowed difference of the probabilities
+    :return: none
+    """
+    print "="*120
+    print "Benchmarking DAILogRegClassifier on confusion networks: ", fn_nbl_model, fn_cn_model, call_logs_dir
+    print "-"*120
+
+    cldb = CategoryLabelDatabase('../../data/database.py')
+    preprocessing = PTICSSLUPreprocessing(cldb)
+    slus = {}
+    for native, fn_model in [(False, fn_nbl_model), (True, fn_cn_model)]:
+        slus[native] = DAILogRegClassifier(cldb, preprocessing)
+        slus[native].load_model(fn_model)
+
+    obss = load_call_log_confnets(call_logs_dir, limit=limit)
+
+    mismatches = 0
+    max_diff = 0.0
+    for obs in obss:
+        da_confnet_nblist = dict((unicode(dai), p) for p, dai in slus[False].parse_X(obs))
+        da_confnet_native = dict((unicode(dai), p) for p, dai in slus[True].parse_X(obs))
+
+        diff = max([abs(da_confnet_nblist.get(dai, 0.0) - da_confnet_native.get(dai, 0.0))
+                    for dai in set(da_confnet_nblist) | set(da_confnet_native)] + [0.0, ])
+        max_diff = max(max_diff, diff)
+        if diff > tolerance:
+            mismatches += 1
+
+    times = {}
+    for native in [False, True]:
+        slu = slus[native]
+        times[native] = 0.0
+        for i in range(repeat):
+            for obs in obss:
+                clear_caches(slu)
+                start = time.time()
+                slu.parse_X(obs)
+                times[native] += time.time() - start
+        times[native] /= repeat * max(len(obss), 1)
+
+    print "Number of parsed confnets:  ", len(obss)
+    print "Number of mismatches:       ", mismatches, "(tolerance %.3f)" % tolerance
+    print "Maximum difference:          %8.3f" % max_diff
+    print "N-best   latency per turn:   %8.3f ms" % (times[False] * 1000.0)
+    print "Native   latency per turn:   %8.3f ms" % (times[True] * 1000.0)
+    print "Speed-up:                    %8.2f" % (times[False] / times[True] if times[True] else 0.0)
+
+
+if __name__ == "__main__":
+    import autopath
+
+    benchmark_parse_X('./dailogreg.trn.model.all', '../dev.trn', Utterance, limit=1000)
+    benchmark_parse_X('./dailogreg.asr.model.all', '../dev.asr', Utterance, limit=1000)
+    benchmark_parse_X('./dailogreg.nbl.model.all', '../dev.nbl', UtteranceNBList, limit=1000)
+    benchmark_parse_confnet('./dailogreg.nbl.model', './dailogreg.cn.model', '../indomain_data', limit=1000)
@@ -17,7 +17,7 @@ from alex.utils.config import as_project_path
 from alex.corpustools.text_norm_cs import normalise_text, exclude_slu
 from alex.corpustools.wavaskey import save_wavaskey
 from alex.components.asr.common import asr_factory
-from alex.components.asr.utterance import Utterance, UtteranceNBList
+from alex.components.asr.utterance import Utterance, UtteranceNBList, UtteranceConfusionNetwork
 from alex.components.slu.base import CategoryLabelDatabase
 from alex.applications.PublicTransportInfoCS.preprocessing import PTICSSLUPreprocessing
 from alex.applications.PublicTransportInfoCS.hdc_slu import PTICSHDCSLU
@@ -51,10 +51,22 @@ def normalise_semi_words(txt):
 
     return txt
 
+def get_confnet_from_xml_node(cn_el):
+    confnet = UtteranceConfusionNetwork()
+    for was in cn_el.getElementsByTagName("word_alternatives"):
+        hyps = []
+        for wa in was.getElementsByTagName("word"):
+            word = wa.firstChild.nodeValue.strip() if wa.firstChild else ''
+            hyps.append([float(wa.getAttribute("p")), word])
+        confnet.add(hyps)
+
+    return confnet
+
 def process_call_log(fn):
     name = multiprocessing.current_process().name
     asr = []
     nbl = []
+    cn = []
     sem = []
     trn = []
     trn_hdc_sem = []
@@ -92,17 +104,20 @@ def process_call_log(fn):
                 continue
             print "Recovered from missing ASR output by using a delayed ASR output from the following turn of turn {turn}. File: {fn} - next_asrs: {asrs}".format(
                 turn=i, fn=fn, asrs=len(next_asrs))
-            hyps = next_asrs[0].getElementsByTagName("hypothesis")
+            asr_el = next_asrs[0]
         elif len(asrs) == 1:
-            hyps = asrs[0].getElementsByTagName("hypothesis")
+            asr_el = asrs[0]
         elif len(asrs) == 2:
             print "Recovered from EXTRA ASR outputs by using a the last ASR output from the turn. File: {fn} - asrs: {asrs}".format(
                 fn=fn, asrs=len(asrs))
-            hyps = asrs[-1].getElementsByTagName("hypothesis")
+            asr_el = asrs[-1]
         else:
             print "Skipping a turn {turn} in file {fn} - asrs: {asrs}".format(turn=i, fn=fn, asrs=len(asrs))
             continue
 
+        hyps = asr_el.getElementsByTagName("hypothesis")
+        cn_els = asr_el.getElementsByTagName("confnet")
+
         if len(trans) == 0:
             print "Skipping a turn in {fn} - trans: {trans}".format(fn=fn, trans=len(trans))
             continue
@@ -163,10 +178,14 @@ def process_call_log(fn):
 
         nbl.append((wav_key, n.serialise()))
 
+        # the confusion networks are only available in the call logs
+        if '--asr-log' in sys.argv and cn_els:
+            cn.append((wav_key, get_confnet_from_xml_node(cn_els[0])))
+
         # there is no manual semantics in the transcriptions yet
         sem.append((wav_key, None))
 
-    return asr, nbl, sem, trn, trn_hdc_sem, fcount, tcount
+    return asr, nbl, cn, sem, trn, trn_hdc_sem, fcount, tcount
 
 def main():
     import autopath
@@ -198,24 +217,28 @@ def main():
     fn_all_trn_hdc_sem = 'all.trn.hdc.sem'
     fn_all_asr = 'all.asr'
     fn_all_nbl = 'all.nbl'
+    fn_all_cn = 'all.cn'
 
     fn_train_sem = 'train.sem'
     fn_train_trn = 'train.trn'
     fn_train_trn_hdc_sem = 'train.trn.hdc.sem'
     fn_train_asr = 'train.asr'
     fn_train_nbl = 'train.nbl'
+    fn_train_cn = 'train.cn'
 
     fn_dev_sem = 'dev.sem'
     fn_dev_trn = 'dev.trn'
     fn_dev_trn_hdc_sem = 'dev.trn.hdc.sem'
     fn_dev_asr = 'dev.asr'
     fn_dev_nbl = 'dev.nbl'
+    fn_dev_cn = 'dev.cn'
 
     fn_test_sem = 'test.sem'
     fn_test_trn = 'test.trn'
     fn_test_trn_hdc_sem = 'test.trn.hdc.sem'
     fn_test_asr = 'test.asr'
     fn_test_nbl = 'test.nbl'
+    fn_test_cn = 'test.cn'
 
     indomain_data_dir = "indomain_data"
 
@@ -235,6 +258,7 @@ def main():
     files = files[:100000]
     asr = []
     nbl = []
+    cn = []
     sem = []
     trn = []
     trn_hdc_sem = []
@@ -255,9 +279,10 @@ def main():
 
         asr.extend(pcl[0])
         nbl.extend(pcl[1])
-        sem.extend(pcl[2])
-        trn.extend(pcl[3])
-        trn_hdc_sem.extend(pcl[4])
+        cn.extend(pcl[2])
+        sem.extend(pcl[3])
+        trn.extend(pcl[4])
+        trn_hdc_sem.extend(pcl[5])
 
     uniq_trn = {}
     uniq_trn_hdc_sem = {}
@@ -281,6 +306,7 @@ def main():
     save_wavaskey(fn_all_trn_hdc_sem, dict(trn_hdc_sem), trans = lambda da: '&'.join(sorted(unicode(da).split('&'))))
     save_wavaskey(fn_all_asr, dict(asr))
     save_wavaskey(fn_all_nbl, dict(nbl))
+    save_wavaskey(fn_all_cn, dict(cn), trans = repr)
 
     seed_value = 10
 
@@ -329,6 +355,15 @@ def main():
     save_wavaskey(fn_dev_nbl, dict(dev_nbl))
     save_wavaskey(fn_test_nbl, dict(test_nbl))
 
+    # confusion networks, only some turns have them, hence they are split by the keys of the n-best lists
+    train_nbl_keys = set(k for k, n in train_nbl)
+    dev_nbl_keys = set(k for k, n in dev_nbl)
+    test_nbl_keys = set(k for k, n in test_nbl)
+
+    save_wavaskey(fn_train_cn, dict((k, c) for k, c in cn if k in train_nbl_keys), trans = repr)
+    save_wavaskey(fn_dev_cn, dict((k, c) for k, c in cn if k in dev_nbl_keys), trans = repr)
+    save_wavaskey(fn_test_cn, dict((k, c) for k, c in cn if k in test_nbl_keys), trans = repr)
+
 
 if __name__ == '__main__':
     main()
@@ -17,6 +17,7 @@ from alex.components.hub.nlg import NLG
 from alex.components.hub.tts import TTS
 from alex.components.hub.messages import Command
 from alex.utils.config import Config
+from alex.utils.mproc import wait_for_connections, get_main_loop_wait_time
 
 class AudioHub(Hub):
     def __init__(self, cfg):
@@ -71,6 +72,10 @@ class AudioHub(Hub):
                                    slu_commands, dm_commands, nlg_commands,
                                    tts_commands]
 
+            # the command connections read by the main loop, the AudioIO commands are not read
+            polled_connections = [vad_commands, asr_commands, slu_commands,
+                                  dm_commands, nlg_commands, tts_commands]
+
             non_command_connections = [aio_record, aio_child_record,
                                        aio_play, aio_child_play,
                                        vad_audio_out, vad_child_audio_out,
@@ -134,7 +139,12 @@ class AudioHub(Hub):
                     print 'Received close event in: %s' % multiprocessing.current_process().name
                     return
 
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                # wait for any command or a timer
+                wait_time = get_main_loop_wait_time(self.cfg)
+                if wait_time is None:
+                    time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                else:
+                    wait_for_connections(polled_connections, wait_time)
 
                 if call_back_time != -1 and call_back_time < time.time():
                     aio_commands.send(Command('make_call(destination="%s")' % \
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This code is mostly PEP8-compliant. See
+# http://www.python.org/dev/peps/pep-0008/.
+
+import argparse
+import multiprocessing
+import time
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.components.hub.messages import Command, Frame
+from alex.components.hub.shmaudio import SharedMemoryAudioPipe
+from alex.utils.mproc import wait_for_connections
+
+
+def produce(conn, n_frames, frame_size, segment_frames, period):
+    """Sends the frames as VAD does, the speech segments are delimited by the speech_start() and speech_end()
+    commands. If the period is not zero, the frames are paced as by the real-time audio source."""
+    payload = b'\0' * frame_size
+    start = time.time()
+    for i in range(n_frames):
+        if i % segment_frames == 0:
+            conn.send(Command('speech_start(fname="benchmark.wav")', 'VAD', 'AudioIn'))
+
+        conn.send(Frame(payload))
+
+        if i % segment_frames == segment_frames - 1 or i == n_frames - 1:
+            conn.send(Command('speech_end(fname="benchmark.wav")', 'VAD', 'AudioIn'))
+
+        if period:
+            delay = start + (i + 1) * period - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+
+def consume(conn, n_frames):
+    """Reads the frames as the hub components do and returns the number of received frames."""
+    frames = 0
+    while frames < n_frames:
+        wait_for_connections([conn, ], 1.0)
+        while conn.poll():
+            if isinstance(conn.recv(), Frame):
+                frames += 1
+
+    return frames
+
+
+def benchmark(pipe, n_frames, frame_size, segment_frames, period):
+    """
+    Streams the frames from a producer process into this process.
+
+    :return: the wall time per frame and the CPU time of the consumer and the producer per frame
+    """
+    reader, writer = pipe
+
+    producer = multiprocessing.Process(target=produce, args=(writer, n_frames, frame_size, segment_frames, period))
+
+    start = time.time()
+    cpu_start = time.clock()
+    producer.start()
+    consume(reader, n_frames)
+    producer.join()
+
+    wall = (time.time() - start) / n_frames
+    cpu = (time.clock() - cpu_start) / n_frames
+
+    return wall, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Compares the per-frame overhead of passing the audio frames between the hub components through pickled
+        multiprocessing pipes and through the shared memory ring buffer.
+
+        The throughput test sends the frames as fast as possible, the real-time test paces them as VoipIO does
+        and measures the CPU time spent by the consumer.
+      """)
+
+    parser.add_argument('-n', '--frames', type=int, default=100000,
+                        help='the number of frames in the throughput test')
+    parser.add_argument('-f', '--frame-size', type=int, default=512,
+                        help='the size of a frame in bytes')
+    parser.add_argument('-s', '--segment-frames', type=int, default=200,
+                        help='the number of frames in a speech segment')
+    parser.add_argument('-r', '--realtime-seconds', type=float, default=10.0,
+                        help='the length of the real-time test in seconds')
+    parser.add_argument('-p', '--period', type=float, default=0.016,
+                        help='the period of the frames in the real-time test in seconds')
+    args = parser.parse_args()
+
+    pipes = [
+        ('Pickled pipe', lambda: multiprocessing.Pipe()),
+        ('Shared memory', lambda: SharedMemoryAudioPipe(n_frames=args.frames + 1000, frame_size=args.frame_size)),
+    ]
+
+    print "=" * 120
+    print "Audio transport benchmark: frame size %d B" % args.frame_size
+    print "-" * 120
+    for name, pipe in pipes:
+        wall, cpu = benchmark(pipe(), args.frames, args.frame_size, args.segment_frames, 0.0)
+        print "%-14s throughput: %10.0f frames/s  consumer CPU per frame: %8.2f us" % \
+              (name, 1.0 / wall, 1e6 * cpu)
+
+    n_frames = int(args.realtime_seconds / args.period)
+    for name, pipe in pipes:
+        wall, cpu = benchmark(pipe(), n_frames, args.frame_size, args.segment_frames, args.period)
+        print "%-14s real time:  %10d frames    consumer CPU per frame: %8.2f us" % \
+              (name, n_frames, 1e6 * cpu)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This code is mostly PEP8-compliant. See
+# http://www.python.org/dev/peps/pep-0008/.
+
+from __future__ import unicode_literals
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.components.asr.utterance import Utterance, UtteranceNBList
+from alex.components.hub.slu import SLU
+from alex.components.hub.dm import DM
+from alex.components.hub.nlg import NLG
+from alex.components.hub.messages import Command, ASRHyp, DMDA, TTSText
+from alex.utils.config import Config
+from alex.utils.mproc import wait_for_connections, get_main_loop_wait_time
+
+
+def get_cpu_time(pid):
+    """Returns the user and system CPU time consumed by the process in seconds. It works only on Linux."""
+    with open('/proc/%d/stat' % pid) as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+
+    return (int(fields[11]) + int(fields[12])) / float(os.sysconf(str('SC_CLK_TCK')))
+
+
+class HubLatencyBenchmark(object):
+    """
+    Measures the end-to-end latency of the text part of the hub pipeline, i.e. the components which the TextHub
+    runs in one process: the SLU, DM, and NLG components. Here they run as the hub components in separate processes
+    and this object plays the role of the hub. For each turn, it measures the time from sending an ASR hypothesis to
+    the SLU component until the NLG component outputs the system text. It also measures the CPU time burnt by
+    the idle components.
+    """
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+
+    def wait(self, connections):
+        wait_time = get_main_loop_wait_time(self.cfg)
+        if wait_time is None:
+            time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+        else:
+            wait_for_connections(connections, wait_time)
+
+    def wait_for_text(self, dm_commands, nlg_commands, nlg_text_out, timeout=60.0):
+        """Forwards the DM output to the NLG as the hub does and waits for the generated text."""
+        start = time.time()
+        while time.time() - start < timeout:
+            self.wait([dm_commands, nlg_commands, nlg_text_out])
+
+            while dm_commands.poll():
+                command = dm_commands.recv()
+                if isinstance(command, DMDA):
+                    nlg_commands.send(DMDA(command.da, 'HUB', 'NLG'))
+
+            while nlg_commands.poll():
+                nlg_commands.recv()
+
+            if nlg_text_out.poll():
+                if isinstance(nlg_text_out.recv(), TTSText):
+                    return True
+
+        return False
+
+    def run(self, utterances, event_driven, idle_time=2.0):
+        """
+        Runs the pipeline with either event driven or polling main loops.
+
+        :param utterances: a list of the user utterances, one for each turn
+        :param event_driven: whether the main loops are event driven
+        :param idle_time: how long the CPU time of the idle components is measured
+        :return: a list of turn latencies and the CPU time of the idle components per second
+        """
+        self.cfg['Hub']['event_driven'] = event_driven
+
+        slu_commands, slu_child_commands = multiprocessing.Pipe()
+        asr_hypotheses_in, asr_child_hypotheses = multiprocessing.Pipe()
+        slu_hypotheses_out, slu_child_hypotheses = multiprocessing.Pipe()
+        dm_commands, dm_child_commands = multiprocessing.Pipe()
+        dm_actions_out, dm_child_actions = multiprocessing.Pipe()
+        nlg_commands, nlg_child_commands = multiprocessing.Pipe()
+        nlg_text_out, nlg_child_text = multiprocessing.Pipe()
+
+        close_event = multiprocessing.Event()
+
+        components = [
+            SLU(self.cfg, slu_child_commands, asr_hypotheses_in, slu_child_hypotheses, close_event),
+            DM(self.cfg, dm_child_commands, slu_hypotheses_out, dm_child_actions, close_event),
+            NLG(self.cfg, nlg_child_commands, dm_actions_out, nlg_child_text, close_event),
+        ]
+        for c in components:
+            c.start()
+
+        latencies = []
+        try:
+            # the system prompt is not measured, it also warms up all the components
+            dm_commands.send(Command('new_dialogue()', 'HUB', 'DM'))
+            self.wait_for_text(dm_commands, nlg_commands, nlg_text_out)
+
+            for utterance in utterances:
+                nblist = UtteranceNBList()
+                nblist.add(1.0, Utterance(utterance))
+                nblist.merge()
+
+                start = time.time()
+                asr_child_hypotheses.send(ASRHyp(nblist, fname='benchmark.wav'))
+                if self.wait_for_text(dm_commands, nlg_commands, nlg_text_out):
+                    latencies.append(time.time() - start)
+
+                # drain the remaining output, e.g. the SLU notifications
+                while slu_commands.poll():
+                    slu_commands.recv()
+
+            cpu_start = sum(get_cpu_time(c.pid) for c in components)
+            time.sleep(idle_time)
+            idle_cpu = (sum(get_cpu_time(c.pid) for c in components) - cpu_start) / idle_time
+        finally:
+            for commands in [slu_commands, dm_commands, nlg_commands]:
+                commands.send(Command('stop()', 'HUB', 'BENCHMARK'))
+            for c in components:
+                c.join(10.0)
+
+        return latencies, idle_cpu
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Measures the end-to-end turn latency through the SLU, DM, and NLG hub components with the event driven
+        main loops and with the original sleeping and polling main loops.
+
+        The default configuration is loaded from '<app root>/resources/default.cfg'. The configuration of
+        the dialogue system, e.g. the one used with thub, must be passed as an argument '-c'.
+      """)
+
+    parser.add_argument('-c', '--configs', nargs='+',
+                        help='additional configuration files')
+    parser.add_argument('-s', action="append", dest="scripts", default=None,
+                        help='a script with user utterances, one per line, as for thub')
+    parser.add_argument('-n', '--turns', type=int, default=50,
+                        help='the number of measured turns')
+    args = parser.parse_args()
+
+    cfg = Config.load_configs(args.configs)
+
+    utterances = []
+    for script in args.scripts or []:
+        with open(script) as f_in:
+            utterances.extend(ln.decode('utf8').strip() for ln in f_in if ln.strip())
+    if not utterances:
+        utterances = ['hello', ]
+    utterances = [utterances[i % len(utterances)] for i in range(args.turns)]
+
+    cfg['Logging']['session_logger'].set_close_event(multiprocessing.Event())
+    cfg['Logging']['session_logger'].set_cfg(cfg)
+    cfg['Logging']['session_logger'].start()
+    cfg['Logging']['session_logger'].session_start(tempfile.mkdtemp(prefix='alex_hub_benchmark_'))
+
+    benchmark = HubLatencyBenchmark(cfg)
+
+    print "=" * 120
+    print "Hub latency benchmark: SLU -> DM -> NLG, %d turns" % len(utterances)
+    print "Main loop sleep time: %.3f s" % cfg['Hub']['main_loop_sleep_time']
+    print "-" * 120
+    for event_driven in [False, True]:
+        latencies, idle_cpu = benchmark.run(utterances, event_driven)
+
+        print "%-14s turns: %4d  mean: %8.2f ms  median: %8.2f ms  95th perc.: %8.2f ms  idle CPU: %6.2f %%" % \
+              ('Event driven' if event_driven else 'Polling',
+               len(latencies),
+               1000.0 * sum(latencies) / max(len(latencies), 1),
+               1000.0 * percentile(latencies, 0.5),
+               1000.0 * percentile(latencies, 0.95),
+               100.0 * idle_cpu)
+    print "=" * 120
+
+    cfg['Logging']['session_logger'].session_end()
+    cfg['Logging']['session_logger'].close_event.set()
+
+
+if __name__ == '__main__':
+    main()
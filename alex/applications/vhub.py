@@ -15,7 +15,9 @@ from alex.components.hub.nlg import NLG
 from alex.components.hub.tts import TTS
 from alex.components.hub.messages import Command, DMDA
 from alex.components.hub.calldb import CallDB
+from alex.components.hub.shmaudio import audio_pipe, SharedMemoryAudioConnection
 from alex.utils.config import Config
+from alex.utils.mproc import wait_for_connections, get_main_loop_wait_time
 
 
 class VoipHub(Hub):
@@ -42,11 +44,11 @@ class VoipHub(Hub):
     def run(self):
         try:
             vio_commands, vio_child_commands = multiprocessing.Pipe()  # used to send commands to VoipIO
-            vio_record, vio_child_record = multiprocessing.Pipe()      # I read from this connection recorded audio
+            vio_record, vio_child_record = audio_pipe(self.cfg)        # I read from this connection recorded audio
             vio_play, vio_child_play = multiprocessing.Pipe()          # I write in audio to be played
 
             vad_commands, vad_child_commands = multiprocessing.Pipe()   # used to send commands to VAD
-            vad_audio_out, vad_child_audio_out = multiprocessing.Pipe() # used to read output audio from VAD
+            vad_audio_out, vad_child_audio_out = audio_pipe(self.cfg)   # used to read output audio from VAD
 
             asr_commands, asr_child_commands = multiprocessing.Pipe()          # used to send commands to ASR
             asr_hypotheses_out, asr_child_hypotheses = multiprocessing.Pipe()  # used to read ASR hypotheses
@@ -72,6 +74,9 @@ class VoipHub(Hub):
                                        slu_hypotheses_out, slu_child_hypotheses,
                                        dm_actions_out, dm_child_actions,
                                        nlg_text_out, nlg_child_text]
+            # the shared memory audio connections can be read only by their consumers
+            non_command_connections = [c for c in non_command_connections
+                                       if not isinstance(c, SharedMemoryAudioConnection)]
 
             vio = VoipIO(self.cfg, vio_child_commands, vio_child_record, vio_child_play, self.close_event)
             vad = VAD(self.cfg, vad_child_commands, vio_record, vad_child_audio_out, self.close_event)
@@ -127,7 +132,12 @@ class VoipHub(Hub):
                     print 'Received close event in: %s' % multiprocessing.current_process().name
                     return
 
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                # wait for any command or a timer
+                wait_time = get_main_loop_wait_time(self.cfg)
+                if wait_time is None:
+                    time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                else:
+                    wait_for_connections(command_connections, wait_time)
 
                 if call_back_time != -1 and call_back_time < time.time():
                     vio_commands.send(Command('make_call(destination="%s")' % call_back_uri, 'HUB', 'VoipIO'))
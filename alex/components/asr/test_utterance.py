@@ -3,6 +3,7 @@
 
 from __future__ import unicode_literals
 
+import random
 import unittest
 
 import __init__
@@ -118,6 +119,62 @@ class TestUtteranceConfusionNetwork(unittest.TestCase):
 
         self.assertEqual(unicode(gen_nblist), unicode(correct_nblist))
 
+    def test_iter_utterance_hyps(self):
+        confnet = UtteranceConfusionNetwork()
+        confnet.add([[0.2, 'A1'], [0.5, 'A2'], [0.3, 'A3'],])
+        confnet.add([[0.9, 'B1'], [0.1, 'B2'],])
+        confnet.add([[0.35, 'C1'], [0.65, ''],])
+
+        hyps = list(confnet.iter_utterance_hyps())
+
+        # all the hypotheses are generated exactly once and from the most probable one
+        self.assertEqual(len(hyps), 12)
+        self.assertEqual(len(set(hyp_index for prob, hyp_index in hyps)), 12)
+        self.assertEqual(hyps[0][1], (1, 0, 1))
+        for prob, hyp_index in hyps:
+            self.assertAlmostEqual(prob, confnet.get_prob(hyp_index))
+        for (prob1, hyp_index1), (prob2, hyp_index2) in zip(hyps, hyps[1:]):
+            self.assertGreaterEqual(prob1, prob2)
+
+    def test_get_utterance_nblist_budget(self):
+        def get_utterance_nblist(confnet, n):
+            """The original search which sorts the open hypotheses after every expansion."""
+            open_hyp = [(confnet.get_prob(tuple([0] * len(confnet))), tuple([0] * len(confnet)))]
+            closed_hyp = {}
+
+            i = 0
+            while open_hyp and i < n:
+                i += 1
+                current_prob, current_hyp_index = open_hyp.pop(0)
+                if current_hyp_index not in closed_hyp:
+                    closed_hyp[current_hyp_index] = current_prob
+                    for hyp_index in confnet.get_next_worse_candidates(current_hyp_index):
+                        open_hyp.append((confnet.get_prob(hyp_index), hyp_index))
+                    open_hyp.sort(reverse=True)
+
+            nblist = UtteranceNBList()
+            for idx in closed_hyp:
+                nblist.add(closed_hyp[idx], confnet.get_hyp_index_utterance(idx))
+            nblist.merge()
+            nblist.add_other()
+
+            return nblist
+
+        rnd = random.Random(0)
+        for k in range(300):
+            confnet = UtteranceConfusionNetwork()
+            for i in range(rnd.randint(1, 8)):
+                # rounded probabilities make ties of the hypotheses
+                probs = [round(rnd.random(), 1) + 0.05 for j in range(rnd.randint(1, 4))]
+                words = rnd.sample(['a', 'b', 'c', 'd', ''], len(probs))
+                confnet.add([[p / sum(probs), w] for p, w in zip(probs, words)])
+            confnet.sort()
+
+            nblist = confnet.get_utterance_nblist(n=40)
+            expected = get_utterance_nblist(confnet, n=40)
+            self.assertEqual(len(nblist), len(expected))
+            self.assertEqual(unicode(nblist), unicode(expected))
+
     def test_repr_basic(self):
         A1, A2, A3 = 0.90, 0.05, 0.05
         B1, B2, B3 = 0.50, 0.35, 0.15
@@ -9,11 +9,12 @@ import copy
 import re
 from collections import namedtuple
 from itertools import izip, product
+from math import exp
 from operator import add, itemgetter, mul
 
 from alex.components.slu.exceptions import SLUException
 from alex.corpustools.wavaskey import load_wavaskey, save_wavaskey
-from alex.ml.hypothesis import Hypothesis, NBList
+from alex.ml.hypothesis import Hypothesis, NBList, iter_kbest
 from alex.ml.exceptions import NBListException
 from alex.utils import text
 from alex.utils.text import Escaper
@@ -1495,6 +1496,20 @@ class UtteranceConfusionNetwork(ASRHypothesis, Abstracted):
 
         return Utterance(' '.join(s))
 
+    # FIXME Make this method aware of _long_links.
+    def iter_utterance_hyps(self):
+        """Lazily generates the utterance hypotheses from the most probable one.
+
+        The hypotheses are not merged, i.e. the same utterance can be generated
+        several times, e.g. when it differs only in empty words.  The
+        generation can be stopped at any time by the caller.
+
+        Returns a generator of (prob, hyp_index) tuples.
+
+        """
+        for logprob, hyp_index in iter_kbest([[p for p, w in alts] for alts in self._cn]):
+            yield exp(logprob), hyp_index
+
     # FIXME Make this method aware of _long_links.
     def get_utterance_nblist(self, n=10, prune_prob=0.005):
         """Parses the confusion network and generates n best hypotheses.
@@ -1507,33 +1522,16 @@ class UtteranceConfusionNetwork(ASRHypothesis, Abstracted):
 
         """
 
-        open_hyp = []
+        # The search generates the hypotheses in the same order and with the same budget as it always did, so that
+        # the n-best lists do not change: ``n`` counts every generated hypothesis, i.e. a hypothesis is counted once
+        # for each of its parents.
         closed_hyp = {}
+        for i, (prob, hyp_index) in enumerate(iter_kbest([[p for p, w in alts] for alts in self._cn],
+                                                         per_parent=True)):
+            if i >= n:
+                break
 
-        # create index for the best hypothesis
-        best_hyp = tuple([0] * len(self._cn))
-        best_prob = self.get_prob(best_hyp)
-        open_hyp.append((best_prob, best_hyp))
-
-        i = 0
-        while open_hyp and i < n:
-            i += 1
-
-            current_prob, current_hyp_index = open_hyp.pop(0)
-
-            if current_hyp_index not in closed_hyp:
-                # process only those hypotheses which were not processed so far
-
-                closed_hyp[current_hyp_index] = current_prob
-
-                # print "current_prob, current_hyp_index:", current_prob,
-                # current_hyp_index
-
-                for hyp_index in self.get_next_worse_candidates(current_hyp_index):
-                    prob = self.get_prob(hyp_index)
-                    open_hyp.append((prob, hyp_index))
-
-                open_hyp.sort(reverse=True)
+            closed_hyp.setdefault(hyp_index, prob)
 
         nblist = UtteranceNBList()
         for idx in closed_hyp:
@@ -8,18 +8,16 @@ if __name__ == "__main__":
     import autopath
 
 from collections import deque
-import multiprocessing
-import time
 
 from alex.components.asr.common import asr_factory
 from alex.components.asr.exceptions import ASRException
 from alex.components.asr.julius import JuliusASRTimeoutException
 from alex.components.asr.utterance import UtteranceNBList, UtteranceConfusionNetwork
 from alex.components.hub.messages import Command, Frame, ASRHyp
-from alex.utils.procname import set_proc_name
+from alex.components.hub.component import HubComponent
 
 
-class ASR(multiprocessing.Process):
+class ASR(HubComponent):
 
     """
     ASR recognizes input audio and returns an N-best list hypothesis or
@@ -39,6 +37,8 @@ class ASR(multiprocessing.Process):
 
     """
 
+    proc_name = "Alex_ASR"
+
     def __init__(self, cfg, commands, audio_in, asr_hypotheses_out, close_event):
         """
         Initialises an ASR object according to the configuration (cfg['ASR']
@@ -55,7 +55,7 @@ class ASR(multiprocessing.Process):
 
         """
 
-        multiprocessing.Process.__init__(self)
+        HubComponent.__init__(self)
 
         self.cfg = cfg
         self.commands = commands
@@ -230,43 +230,21 @@ class ASR(multiprocessing.Process):
             else:
                 raise ASRException('Unsupported input.')
 
-    def run(self):
-        try:
-            set_proc_name("Alex_ASR")
-            self.cfg['Logging']['session_logger'].cancel_join_thread()
-
-            while 1:
-                # Check the close event.
-                if self.close_event.is_set():
-                    print 'Received close event in: %s' % multiprocessing.current_process().name
-                    return
-
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+    def get_input_connections(self):
+        return [self.commands, self.audio_in]
 
-                s = (time.time(), time.clock())
+    def has_pending_input(self):
+        return bool(self.local_commands or self.local_audio_in)
 
-                self.recv_input_locally()
+    def process_events(self):
+        self.recv_input_locally()
 
-                # Process all pending commands.
-                if self.process_pending_commands():
-                    return
+        # Process all pending commands.
+        if self.process_pending_commands():
+            return True
 
-                # Process audio data.
-                for i in range(self.cfg['ASR']['n_rawa']):
-                    self.read_audio_write_asr_hypotheses()
+        # Process audio data.
+        for i in range(self.cfg['ASR']['n_rawa']):
+            self.read_audio_write_asr_hypotheses()
 
-                d = (time.time() - s[0], time.clock() - s[1])
-                if d[0] > 0.200:
-                    print "EXEC Time inner loop: ASR t = {t:0.4f} c = {c:0.4f}\n".format(t=d[0], c=d[1])
-
-        except KeyboardInterrupt:
-            print 'KeyboardInterrupt exception in: %s' % multiprocessing.current_process().name
-            self.close_event.set()
-            return
-        except:
-            self.cfg['Logging']['system_logger'].exception('Uncaught exception in ASR process.')
-            self.close_event.set()
-            raise
-
-        print 'Exiting: %s. Setting close event' % multiprocessing.current_process().name
-        self.close_event.set()
+        return False
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This code is PEP8-compliant. See http://www.python.org/dev/peps/pep-0008.
+
+import multiprocessing
+import time
+
+from alex.utils.mproc import wait_for_connections, get_main_loop_wait_time
+from alex.utils.procname import set_proc_name
+
+
+class HubComponent(multiprocessing.Process):
+    """
+    The base class of the hub components which run in their own processes.
+
+    The main loop of a component blocks until some of its input connections has data or the close event may need
+    to be checked. Therefore, a message passing through a pipeline of components is not delayed by sleeping in every
+    component and the idle components do not burn CPU.
+
+    A component has to implement:
+
+        get_input_connections() - returns the connections the component reads from
+        process_events() - processes the available input, it returns True if the process should terminate
+
+    and it can implement:
+
+        has_pending_input() - returns True if some input was already received and it waits for processing,
+                              e.g. in local queues, the main loop then does not block
+        get_wait_time() - returns the maximum time the main loop blocks, e.g. when the component must also poll
+                          a source which cannot be waited for
+    """
+
+    proc_name = "Alex_HubComponent"
+    exec_time_warning = 0.200
+
+    def get_input_connections(self):
+        return []
+
+    def has_pending_input(self):
+        return False
+
+    def get_wait_time(self):
+        return get_main_loop_wait_time(self.cfg)
+
+    def process_events(self):
+        raise NotImplementedError("abstract method")
+
+    def wait_for_input(self):
+        """
+        Blocks until some input is available, the maximum wait time expires, or, if the event driven main loops are
+        switched off, the main loop sleep time passes.
+        """
+        wait_time = self.get_wait_time()
+
+        if wait_time is None:
+            time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+        elif not self.has_pending_input():
+            wait_for_connections(self.get_input_connections(), wait_time)
+
+    def run(self):
+        try:
+            set_proc_name(self.proc_name)
+            self.cfg['Logging']['session_logger'].cancel_join_thread()
+
+            while 1:
+                # Check the close event.
+                if self.close_event.is_set():
+                    print 'Received close event in: %s' % multiprocessing.current_process().name
+                    return
+
+                self.wait_for_input()
+
+                s = (time.time(), time.clock())
+
+                if self.process_events():
+                    return
+
+                d = (time.time() - s[0], time.clock() - s[1])
+                if d[0] > self.exec_time_warning:
+                    print "EXEC Time inner loop: {name} t = {t:0.4f} c = {c:0.4f}\n".format(name=self.__class__.__name__,
+                                                                                        t=d[0], c=d[1])
+
+        except KeyboardInterrupt:
+            print 'KeyboardInterrupt exception in: %s' % multiprocessing.current_process().name
+            self.close_event.set()
+            return
+        except:
+            self.cfg['Logging']['system_logger'].exception('Uncaught exception in the %s process.' %
+                                                           self.__class__.__name__)
+            self.close_event.set()
+            raise
+
+        print 'Exiting: %s. Setting close event' % multiprocessing.current_process().name
+        self.close_event.set()
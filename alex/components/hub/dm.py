@@ -3,19 +3,18 @@
 
 from __future__ import unicode_literals
 
-import multiprocessing
 import time
 import random
 import urllib
 
 from alex.components.slu.da import DialogueAct, DialogueActItem, DialogueActConfusionNetwork
 from alex.components.hub.messages import Command, SLUHyp, DMDA
+from alex.components.hub.component import HubComponent
 from alex.components.dm.common import dm_factory, get_dm_type
 from alex.components.dm.exceptions import DMException
-from alex.utils.procname import set_proc_name
 
 
-class DM(multiprocessing.Process):
+class DM(HubComponent):
     """DM accepts N-best list hypothesis or a confusion network generated by an SLU component.
     The result of this component is an output dialogue act.
 
@@ -25,8 +24,10 @@ class DM(multiprocessing.Process):
     communication.
     """
 
+    proc_name = "Alex_DM"
+
     def __init__(self, cfg, commands, slu_hypotheses_in, dialogue_act_out, close_event):
-        multiprocessing.Process.__init__(self)
+        HubComponent.__init__(self)
 
         self.cfg = cfg
         self.commands = commands
@@ -240,40 +241,15 @@ class DM(multiprocessing.Process):
             else:
                 raise DMException('Unsupported input.')
 
-    def run(self):
-        try:
-            set_proc_name("Alex_DM")
-            self.cfg['Logging']['session_logger'].cancel_join_thread()
-
-            while 1:
-                # Check the close event.
-                if self.close_event.is_set():
-                    print 'Received close event in: %s' % multiprocessing.current_process().name
-                    return
-
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
-
-                s = (time.time(), time.clock())
+    def get_input_connections(self):
+        return [self.commands, self.slu_hypotheses_in]
 
-                # process all pending commands
-                if self.process_pending_commands():
-                    return
+    def process_events(self):
+        # process all pending commands
+        if self.process_pending_commands():
+            return True
 
-                # process the incoming SLU hypothesis
-                self.read_slu_hypotheses_write_dialogue_act()
+        # process the incoming SLU hypothesis
+        self.read_slu_hypotheses_write_dialogue_act()
 
-                d = (time.time() - s[0], time.clock() - s[1])
-                if d[0] > 0.200:
-                    print "EXEC Time inner loop: DM t = {t:0.4f} c = {c:0.4f}\n".format(t=d[0], c=d[1])
-
-        except KeyboardInterrupt:
-            print 'KeyboardInterrupt exception in: %s' % multiprocessing.current_process().name
-            self.close_event.set()
-            return
-        except:
-            self.cfg['Logging']['system_logger'].exception('Uncaught exception in the DM process.')
-            self.close_event.set()
-            raise
-
-        print 'Exiting: %s. Setting close event' % multiprocessing.current_process().name
-        self.close_event.set()
+        return False
@@ -3,3 +3,7 @@ from alex import AlexException
 
 class VoipIOException(AlexException):
     pass
+
+
+class SharedMemoryAudioException(AlexException):
+    pass
@@ -1,18 +1,13 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import multiprocessing
-import time
-
 from alex.components.nlg.common import nlg_factory, get_nlg_type
 
 from alex.components.hub.messages import Command, DMDA, TTSText
+from alex.components.hub.component import HubComponent
 from alex.components.dm.exceptions import DMException
 
-from alex.utils.procname import set_proc_name
-
-
-class NLG(multiprocessing.Process):
+class NLG(HubComponent):
     """The NLG component receives a dialogue act generated by the dialogue manager and then it
     converts the act into the text.
 
@@ -20,8 +15,10 @@ class NLG(multiprocessing.Process):
     communication.
     """
 
+    proc_name = "Alex_NLG"
+
     def __init__(self, cfg, commands, dialogue_act_in, text_out, close_event):
-        multiprocessing.Process.__init__(self)
+        HubComponent.__init__(self)
 
         self.cfg = cfg
         self.commands = commands
@@ -111,40 +108,15 @@ class NLG(multiprocessing.Process):
             else:
                 raise DMException('Unsupported input.')
 
-    def run(self):
-        try:
-            set_proc_name("Alex_NLG")
-            self.cfg['Logging']['session_logger'].cancel_join_thread()
-
-            while 1:
-                # Check the close event.
-                if self.close_event.is_set():
-                    print 'Received close event in: %s' % multiprocessing.current_process().name
-                    return
+    def get_input_connections(self):
+        return [self.commands, self.dialogue_act_in]
 
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+    def process_events(self):
+        # process all pending commands
+        if self.process_pending_commands():
+            return True
 
-                s = (time.time(), time.clock())
+        # process the incoming DM dialogue acts
+        self.read_dialogue_act_write_text()
 
-                # process all pending commands
-                if self.process_pending_commands():
-                    return
-
-                # process the incoming DM dialogue acts
-                self.read_dialogue_act_write_text()
-
-                d = (time.time() - s[0], time.clock() - s[1])
-                if d[0] > 0.200:
-                    print "EXEC Time inner loop: NLG t = {t:0.4f} c = {c:0.4f}\n".format(t=d[0], c=d[1])
-
-        except KeyboardInterrupt:
-            print 'KeyboardInterrupt exception in: %s' % multiprocessing.current_process().name
-            self.close_event.set()
-            return
-        except:
-            self.cfg['Logging']['system_logger'].exception('Uncaught exception in NLG process.')
-            self.close_event.set()
-            raise
-
-        print 'Exiting: %s. Setting close event' % multiprocessing.current_process().name
-        self.close_event.set()
+        return False
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This code is PEP8-compliant. See http://www.python.org/dev/peps/pep-0008.
+
+import errno
+import fcntl
+import mmap
+import multiprocessing
+import os
+import struct
+import time
+
+from alex.components.hub.exceptions import SharedMemoryAudioException
+from alex.components.hub.messages import Frame
+from alex.utils.mproc import wait_for_connections, MAIN_LOOP_MAX_WAIT_TIME
+
+# write_seq, read_seq, number of dropped frames, number of blocked control messages
+HEADER = struct.Struct(b'<QQQQ')
+# seq, kind, length of the payload
+SLOT_HEADER = struct.Struct(b'<QII')
+
+SLOT_FRAME = 1
+SLOT_CONTROL = 2
+
+CONTROL_WAIT_TIME = 0.001
+
+
+class SharedMemoryAudioConnection(object):
+    """
+    One-way connection for audio frames between two hub components which uses a ring buffer in shared memory instead
+    of pickling every frame into a pipe.
+
+    The connection mimics the part of the multiprocessing connection interface used by the hub components: send(),
+    recv(), poll(), and fileno(). It must be created before the components are started, so that the forked writer
+    and reader processes share the memory. Only one process may write and only one process may read.
+
+    Frames are copied into fixed size slots of the ring buffer, each slot carries the sequence number of the message.
+    Any other message, e.g. the speech_start() and speech_end() commands, is sent through a small control pipe and
+    its slot in the ring only marks its position in the stream so that the order of the frames and the commands is
+    preserved.
+
+    The reader is woken up through a doorbell pipe which is written only when the ring buffer changes from empty to
+    non-empty, therefore, it can be waited for by select() as any other connection.
+
+    When the ring buffer is full, new frames are dropped and counted because the writer is the real-time audio
+    source and must not block. Control messages are never dropped, the writer waits until the reader frees a slot.
+    """
+
+    def __init__(self, n_frames=1000, frame_size=512):
+        """
+        :param n_frames: the number of slots in the ring buffer
+        :param frame_size: the maximum size of a frame payload in bytes, larger frames are sent as control messages
+        """
+        self.n_frames = n_frames
+        self.frame_size = frame_size
+        self.slot_size = SLOT_HEADER.size + frame_size
+
+        self.buffer = mmap.mmap(-1, HEADER.size + n_frames * self.slot_size)
+        self.control_in, self.control_out = multiprocessing.Pipe(duplex=False)
+        self.doorbell_in, self.doorbell_out = os.pipe()
+
+        for fd in [self.doorbell_in, self.doorbell_out]:
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+    def _get_header(self):
+        return HEADER.unpack_from(self.buffer, 0)
+
+    def _set_write_seq(self, write_seq):
+        struct.pack_into(b'<Q', self.buffer, 0, write_seq)
+
+    def _set_read_seq(self, read_seq):
+        struct.pack_into(b'<Q', self.buffer, 8, read_seq)
+
+    def _inc_counter(self, offset):
+        struct.pack_into(b'<Q', self.buffer, offset, struct.unpack_from(b'<Q', self.buffer, offset)[0] + 1)
+
+    def fileno(self):
+        return self.doorbell_in
+
+    def send(self, obj):
+        if isinstance(obj, Frame) and len(obj.payload) <= self.frame_size:
+            kind = SLOT_FRAME
+        else:
+            kind = SLOT_CONTROL
+
+        write_seq, read_seq, dropped, blocked = self._get_header()
+        if write_seq - read_seq >= self.n_frames:
+            if kind == SLOT_FRAME:
+                self._inc_counter(16)
+                return
+
+            self._inc_counter(24)
+            while write_seq - read_seq >= self.n_frames:
+                time.sleep(CONTROL_WAIT_TIME)
+                write_seq, read_seq, dropped, blocked = self._get_header()
+
+        offset = HEADER.size + (write_seq % self.n_frames) * self.slot_size
+        if kind == SLOT_FRAME:
+            payload = obj.payload
+            self.buffer[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + len(payload)] = payload
+            SLOT_HEADER.pack_into(self.buffer, offset, write_seq, kind, len(payload))
+        else:
+            # the message must be in the control pipe before its slot is published
+            self.control_out.send(obj)
+            SLOT_HEADER.pack_into(self.buffer, offset, write_seq, kind, 0)
+
+        # publish the slot and only then check whether the reader may be waiting for it
+        self._set_write_seq(write_seq + 1)
+        if self._get_header()[1] == write_seq:
+            try:
+                os.write(self.doorbell_out, b'\0')
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+
+    def poll(self, timeout=0.0):
+        write_seq, read_seq, dropped, blocked = self._get_header()
+        if write_seq != read_seq:
+            return True
+
+        if timeout:
+            wait_for_connections([self, ], timeout)
+            write_seq, read_seq, dropped, blocked = self._get_header()
+            return write_seq != read_seq
+
+        return False
+
+    def recv(self):
+        # block as the multiprocessing connections do, the timeout only guards against a lost doorbell
+        while not self.poll(MAIN_LOOP_MAX_WAIT_TIME):
+            pass
+
+        write_seq, read_seq, dropped, blocked = self._get_header()
+        offset = HEADER.size + (read_seq % self.n_frames) * self.slot_size
+        seq, kind, length = SLOT_HEADER.unpack_from(self.buffer, offset)
+        if seq != read_seq:
+            raise SharedMemoryAudioException('Corrupted ring buffer: expected message %d, found %d.' % (read_seq, seq))
+
+        if kind == SLOT_FRAME:
+            obj = Frame(self.buffer[offset + SLOT_HEADER.size:offset + SLOT_HEADER.size + length])
+        else:
+            obj = self.control_in.recv()
+
+        # free the slot and only then empty the doorbell, a message published meanwhile is found by the next poll()
+        self._set_read_seq(read_seq + 1)
+        if read_seq + 1 == write_seq:
+            try:
+                while os.read(self.doorbell_in, 4096):
+                    pass
+            except OSError as e:
+                if e.errno != errno.EAGAIN:
+                    raise
+
+        return obj
+
+    def get_stats(self):
+        """
+        Returns the counters of the connection: the number of sent messages, the number of received messages,
+        the number of queued messages, the number of frames dropped because the buffer was full, and the number of
+        control messages which had to wait for a free slot.
+        """
+        write_seq, read_seq, dropped, blocked = self._get_header()
+        return {
+            'sent': write_seq,
+            'received': read_seq,
+            'queued': write_seq - read_seq,
+            'dropped': dropped,
+            'blocked': blocked,
+        }
+
+
+def SharedMemoryAudioPipe(n_frames=1000, frame_size=512):
+    """
+    Returns a pair of the reading and the writing end of a shared memory audio connection, in the same order as
+    the ends of a multiprocessing.Pipe are used in the hubs. Both ends are the same object.
+    """
+    conn = SharedMemoryAudioConnection(n_frames, frame_size)
+    return conn, conn
+
+
+def audio_pipe(cfg):
+    """
+    Returns a pipe for the audio frames passed from VoipIO to VAD and from VAD to ASR according to
+    cfg['VoipHub']['audio_transport'], which is either 'pipe' or 'shm'.
+    """
+    transport = cfg['VoipHub'].get('audio_transport', 'pipe')
+
+    if transport == 'pipe':
+        return multiprocessing.Pipe()
+    elif transport == 'shm':
+        return SharedMemoryAudioPipe(cfg['VoipHub'].get('shm_audio_buffer_frames', 1000),
+                                     cfg['Audio']['samples_per_frame'] * 2)
+    else:
+        raise SharedMemoryAudioException('Unsupported audio transport: %s' % transport)
@@ -2,17 +2,14 @@
 # -*- coding: utf-8 -*-
 # This code is PEP8-compliant. See http://www.python.org/dev/peps/pep-0008.
 
-import multiprocessing
-import time
-
 from alex.components.slu.da import DialogueActNBList, DialogueActConfusionNetwork
 from alex.components.hub.messages import Command, ASRHyp, SLUHyp
+from alex.components.hub.component import HubComponent
 from alex.components.slu.common import slu_factory
 from alex.components.slu.exceptions import SLUException
-from alex.utils.procname import set_proc_name
 
 
-class SLU(multiprocessing.Process):
+class SLU(HubComponent):
     """
     The SLU component receives ASR hypotheses and converts them into
     hypotheses about the meaning of the input in the form of dialogue
@@ -22,6 +19,8 @@ class SLU(multiprocessing.Process):
     inter-process communication.
     """
 
+    proc_name = "Alex_SLU"
+
     def __init__(self, cfg, commands, asr_hypotheses_in, slu_hypotheses_out,
                  close_event):
         """
@@ -39,7 +38,7 @@ class SLU(multiprocessing.Process):
 
         """
 
-        multiprocessing.Process.__init__(self)
+        HubComponent.__init__(self)
 
         # Save the configuration.
         self.cfg = cfg
@@ -129,40 +128,15 @@ class SLU(multiprocessing.Process):
             else:
                 raise SLUException('Unsupported input.')
 
-    def run(self):
-        try:
-            set_proc_name("Alex_SLU")
-            self.cfg['Logging']['session_logger'].cancel_join_thread()
-
-            while 1:
-                # Check the close event.
-                if self.close_event.is_set():
-                    print 'Received close event in: %s' % multiprocessing.current_process().name
-                    return
-
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+    def get_input_connections(self):
+        return [self.commands, self.asr_hypotheses_in]
 
-                s = (time.time(), time.clock())
+    def process_events(self):
+        # process all pending commands
+        if self.process_pending_commands():
+            return True
 
-                # process all pending commands
-                if self.process_pending_commands():
-                    return
+        # process the incoming ASR hypotheses
+        self.read_asr_hypotheses_write_slu_hypotheses()
 
-                # process the incoming ASR hypotheses
-                self.read_asr_hypotheses_write_slu_hypotheses()
-
-                d = (time.time() - s[0], time.clock() - s[1])
-                if d[0] > 0.200:
-                    print "EXEC Time inner loop: SLU t = {t:0.4f} c = {c:0.4f}\n".format(t=d[0], c=d[1])
-
-        except KeyboardInterrupt:
-            print 'KeyboardInterrupt exception in: %s' % multiprocessing.current_process().name
-            self.close_event.set()
-            return
-        except:
-            self.cfg['Logging']['system_logger'].exception('Uncaught exception in SLU process.')
-            self.close_event.set()
-            raise
-
-        print 'Exiting: %s. Setting close event' % multiprocessing.current_process().name
-        self.close_event.set()
+        return False
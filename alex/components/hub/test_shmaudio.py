@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import unittest
+
+if __name__ == "__main__":
+    import autopath
+
+from alex.components.hub.messages import Command, Frame
+from alex.components.hub.shmaudio import SharedMemoryAudioPipe
+from alex.utils.mproc import wait_for_connections
+
+
+def send_segment(conn, n):
+    conn.send(Command('speech_start(fname="test.wav")', 'VAD', 'AudioIn'))
+    for i in range(n):
+        conn.send(Frame(chr(i % 256) * 64))
+    conn.send(Command('speech_end(fname="test.wav")', 'VAD', 'AudioIn'))
+
+
+class TestSharedMemoryAudioConnection(unittest.TestCase):
+    def test_order(self):
+        reader, writer = SharedMemoryAudioPipe(n_frames=128, frame_size=64)
+
+        p = multiprocessing.Process(target=send_segment, args=(writer, 100))
+        p.start()
+
+        received = []
+        while len(received) < 102 and (p.is_alive() or reader.poll()):
+            wait_for_connections([reader, ], 1.0)
+            while reader.poll():
+                received.append(reader.recv())
+        p.join()
+
+        self.assertEqual(received[0].parsed['__name__'], 'speech_start')
+        self.assertEqual(received[-1].parsed['__name__'], 'speech_end')
+        self.assertEqual([f.payload for f in received[1:-1]], [chr(i % 256) * 64 for i in range(100)])
+        self.assertFalse(reader.poll())
+        self.assertEqual(reader.get_stats()['dropped'], 0)
+
+    def test_full(self):
+        reader, writer = SharedMemoryAudioPipe(n_frames=4, frame_size=4)
+
+        for i in range(6):
+            writer.send(Frame(str(i) * 4))
+        # an oversized frame is passed through the control pipe
+        self.assertEqual(wait_for_connections([reader, ], 0.0), [reader, ])
+        self.assertEqual([reader.recv().payload for i in range(4)], ['0000', '1111', '2222', '3333'])
+        self.assertEqual(wait_for_connections([reader, ], 0.0), [])
+
+        writer.send(Frame('x' * 10))
+        self.assertEqual(reader.recv().payload, 'x' * 10)
+
+        stats = reader.get_stats()
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['sent'], 5)
+        self.assertEqual(stats['queued'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
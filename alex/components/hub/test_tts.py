@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import logging
+import struct
+import threading
+import time
+import unittest
+
+if __name__ == "__main__":
+    import autopath
+
+from alex.components.hub.messages import Frame
+from alex.components.hub.tts import TTS
+from alex.components.tts.base import TTSInterface
+
+
+class SlowTTS(TTSInterface):
+    """Synthesizes every text as its characters padded by silence, records the synthesized texts."""
+
+    def __init__(self, cfg):
+        TTSInterface.__init__(self, cfg)
+        self.events = cfg['TTS']['events']
+        self.threads = set()
+
+    def synthesize(self, text):
+        self.threads.add(threading.current_thread().ident)
+        time.sleep(0.05)
+        self.events.append(('synthesized', text))
+        return struct.pack('h', 0) * 5 + b''.join(struct.pack('h', ord(c)) for c in text) + struct.pack('h', 0) * 3
+
+
+class Connection(object):
+    def __init__(self, events):
+        self.events = events
+
+    def send(self, msg):
+        if isinstance(msg, Frame):
+            time.sleep(0.01)
+            self.events.append(('sent', msg.payload))
+        else:
+            self.events.append(('command', msg.parsed['__name__']))
+
+
+class TestTTS(unittest.TestCase):
+
+    def create_tts(self, pipelined):
+        events = []
+        cfg = {'TTS': {'type': SlowTTS, 'debug': False, 'in_between_segments_silence': 0.0, 'pipelined': pipelined,
+                       'events': events},
+               'Audio': {'sample_rate': 8000, 'samples_per_frame': 2},
+               'Logging': {'system_logger': logging.getLogger('test_tts')}}
+        return TTS(cfg, Connection([]), None, Connection(events), None), events
+
+    def test_remove_start_and_final_silence(self):
+        tts, _ = self.create_tts(False)
+        wav = struct.pack('6h', 0, 0, 256, 0, 1, 0)
+        self.assertEqual(tts.remove_start_and_final_silence(wav), struct.pack('3h', 256, 0, 1))
+        self.assertEqual(tts.remove_start_and_final_silence(struct.pack('3h', 0, 0, 0)), b'')
+        self.assertEqual(tts.remove_start_and_final_silence(b''), b'')
+
+    def test_pipelined(self):
+        text = 'Dobrý den. Jak se máte? Kam chcete jet.'
+        frames = {}
+        for pipelined in [False, True]:
+            tts, events = self.create_tts(pipelined)
+            tts.synthesize('user', text)
+            frames[pipelined] = [payload for event, payload in events if event == 'sent']
+
+            self.assertEqual(events[0], ('command', 'utterance_start'))
+            self.assertEqual(events[-1], ('command', 'utterance_end'))
+            # the engine is used by a single thread
+            self.assertEqual(len(tts.tts.threads), 1)
+
+        self.assertTrue(frames[True])
+        self.assertEqual(frames[True], frames[False])
+
+        # the next segment is synthesized before all the frames of the previous one are sent
+        synthesized = [i for i, (event, _) in enumerate(events) if event == 'synthesized']
+        sent = [i for i, (event, _) in enumerate(events) if event == 'sent']
+        self.assertEqual(len(synthesized), 3)
+        self.assertLess(synthesized[1], sent[-1])
+        self.assertLess(sent[0], synthesized[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
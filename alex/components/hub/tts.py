@@ -3,33 +3,36 @@
 
 from __future__ import unicode_literals
 
-import multiprocessing
-import time
 import sys
 import traceback
 import os
-import string
 import struct
+import time
+import numpy as np
 
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 
 from alex.components.hub.messages import Command, Frame, TTSText
+from alex.components.hub.component import HubComponent
 from alex.components.tts.common import get_tts_type, tts_factory
+from alex.components.tts.preprocessing import split_into_segments
 
-from alex.utils.procname import set_proc_name
 from alex.utils.audio import save_wav
 import alex.utils.various as various
 
 
-class TTS(multiprocessing.Process):
+class TTS(HubComponent):
     """TTS synthesizes input text and returns speech audio signal.
 
     This component is a wrapper around multiple TTS engines which handles multiprocessing
     communication.
     """
 
+    proc_name = "Alex_TTS"
+
     def __init__(self, cfg, commands, text_in, audio_out, close_event):
-        multiprocessing.Process.__init__(self)
+        HubComponent.__init__(self)
 
         self.cfg = cfg
         self.commands = commands
@@ -40,25 +43,13 @@ class TTS(multiprocessing.Process):
         tts_type = get_tts_type(cfg)
         self.tts = tts_factory(tts_type, cfg)
 
-    def parse_into_segments(self, text):
-        segments = []
-        last_split = 0
-        lc = [c for c in string.lowercase]
-        lc.extend('ěščřžýáíéňťďůú')
-        up = [c for c in string.uppercase]
-        up.extend('ĚŠČŘŽÝÁÍÉŇŤĎŮÚ')
-
-        for i in range(1, len(text)-2):
-            if (text[i-1] in lc
-                and text[i] in ['.', ",", "?"]
-                and text[i+1] == " "
-                and text[i+2] in up):
-                segments.append(text[last_split:i+1])
-                last_split = i + 2
-        else:
-            segments.append(text[last_split:])
+        # in the pipelined mode, the segments are synthesized by a worker thread, so the next segment is synthesized
+        # while the frames of the previous one are sent; the thread is started in the TTS process
+        self.pipelined = self.cfg['TTS'].get('pipelined', True)
+        self.synthesis_pool = None
 
-        return segments
+    def parse_into_segments(self, text):
+        return split_into_segments(text)
 
     def remove_start_and_final_silence(self, wav):
         """ Removes silence at the beginning and the end of the provided wave audio signal.
@@ -68,15 +59,11 @@ class TTS(multiprocessing.Process):
         """
 
         if len(wav) > 0:
-            for i, x in enumerate(wav):
-                if ord(x) != 0:
-                    break
+            nonzero = np.flatnonzero(np.frombuffer(wav, dtype=np.int16, count=len(wav) // 2))
+            if len(nonzero) == 0:
+                return b""
 
-            for j, x in enumerate(reversed(wav)):
-                if ord(x) != 0:
-                    break
-
-            return wav[2*int(i/2):-2*int(j/2+1)]
+            return wav[2 * nonzero[0]:2 * (nonzero[-1] + 1)]
         else:
             return wav
 
@@ -90,11 +77,31 @@ class TTS(multiprocessing.Process):
 
         return struct.pack('h',0)*length
 
+    def synthesize_segments(self, segments):
+        """ Yields the synthesized audio of the segments.
+
+        In the pipelined mode, all the segments are synthesized one after another by the worker thread, so that
+        the next segment is being synthesized while the audio of the previous one is processed and sent.
+        The TTS engine is always used from the worker thread then.
+        """
+        if not self.pipelined:
+            for segment_text in segments:
+                yield self.tts.synthesize(segment_text)
+            return
+
+        if self.synthesis_pool is None:
+            self.synthesis_pool = ThreadPool(1)
+
+        for segment_wav in self.synthesis_pool.imap(self.tts.synthesize, segments):
+            yield segment_wav
+
     def synthesize(self, user_id, text, log="true"):
         if text == "_silence_" or text == "silence()":
             # just let the TTS generate an empty wav
             text == ""
 
+        start_time = time.time()
+        first_frame_time = None
         wav = []
         timestamp = datetime.now().strftime('%Y-%m-%d--%H-%M-%S.%f')
         fname = 'tts-{stamp}.wav'.format(stamp=timestamp)
@@ -105,8 +112,7 @@ class TTS(multiprocessing.Process):
 
         segments = self.parse_into_segments(text)
 
-        for i, segment_text in enumerate(segments):
-            segment_wav = self.tts.synthesize(segment_text)
+        for i, segment_wav in enumerate(self.synthesize_segments(segments)):
             segment_wav = self.remove_start_and_final_silence(segment_wav)
             if i <  len(segments) - 1:
                 # add silence only for non-final segments
@@ -119,6 +125,14 @@ class TTS(multiprocessing.Process):
             for frame in segment_wav:
                 self.audio_out.send(Frame(frame))
 
+                if first_frame_time is None:
+                    first_frame_time = time.time() - start_time
+
+        self.cfg['Logging']['system_logger'].info(
+            'TTS time to first frame: %s s, total time: %.3f s, segments: %d, text: %s' %
+            ('%.3f' % first_frame_time if first_frame_time is not None else 'no audio',
+             time.time() - start_time, len(segments), text))
+
         self.commands.send(Command('tts_end(user_id="%s",text="%s",fname="%s")' % (user_id,text,fname), 'TTS', 'HUB'))
         self.audio_out.send(Command('utterance_end(user_id="%s",text="%s",fname="%s",log="%s")' %
                             (user_id, text, fname, log), 'TTS', 'AudioOut'))
@@ -169,40 +183,15 @@ class TTS(multiprocessing.Process):
             if isinstance(data_tts, TTSText):
                 self.synthesize(None, data_tts.text)
 
-    def run(self):
-        try:
-            set_proc_name("Alex_TTS")
-            self.cfg['Logging']['session_logger'].cancel_join_thread()
-
-            while 1:
-                # Check the close event.
-                if self.close_event.is_set():
-                    print 'Received close event in: %s' % multiprocessing.current_process().name
-                    return
-
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+    def get_input_connections(self):
+        return [self.commands, self.text_in]
 
-                s = (time.time(), time.clock())
+    def process_events(self):
+        # process all pending commands
+        if self.process_pending_commands():
+            return True
 
-                # process all pending commands
-                if self.process_pending_commands():
-                    return
+        # process audio data
+        self.read_text_write_audio()
 
-                # process audio data
-                self.read_text_write_audio()
-
-                d = (time.time() - s[0], time.clock() - s[1])
-                if d[0] > 0.200:
-                    print "EXEC Time inner loop: TTS t = {t:0.4f} c = {c:0.4f}\n".format(t=d[0], c=d[1])
-
-        except KeyboardInterrupt:
-            print 'KeyboardInterrupt exception in: %s' % multiprocessing.current_process().name
-            self.close_event.set()
-            return
-        except:
-            self.cfg['Logging']['system_logger'].exception('Uncaught exception in the TTS process.')
-            self.close_event.set()
-            raise
-
-        print 'Exiting: %s. Setting close event' % multiprocessing.current_process().name
-        self.close_event.set()
+        return False
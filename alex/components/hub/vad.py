@@ -1,22 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import multiprocessing
-import time
-
 from collections import deque
 from datetime import datetime
 
-from alex.components.asr.exceptions import ASRException
 from alex.components.hub.messages import Command, Frame
-from alex.utils.procname import set_proc_name
+from alex.components.hub.component import HubComponent
+from alex.components.vad.common import get_vad_type, vad_factory
 from alex.utils.exceptions import SessionClosedException
 
-import alex.components.vad.power as PVAD
-import alex.components.vad.gmm as GVAD
-import alex.components.vad.ffnn as NNVAD
-
-class VAD(multiprocessing.Process):
+class VAD(HubComponent):
     """ VAD detects segments of speech in the audio stream.
 
     It implements two smoothing windows, one for detection of speech and one
@@ -37,8 +30,11 @@ class VAD(multiprocessing.Process):
 
     """
 
+    proc_name = "Alex_VAD"
+    exec_time_warning = 0.100
+
     def __init__(self, cfg, commands, audio_in, audio_out, close_event):
-        multiprocessing.Process.__init__(self)
+        HubComponent.__init__(self)
 
         self.cfg = cfg
         self.system_logger = cfg['Logging']['system_logger']
@@ -52,14 +48,7 @@ class VAD(multiprocessing.Process):
 
         self.vad_fname = None
 
-        if self.cfg['VAD']['type'] == 'power':
-            self.vad = PVAD.PowerVAD(cfg)
-        elif self.cfg['VAD']['type'] == 'gmm':
-            self.vad = GVAD.GMMVAD(cfg)
-        elif self.cfg['VAD']['type'] == 'ffnn':
-            self.vad = NNVAD.FFNNVAD(cfg)
-        else:
-            raise ASRException('Unsupported VAD engine: %s' % (self.cfg['VAD']['type'], ))
+        self.vad = vad_factory(get_vad_type(cfg), cfg)
 
         # stores information about each frame whether it was classified as speech or non speech
         self.detection_window_speech = deque(maxlen=self.cfg['VAD']['decision_frames_speech'])
@@ -211,46 +200,28 @@ class VAD(multiprocessing.Process):
                         self.audio_out.send(data_rec)
                         self.session_logger.rec_write(self.vad_fname, data_rec)
 
-    def run(self):
+    def get_input_connections(self):
+        return [self.commands, self.audio_in]
+
+    def has_pending_input(self):
+        return bool(self.local_commands or self.local_audio_in)
+
+    def process_events(self):
+        self.recv_input_locally()
+
+        # Process all pending commands.
+        if self.process_pending_commands():
+            return True
+
+        # FIXME: Make the following test work.
+        # # Wait until a session has started.
+        # if self.session_logger.is_open:
+        # Process audio data.
         try:
-            set_proc_name("Alex_VAD")
-            self.session_logger.cancel_join_thread()
-
-            while 1:
-                # Check the close event.
-                if self.close_event.is_set():
-                    print 'Received close event in: %s' % multiprocessing.current_process().name
-                    return
-
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
-
-                s = (time.time(), time.clock())
-
-                self.recv_input_locally()
-
-                # Process all pending commands.
-                if self.process_pending_commands():
-                    return
-
-                # FIXME: Make the following test work.
-                # # Wait until a session has started.
-                # if self.session_logger.is_open:
-                # Process audio data.
-                try:
-                    for i in range(self.cfg['VAD']['n_rwa']):
-                        # process at least n_rwa frames
-                        self.read_write_audio()
-                except SessionClosedException as e:
-                    self.system_logger.exception('VAD:read_write_audio: {ex!s}'.format(ex=e))
-
-                d = (time.time() - s[0], time.clock() - s[1])
-                if d[0] > 0.100:
-                    print "VAD t = {t:0.4f} c = {c:0.4f}\n".format(t=d[0], c=d[1])
-        except KeyboardInterrupt:
-            print 'KeyboardInterrupt exception in: %s' % multiprocessing.current_process().name
-            self.close_event.set()
-            return
-        except:
-            self.cfg['Logging']['system_logger'].exception('Uncaught exception in the VAD process.')
-            self.close_event.set()
-            raise
+            for i in range(self.cfg['VAD']['n_rwa']):
+                # process at least n_rwa frames
+                self.read_write_audio()
+        except SessionClosedException as e:
+            self.system_logger.exception('VAD:read_write_audio: {ex!s}'.format(ex=e))
+
+        return False
@@ -15,6 +15,7 @@ from datetime import datetime
 from collections import deque, defaultdict
 
 from alex.components.hub.messages import Command, Frame
+from alex.components.hub.component import HubComponent
 from alex.utils.exceptions import SessionLoggerException
 from alex.components.hub.exceptions import VoipIOException
 from alex.utils.exdec import catch_ioerror
@@ -289,7 +290,7 @@ class CallCallback(pj.CallCallback):
             raise
 
 
-class VoipIO(multiprocessing.Process):
+class VoipIO(HubComponent):
     """ VoipIO implements IO operations using a SIP protocol.
 
     If enabled then it logs all recorded and played audio into a file.
@@ -312,7 +313,7 @@ class VoipIO(multiprocessing.Process):
 
         """
 
-        multiprocessing.Process.__init__(self)
+        HubComponent.__init__(self)
 
         self.cfg = cfg
         self.acc = None
@@ -336,6 +337,23 @@ class VoipIO(multiprocessing.Process):
 
         self.black_list = defaultdict(int)
 
+    def get_input_connections(self):
+        return [self.commands, self.audio_play]
+
+    def has_pending_input(self):
+        return bool(self.local_commands)
+
+    def get_wait_time(self):
+        """ The recorded and played audio is exchanged with pjsip through memory ports which cannot be waited for.
+        Therefore, the main loop must wake up at least once per audio frame during a call.
+        """
+        wait_time = HubComponent.get_wait_time(self)
+
+        if wait_time is not None and (self.call or self.local_audio_play or self.message_queue):
+            wait_time = min(wait_time, float(self.cfg['Audio']['samples_per_frame']) / self.cfg['Audio']['sample_rate'])
+
+        return wait_time
+
     def recv_input_locally(self):
         """ Copy all input from input connections into local queue objects.
 
@@ -817,7 +835,7 @@ class VoipIO(multiprocessing.Process):
                     print 'Received close event in: %s' % multiprocessing.current_process().name
                     return
 
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                self.wait_for_input()
 
                 s = (time.time(), time.clock())
 
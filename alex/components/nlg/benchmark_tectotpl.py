@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import argparse
+import itertools
+import logging
+import os
+import random
+import time
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.components.slu.da import DialogueAct
+from alex.components.nlg.template import TectoTemplateNLG
+from alex.utils.config import Config, as_project_path
+
+SCENARIO = [
+    {'block': 'read.TectoTemplates', 'args': {'encoding': None}},
+    {'block': 't2a.CopyTTree'},
+    {'block': 't2a.cs.ReverseNumberNounDependency'},
+    {'block': 't2a.cs.InitMorphcat'},
+    {'block': 't2a.cs.GeneratePossessiveAdjectives'},
+    {'block': 't2a.cs.MarkSubject'},
+    {'block': 't2a.cs.ImposePronZAgr'},
+    {'block': 't2a.cs.ImposeRelPronAgr'},
+    {'block': 't2a.cs.ImposeSubjPredAgr'},
+    {'block': 't2a.cs.ImposeAttrAgr'},
+    {'block': 't2a.cs.ImposeComplAgr'},
+    {'block': 't2a.cs.DropSubjPersProns'},
+    {'block': 't2a.cs.AddPrepositions'},
+    {'block': 't2a.cs.AddSubconjs'},
+    {'block': 't2a.cs.GenerateWordForms', 'args': {'model': 'flect/model-t253-l1_10_00001-alex.pickle.gz'}},
+    {'block': 't2a.cs.VocalizePrepos'},
+    {'block': 't2a.cs.CapitalizeSentStart'},
+    {'block': 'a2w.cs.ConcatenateTokens'},
+    {'block': 'a2w.cs.RemoveRepeatedTokens'},
+]
+
+# the blocks which need the morphology model
+MORPHOLOGY_BLOCKS = ['GenerateWordForms', 'VocalizePrepos', 'CapitalizeSentStart']
+
+FOOD = ['čínský', 'italský', 'indický', 'český', 'francouzský', 'mexický', 'japonský', 'thajský']
+PRICERANGE = ['levný', 'drahý', 'luxusní', 'laciný']
+
+
+def create_nlg(templates, data_dir):
+    """Creates the tecto-template NLG without the cache of the realisations, the blocks which need the morphology
+    model are left out if the model is not in the data directory.
+    """
+    scenario = SCENARIO
+    if not os.path.exists(os.path.join(data_dir, SCENARIO[14]['args']['model'])):
+        scenario = [block for block in SCENARIO if block['block'].split('.')[-1] not in MORPHOLOGY_BLOCKS]
+
+    cfg = Config.load_configs(config={'NLG': {'TectoTemplate': {'model': templates,
+                                                                'scenario': scenario,
+                                                                'global_args': {'language': 'cs', 'selector': ''},
+                                                                'data_dir': data_dir,
+                                                                'cache_size': 0}}},
+                              use_default=False, log=False)
+    return TectoTemplateNLG(cfg)
+
+
+def create_das(n_das):
+    """Creates the dialogue acts of the tecto-templates with all the combinations of the values."""
+    das = ['affirm()&inform(task="find")&inform(pricerange="%s")' % p for p in PRICERANGE]
+    das += ['affirm()&inform(task="find")&inform(food="%s")&inform(pricerange="%s")' % (f, p)
+            for f, p in itertools.product(FOOD, PRICERANGE)]
+
+    rnd = random.Random(0)
+    return [DialogueAct(rnd.choice(das)) for i in range(n_das)]
+
+
+def benchmark(nlg, das):
+    """
+    Generates the DAs one by one as the dialogue system does and realises their filled templates together
+    in one document.
+
+    :return: the time per DA generated alone, the time per distinct filled template in the document, the times
+             of the blocks per DA generated alone and the texts
+    """
+    # the filled templates are recorded as they are realised
+    filled_tpls = []
+    realise = nlg.realise
+    nlg.realise = lambda filled_tpl: filled_tpls.append(filled_tpl) or realise(filled_tpl)
+
+    nlg.nlg_rules.reset_block_times()
+    start = time.time()
+    texts = [nlg.generate(da) for da in das]
+    single_time = (time.time() - start) / len(das)
+    block_times = nlg.nlg_rules.get_block_times()
+    del nlg.realise
+
+    start = time.time()
+    batch_texts = nlg.realise_all(filled_tpls)
+    batch_time = (time.time() - start) / len(set(filled_tpls))
+
+    return single_time, batch_time, block_times, texts, batch_texts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Runs the scenario of the tecto-template NLG end to end (reading of the filled templates, the t-tree to a-tree
+        blocks and the concatenation of the tokens) and reports the time per DA and the time spent in every block.
+
+        The DAs are generated one by one as in the dialogue system and then their distinct filled templates are
+        realised together in one document. The cache of the realisations is disabled and the information messages
+        of the blocks are not logged. The blocks which need the morphology model are left out if the model is not
+        in the data directory.
+      """)
+
+    parser.add_argument('-t', '--templates', default=as_project_path('applications/TectoTplTest/nlgtemplates.cfg'),
+                        help='the tecto-templates')
+    parser.add_argument('-d', '--data_dir', default=as_project_path('applications/TectoTplTest/data/'),
+                        help='the data directory of the scenario')
+    parser.add_argument('-n', '--das', type=int, default=500,
+                        help='the number of DAs')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    nlg = create_nlg(args.templates, args.data_dir)
+    das = create_das(args.das)
+    single_time, batch_time, block_times, texts, batch_texts = benchmark(nlg, das)
+
+    print "=" * 120
+    print "Tecto-template NLG benchmark: %d DAs, %d blocks" % (len(das), len(nlg.nlg_rules.blocks))
+    print "-" * 120
+    print "one by one: %8.3f ms/DA  one document: %8.3f ms/template  different texts: %d" % \
+          (1e3 * single_time, 1e3 * batch_time, sum(1 for a, b in zip(texts, batch_texts) if a != b))
+    print "-" * 120
+    for name, block_time, avg_time in block_times:
+        print "%-40s %8.3f ms/DA" % (name, 1e3 * avg_time)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import argparse
+import itertools
+import random
+import time
+import types
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.components.slu.da import DialogueAct
+from alex.components.nlg.template import TemplateNLG
+from alex.components.nlg.exceptions import TemplateNLGException
+from alex.utils.config import as_project_path
+
+
+def match_generic_templates_by_copies(self, da, svs):
+    """The matching of the generic templates as it was before the template index: every generalised dialogue act
+    is deep-copied, rendered and looked up by its string.
+
+    It serves as the reference for the speed and the results of TemplateNLG.match_generic_templates().
+    """
+    if len(svs) == 0:
+        rng = []
+    elif len(svs) == 1:
+        rng = [1]
+    elif len(svs) == 2:
+        rng = [1, 2]
+    else:
+        rng = [1, len(svs) - 1, len(svs)]
+
+    for r in rng:
+        for cmb in itertools.combinations(svs, r):
+            generic_da = self.get_generic_da_given_svs(da, cmb)
+            try:
+                gda, tpls = self.gtemplates[unicode(generic_da)]
+                tpl = self.random_select(tpls)
+            except KeyError:
+                continue
+            return tpl, gda
+
+    raise TemplateNLGException("No match with generic templates.")
+
+
+def create_das(nlg, n_composed):
+    """Creates the dialogue acts of the PTI system: every template with concrete values filled in for its generic
+    slots and the DAs composed of several templates, as the policy joins the acts of a turn.
+    """
+    das = []
+    for k in sorted(nlg.templates):
+        da = DialogueAct(k)
+        for dai in da:
+            if dai.value and dai.value.startswith('{'):
+                dai.value = '%s_value' % dai.name
+        das.append(da)
+
+    rnd = random.Random(0)
+    template_das = list(das)
+    for i in range(n_composed):
+        da = DialogueAct()
+        for template_da in rnd.sample(template_das, rnd.randint(2, 4)):
+            da.extend(DialogueAct(unicode(template_da)).dais)
+        das.append(da)
+
+    return das
+
+
+def generate(nlg, da):
+    """Generates the text of the DA, the templates which need the values filled in by the PTI preprocessing
+    fail without it, which is reported instead of the text."""
+    try:
+        return nlg.generate(da)
+    except KeyError as e:
+        return 'KeyError: %s' % e
+
+
+def benchmark(nlg, das, repeat):
+    """
+    Generates all the dialogue acts with the reference and the indexed matching of the generic templates.
+
+    :return: the time per DA for both versions and the number of differences in the generated texts
+    """
+    results = []
+    for match in [match_generic_templates_by_copies, TemplateNLG.match_generic_templates.im_func]:
+        nlg.match_generic_templates = types.MethodType(match, nlg)
+
+        random.seed(0)
+        start = time.clock()
+        for i in range(repeat):
+            texts = [generate(nlg, da) for da in das]
+        results.append(((time.clock() - start) / repeat / len(das), texts))
+
+    del nlg.match_generic_templates
+    diffs = sum(1 for a, b in zip(results[0][1], results[1][1]) if a != b)
+
+    return results[0][0], results[1][0], diffs
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Compares the generation of the PTI dialogue acts with the generic templates matched by deep-copying and
+        rendering every generalised DA with the generic templates matched in the compiled template index.
+
+        The DAs are the PTI templates filled with concrete values and DAs composed of several templates, which are
+        generated by the composition of the templates.
+      """)
+
+    parser.add_argument('-t', '--templates', default=as_project_path('applications/PublicTransportInfoCS/nlg_templates.cfg'),
+                        help='the templates')
+    parser.add_argument('-c', '--composed', type=int, default=500,
+                        help='the number of DAs composed of several templates')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='the number of repetitions')
+    args = parser.parse_args()
+
+    nlg = TemplateNLG({'NLG': {'Template': {'model': args.templates}}})
+    das = create_das(nlg, args.composed)
+    reference_time, indexed_time, diffs = benchmark(nlg, das, args.repeat)
+
+    print "=" * 120
+    print "Template NLG benchmark: %d DAs, %d generic templates" % (len(das), len(nlg.gtemplates))
+    print "-" * 120
+    print "copies: %8.3f ms/DA  index: %8.3f ms/DA  speed-up: %6.1f  different texts: %d" % \
+          (1e3 * reference_time, 1e3 * indexed_time, reference_time / indexed_time, diffs)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import argparse
+import codecs
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+import numpy as np
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.components.slu.da import DialogueAct
+from alex.components.nlg.common import get_nlg_type, nlg_factory
+from alex.utils.config import Config
+
+PERCENTILES = [50, 90, 95, 99, 100]
+
+# the NLG of the worker process
+_nlg = None
+
+
+def create_nlg(configs, templates, nlg_type):
+    """Creates the NLG of the configs or, without configs, a NLG of the given type with just the templates.
+
+    :param templates: the templates which replace the templates of the configs, if given
+    """
+    if configs:
+        cfg = Config.load_configs(configs, use_default=False, log=False)
+        nlg_type = get_nlg_type(cfg)
+    else:
+        cfg = Config.load_configs(config={'NLG': {'type': nlg_type, nlg_type: {}}}, use_default=False, log=False)
+
+    if templates:
+        cfg['NLG'][nlg_type]['model'] = templates
+
+    return nlg_factory(nlg_type, cfg)
+
+
+def init_worker(configs, templates, nlg_type):
+    global _nlg
+    _nlg = create_nlg(configs, templates, nlg_type)
+
+
+def get_cache_stats(nlg):
+    """Returns the hits and misses of the cache of the realisations, if the NLG has one."""
+    return getattr(nlg, 'realisations_hits', 0), getattr(nlg, 'realisations_misses', 0)
+
+
+def generate(args):
+    """
+    Generates the text of a DA repeatedly by the NLG of the worker process. The random selection of the templates
+    is seeded for every generation, so the texts are the same in every run.
+
+    :return: the DA, the text or None, the error or None, the times of the generations and the cache hits and misses
+    """
+    da, repeat = args
+
+    text, error, times = None, None, []
+    hits, misses = get_cache_stats(_nlg)
+    try:
+        for i in range(repeat):
+            random.seed(0)
+            start = time.time()
+            text = _nlg.generate(DialogueAct(da))
+            times.append(time.time() - start)
+    except Exception as e:
+        text, error = None, '%s: %s' % (type(e).__name__, e)
+    new_hits, new_misses = get_cache_stats(_nlg)
+
+    return da, text, error, times, new_hits - hits, new_misses - misses
+
+
+def create_das(nlg, values):
+    """Creates the dialogue acts of all the templates with the generic values filled in.
+
+    The values are taken from the given dictionary, from the ontology of the NLG or made up from the slot names.
+    """
+    slots = {}
+    ontology = getattr(nlg, 'ontology', None)
+    if ontology is not None and 'slots' in ontology:
+        slots = ontology['slots']
+
+    das = []
+    for k in sorted(nlg.templates):
+        da = DialogueAct(k)
+        for dai in da:
+            if dai.value and dai.value.startswith('{'):
+                if dai.name in values:
+                    dai.value = values[dai.name]
+                elif slots.get(dai.name):
+                    dai.value = sorted(slots[dai.name])[0]
+                else:
+                    dai.value = '%s_value' % dai.name
+        das.append(unicode(da))
+
+    return das
+
+
+def check(das, configs, templates, nlg_type, repeat, n_jobs):
+    """
+    Generates the texts of the DAs in a pool of worker processes.
+
+    :return: the list of the results of generate() in the order of the DAs and the wall time
+    """
+    start = time.time()
+    pool = multiprocessing.Pool(n_jobs, init_worker, (configs, templates, nlg_type))
+    try:
+        results = pool.map(generate, [(da, repeat) for da in das], chunksize=max(1, len(das) // (4 * n_jobs)))
+    finally:
+        pool.close()
+        pool.join()
+
+    return results, time.time() - start
+
+
+def print_latencies(name, latencies):
+    print "%-12s" % name + "  ".join("p%d: %8.3f" % (p, 1e3 * v)
+                                     for p, v in zip(PERCENTILES, np.percentile(latencies, PERCENTILES))) + " ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Generates the texts of all the templates of a template NLG in a pool of processes and reports the failures,
+        the percentiles of the latencies of the templates and the hit rate of the cache of the realisations
+        (TectoTemplateNLG).
+
+        The generic values of the templates are filled in from a JSON dictionary of the values of the slots, from
+        the ontology of the NLG or by the names of the slots. The first generation of a template is reported as cold,
+        the next ones as warm.
+
+        The texts can be saved and compared with the texts of a previous run. The exit status is 1 if any template
+        fails, if any text differs from the reference or if the 95th percentile of the cold latencies exceeds
+        the limit.
+
+        Example:
+          ./check_templates.py -c ../../applications/PublicTransportInfoCS/ptics.cfg -s ptics_texts.json
+      """)
+
+    parser.add_argument('-c', '--configs', nargs='+', default=[],
+                        help='the configs of the NLG')
+    parser.add_argument('-t', '--templates', default=None,
+                        help='the templates, they replace the templates of the configs')
+    parser.add_argument('--type', default='Template',
+                        help='the type of the NLG created without configs: Template or TectoTemplate')
+    parser.add_argument('-v', '--values', default=None,
+                        help='a JSON dictionary of the values of the slots')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='the number of generations of every template')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='the number of processes')
+    parser.add_argument('-s', '--save', default=None,
+                        help='save the texts into a JSON file')
+    parser.add_argument('-e', '--reference', default=None,
+                        help='compare the texts with the texts saved by a previous run')
+    parser.add_argument('-l', '--max_latency', type=float, default=None,
+                        help='the limit of the 95th percentile of the cold latencies in milliseconds')
+    parser.add_argument('-n', '--n_listed', type=int, default=10,
+                        help='the number of the listed failures, differences and slowest templates')
+    args = parser.parse_args()
+
+    if not args.configs and not args.templates:
+        parser.error('Either the configs or the templates must be given.')
+
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout)
+
+    values = {}
+    if args.values:
+        with codecs.open(args.values, 'r', 'utf-8') as f:
+            values = json.load(f)
+
+    das = create_das(create_nlg(args.configs, args.templates, args.type), values)
+    results, wall_time = check(das, args.configs, args.templates, args.type, args.repeat, args.jobs)
+
+    texts = dict((da, text) for da, text, _, _, _, _ in results if text is not None)
+    failures = [(da, error) for da, _, error, _, _, _ in results if error is not None]
+    times = [t for _, _, _, t, _, _ in results if t]
+    hits = sum(h for _, _, _, _, h, _ in results)
+    misses = sum(m for _, _, _, _, _, m in results)
+
+    diffs = []
+    if args.reference:
+        with codecs.open(args.reference, 'r', 'utf-8') as f:
+            reference = json.load(f)
+        diffs = [(da, reference.get(da), texts.get(da)) for da in das if reference.get(da) != texts.get(da)]
+
+    if args.save:
+        with codecs.open(args.save, 'w', 'utf-8') as f:
+            json.dump(texts, f, ensure_ascii=False, indent=0, sort_keys=True)
+
+    print "=" * 120
+    print "NLG templates check: %d templates, %d generated, %d failed, %d jobs, %.1f templates/s" % \
+          (len(das), len(texts), len(failures), args.jobs, len(das) / wall_time)
+    print "-" * 120
+    if times:
+        print_latencies("cold", [t[0] for t in times])
+        warm_times = [np.mean(t[1:]) for t in times if len(t) > 1]
+        if warm_times:
+            print_latencies("warm", warm_times)
+    if hits + misses:
+        print "cache       hits: %d  misses: %d  hit rate: %.1f %%" % (hits, misses, 100.0 * hits / (hits + misses))
+    else:
+        print "cache       not used"
+
+    if failures:
+        print "-" * 120
+        print "Failures:"
+        for da, error in failures[:args.n_listed]:
+            print "  %s\n    %s" % (da, error)
+    if args.reference:
+        print "-" * 120
+        print "Differences from the reference: %d" % len(diffs)
+        for da, ref_text, text in diffs[:args.n_listed]:
+            print "  %s\n    - %s\n    + %s" % (da, ref_text, text)
+    if times:
+        print "-" * 120
+        print "Slowest templates (cold):"
+        slowest = sorted(((t[0], da) for da, _, _, t, _, _ in results if t), reverse=True)
+        for t, da in slowest[:args.n_listed]:
+            print "  %8.3f ms  %s" % (1e3 * t, da)
+    print "=" * 120
+
+    slow = args.max_latency is not None and times and \
+        1e3 * np.percentile([t[0] for t in times], 95) > args.max_latency
+    if failures or diffs or slow:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,7 @@ from alex.components.nlg.tectotpl.core.block import Block
 from alex.components.nlg.tectotpl.core.exception import LoadingException
 from alex.components.nlg.tectotpl.tool.ml.model import Model
 from alex.components.nlg.tectotpl.core.util import first
+from collections import OrderedDict
 import re
 import os.path
 
@@ -24,6 +25,8 @@ class GenerateWordForms(Block):
     Arguments:
         language: the language of the target tree
         selector: the selector of the target tree
+        cache_size: the number of inflections of lemmas and tags remembered
+            (default 10000)
     """
 
     BACK_REGEX = re.compile(r'^>([0-9]+)(.*)$')
@@ -37,6 +40,9 @@ class GenerateWordForms(Block):
             raise LoadingException('Language must be defined!')
         self.model = None
         self.model_file = args['model']
+        # LRU cache of the inflections of lemmas with tags
+        self.inflections = OrderedDict()
+        self.cache_size = args.get('cache_size', 10000)
 
     def load(self):
         """\
@@ -45,11 +51,29 @@ class GenerateWordForms(Block):
         self.model = Model.load_from_file(os.path.join(self.scenario.data_dir,
                                                        self.model_file))
 
+    def process_document(self, doc):
+        """\
+        Inflect word forms in the a-trees of all bundles of the document,
+        classifying all the a-nodes at once.
+        """
+        anodes = []
+        for bundle in doc.bundles:
+            zone = bundle.get_zone(self.language, self.selector)
+            if zone.has_tree('a'):
+                anodes.extend(zone.get_tree('a').get_descendants(ordered=True))
+        self.inflect_anodes(anodes)
+
     def process_atree(self, aroot):
         """\
         Inflect word forms in the given a-tree.
         """
-        anodes = aroot.get_descendants(ordered=True)
+        self.inflect_anodes(aroot.get_descendants(ordered=True))
+
+    def inflect_anodes(self, anodes):
+        """\
+        Inflect word forms of the given a-nodes. The lemmas with tags which
+        are not in the cache are classified in one batch.
+        """
         # set hard form = lemma for non-inflected words
         for anode in [anode for anode in anodes
                       if anode.morphcat_pos in ['Z', 'J', 'R', '!']]:
@@ -57,41 +81,67 @@ class GenerateWordForms(Block):
         # inflect the rest
         to_process = [anode for anode in anodes
                       if anode.morphcat_pos not in ['Z', 'J', 'R', '!']]
-        instances = [self.__get_features(anode) for anode in to_process]
-        inflections = self.model.classify(instances)
-        for anode, inflection in zip(to_process, inflections):
-            self.__inflect(anode, inflection)
+        keys = [self.__get_key(anode) for anode in to_process]
+        # classify the lemmas and tags missing in the cache
+        distinct = OrderedDict.fromkeys(keys)
+        inflections = {key: self.inflections.pop(key) for key in distinct
+                       if key in self.inflections}
+        missing = [key for key in distinct if key not in inflections]
+        if missing:
+            instances = [self.__get_features(key) for key in missing]
+            inflections.update(zip(missing, self.model.classify(instances)))
+        for anode, key in zip(to_process, keys):
+            self.__inflect(anode, inflections[key])
+        # remember the inflections as the most recently used ones
+        if self.cache_size > 0:
+            for key in distinct:
+                self.inflections[key] = inflections[key]
+            while len(self.inflections) > self.cache_size:
+                self.inflections.popitem(last=False)
+
+    def __get_key(self, anode):
+        """\
+        Return the lemma and the tag values the inflection depends on.
+        """
+        return (anode.lemma, anode.morphcat_pos, anode.morphcat_subpos,
+                anode.morphcat_gender, anode.morphcat_number,
+                anode.morphcat_case, anode.morphcat_possgender,
+                anode.morphcat_possnumber, anode.morphcat_person,
+                anode.morphcat_tense, anode.morphcat_grade,
+                anode.morphcat_negation, anode.morphcat_voice)
 
-    def __get_features(self, anode):
+    def __get_features(self, key):
         """\
         Retrieve all the features needed for morphological inflection
-        and store them as a dictionary.
+        of the lemma and tag values (see __get_key) and store them as
+        a dictionary.
         """
+        lemma, pos, subpos, gen, num, cas, pge, pnu, per, ten, gra, neg, voi = key
         # add lemma and morphological information
-        feats = {'Lemma': anode.lemma,
-                 'Tag_POS': anode.morphcat_pos,
-                 'Tag_SubPOS': anode.morphcat_subpos,
-                 'Tag_Gen': anode.morphcat_gender,
-                 'Tag_Num': anode.morphcat_number,
-                 'Tag_Cas': anode.morphcat_case,
-                 'Tag_PGe': anode.morphcat_possgender,
-                 'Tag_PNu': anode.morphcat_possnumber,
-                 'Tag_Per': anode.morphcat_person,
-                 'Tag_Ten': anode.morphcat_tense,
-                 'Tag_Gra': anode.morphcat_grade,
-                 'Tag_Neg': anode.morphcat_negation,
-                 'Tag_Voi': anode.morphcat_voice}
+        feats = {'Lemma': lemma,
+                 'Tag_POS': pos,
+                 'Tag_SubPOS': subpos,
+                 'Tag_Gen': gen,
+                 'Tag_Num': num,
+                 'Tag_Cas': cas,
+                 'Tag_PGe': pge,
+                 'Tag_PNu': pnu,
+                 'Tag_Per': per,
+                 'Tag_Ten': ten,
+                 'Tag_Gra': gra,
+                 'Tag_Neg': neg,
+                 'Tag_Voi': voi}
         # concatenated features
-        cas = anode.morphcat_case or '?'
-        num = anode.morphcat_number or '?'
-        gen = anode.morphcat_gender or '?'
+        cas = cas or '?'
+        num = num or '?'
+        gen = gen or '?'
         feats['Tag_Cas-Num-Gen'] = cas + num + gen
         feats['Tag_Num-Gen'] = num + gen
         feats['Tag_Cas-Gen'] = cas + gen
         feats['Tag_Cas-Num'] = cas + num
         # add suffixes of length 1 - 8 (inclusive)
         for suff_len in xrange(1, 9):
-            feats['LemmaSuff_' + str(suff_len)] = anode.lemma[-suff_len:]
+            feats['LemmaSuff_' + str(suff_len)] = lemma[-suff_len:]
         return feats
 
     def __inflect(self, anode, inflection):
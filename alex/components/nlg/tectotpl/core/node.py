@@ -8,8 +8,8 @@ from __future__ import unicode_literals
 from alex.components.nlg.tectotpl.core.exception import RuntimeException
 from alex.components.nlg.tectotpl.core.log import log_warn
 from collections import deque
+from operator import attrgetter
 import types
-import re
 import sys
 import inspect
 from alex.components.nlg.tectotpl.core.util import as_list
@@ -19,8 +19,28 @@ __author__ = "Ondřej Dušek"
 __date__ = "2012"
 
 
+def _safe_name(attr):
+    """Return a safe version of an attribute's name
+    (mangle referencing attributes)."""
+    if attr.endswith('.rf'):
+        return '_' + attr.replace('.', '_')
+    return attr
+
+
+def _attr_slots(*attribs):
+    "Return the slots for the values of the given lists of attributes."
+    return tuple(_safe_name(attr) for attrib in attribs for attr, _ in attrib)
+
+
 class Node(object):
-    "Representing a node in a tree (recursively)"
+    """\
+    Representing a node in a tree (recursively).
+
+    The values of the attributes are kept in slots, the node classes must
+    list all attributes of their own and of their mixins in __slots__.
+    The descendants of roots are cached (the ordered ones separately, they
+    must be sorted again after any change of the ordering).
+    """
 
     __lastId = 0
     # this holds attributes used for all nodes
@@ -30,6 +50,15 @@ class Node(object):
     # (to be overridden by derived classes)
     ref_attrib = []
 
+    __slots__ = ('__zone', '__document', '__parent', '__root', '__id',
+                 '__children', '__descendants', '__ordered_descendants') + \
+        _attr_slots(attrib)
+
+    # caches of the attribute lists for the node classes
+    __attr_lists = {}
+    __attr_types = {}
+    __ref_attr_lists = {}
+
     def __init__(self, data=None, parent=None, zone=None):
         "Constructor, can create a tree recursively"
         # create a dummy data dictionary if None is passed
@@ -38,46 +67,42 @@ class Node(object):
         self.__zone = zone or (parent and parent.zone) or None
         self.__document = self.zone and self.zone.document or None
         self.__parent = None
+        self.__root = None
+        self.__children = []
+        self.__descendants = None
+        self.__ordered_descendants = None
         self.parent = parent
         # set all attributes belonging to the current node class
         # (replace '.' with '_')
-        for attr_type, safe_attr in zip(self.get_attr_list(include_types=True),
-                                        self.get_attr_list(safe=True)):
-            attr, att_type = attr_type
+        for attr, att_type, safe_attr in self.__get_attr_types():
+            value = data.get(attr)
             # initialize lists and dicts, perform simple type coercion on other
             if att_type == types.DictType:
-                setattr(self, safe_attr,
-                        data.get(attr) is not None and dict(data[attr]) or {})
+                setattr(self, safe_attr, value is not None and dict(value) or {})
             elif att_type == types.ListType:
-                setattr(self, safe_attr,
-                        data.get(attr) is not None and list(data[attr]) or [])
+                setattr(self, safe_attr, value is not None and list(value) or [])
             elif att_type == types.BooleanType:
                 # booleans need to be prepared for values such as '1' and '0'
                 setattr(self, safe_attr,
-                        data.get(attr) is not None and
-                            bool(int(data[attr])) or False)
+                        value is not None and bool(int(value)) or False)
             else:
                 # other types (int,str): be prepared for values that evaluate
                 # to false -- cannot use the and-or trick
-                if data.get(attr) is not None:
-                    val = att_type(data[attr])
-                else:
-                    val = None
-                setattr(self, safe_attr, val)
+                setattr(self, safe_attr,
+                        att_type(value) if value is not None else None)
         # set or generate id (will be indexed automatically; must be called
         # after attributes have been set due to references)
         self.id = data.get('id') or self.__generate_id()
         # create children (will add themselves to the list automatically)
-        self.__children = []
         if ('children' in data):
             # call the right constructor for each child from data
             [self.create_child(data=child_data)
              for child_data in data['children']]
 
-    def  __generate_id(self):
+    def __generate_id(self):
         "Generate successive IDs for all nodes"
         Node.__lastId += 1
-        ret = re.sub(r'^.*\.', '', self.__class__.__name__.lower()) + '-node-'
+        ret = self.__class__.__name__.lower() + '-node-'
         if self.zone:
             ret += self.zone.language_and_selector + '-'
             if self.zone.bundle:
@@ -85,14 +110,6 @@ class Node(object):
         ret += 'n' + str(Node.__lastId)
         return ret
 
-    @staticmethod
-    def __safe_name(attr):
-        """Return a safe version of an attribute's name
-        (mangle referencing attributes)."""
-        if attr.endswith('.rf'):
-            return '__' + re.sub(r'\.', '_', attr)
-        return attr
-
     def __track_backref(self, name, value):
         """Track reverse references if the given attribute contains
         references (used by set_attr)"""
@@ -125,41 +142,49 @@ class Node(object):
             self.document.remove_backref(ref_name, self.id, old_value)
             self.document.index_backref(ref_name, self.id, ref_value)
 
+    def __get_attr_types(self):
+        """Return the names, types and safe names of the attributes
+        of the current class (cached for every class)."""
+        try:
+            return Node.__attr_types[self.__class__]
+        except KeyError:
+            attrs = [(attr, atype, _safe_name(attr)) for attr, atype
+                     in self.get_attr_list(include_types=True)]
+            Node.__attr_types[self.__class__] = attrs
+            return attrs
+
     def get_attr_list(self, include_types=False, safe=False):
         """Get attributes of the current class
         (gathering all attributes of base classes)"""
         # Caching for classes
         # (since the output is always the same for the same class)
-        myclass = self.__class__
-        if not hasattr(myclass, '__attr_list_cache'):
-            myclass.__attr_list_cache = {}
+        key = (self.__class__, include_types, safe)
         # Not in cache -- must compute
-        if not (include_types, safe) in myclass.__attr_list_cache:
-            mybases = inspect.getmro(myclass)
-            attrs = [attr for cls in mybases if hasattr(cls, 'attrib') for attr in cls.attrib]
+        if not key in Node.__attr_lists:
+            mybases = inspect.getmro(self.__class__)
+            attrs = [attr for cls in mybases if hasattr(cls, 'attrib')
+                     for attr in cls.attrib]
             if safe:
-                attrs = [(Node.__safe_name(attr), atype)
-                         for attr, atype in attrs]
+                attrs = [(_safe_name(attr), atype) for attr, atype in attrs]
             if not include_types:
                 attrs = [attr for attr, atype in attrs]
-            myclass.__attr_list_cache[(include_types, safe)] = attrs
+            Node.__attr_lists[key] = attrs
         # Return the result from cache
-        return myclass.__attr_list_cache[(include_types, safe)]
+        return Node.__attr_lists[key]
 
     def get_ref_attr_list(self, split_nested=False):
         """Return a list of the attributes of the current class that
         contain references (splitting nested ones, if needed)"""
         # Caching for classes
         # (since the output is always the same for the same class)
-        myclass = self.__class__
-        if not hasattr(myclass, '__ref_attr_cache'):
-            myclass.__ref_attr_cache = {}
+        cache_key = (self.__class__, split_nested)
         # Not in cache -- must compute
-        if not split_nested in self.__class__.__ref_attr_cache:
-            mybases = inspect.getmro(myclass)
-            attrs = [attr for cls in mybases if hasattr(cls, 'ref_attrib') for attr in cls.ref_attrib]
+        if not cache_key in Node.__ref_attr_lists:
+            mybases = inspect.getmro(self.__class__)
+            attrs = [attr for cls in mybases if hasattr(cls, 'ref_attrib')
+                     for attr in cls.ref_attrib]
             if not split_nested:
-                myclass.__ref_attr_cache[split_nested] = attrs
+                Node.__ref_attr_lists[cache_key] = attrs
             else:
                 # unwind the attributes to a dictionary
                 attr_dict = {}
@@ -172,9 +197,9 @@ class Node(object):
                         if not isinstance(attr_dict.get(key), dict):
                             attr_dict[key] = {}
                         attr_dict[key][val] = True
-                myclass.__ref_attr_cache[split_nested] = attr_dict
+                Node.__ref_attr_lists[cache_key] = attr_dict
         # Return the result from cache
-        return myclass.__ref_attr_cache[split_nested]
+        return Node.__ref_attr_lists[cache_key]
 
     def get_attr(self, name):
         """Return the value of the given attribute.
@@ -182,14 +207,14 @@ class Node(object):
         if '/' in name:
             attr, path = name.split('/', 1)
             path = path.split('/')
-            obj = getattr(self, Node.__safe_name(attr))
+            obj = getattr(self, _safe_name(attr))
             for step in path:
                 if type(obj) != dict:
                     return None
                 obj = obj.get(step)
             return obj
         else:
-            return getattr(self, Node.__safe_name(name))
+            return getattr(self, _safe_name(name))
 
     def set_attr(self, name, value):
         """Set the value of the given attribute.
@@ -201,10 +226,10 @@ class Node(object):
             #prepare the attribute as a dict
             attr, path = name.split('/', 1)
             path = path.split('/')
-            obj = getattr(self, Node.__safe_name(attr))
+            obj = getattr(self, _safe_name(attr))
             if type(obj) != dict:
                 obj = {}
-                setattr(self, Node.__safe_name(attr), obj)
+                setattr(self, _safe_name(attr), obj)
             # build dict path up to the last level
             for step in path[:-1]:
                 if not step in obj:
@@ -214,7 +239,7 @@ class Node(object):
             obj[path[-1]] = value
         # plain attributes
         else:
-            setattr(self, Node.__safe_name(name), value)
+            setattr(self, _safe_name(name), value)
 
     def set_deref_attr(self, name, value):
         """This assumes the value is a node/list of nodes and
@@ -239,7 +264,7 @@ class Node(object):
         their reference types in a hash."""
         ret = {'alignment': []}
         for align in self.alignment:
-            ret['alignment'].add(align['counterpart.rf'])
+            ret['alignment'].append(align['counterpart.rf'])
         for attr in self.get_ref_attr_list():
             value = self.get_attr(attr)
             if not value:
@@ -264,11 +289,56 @@ class Node(object):
     def get_descendants(self, add_self=False, ordered=False,
                         preceding_only=False, following_only=False):
         "Return all topological descendants of this node."
-        return self._process_switches([desc for child in self.__children
-                                       for desc in
-                                       child.__descs_and_self_unsorted()],
-                                       add_self, ordered, preceding_only,
-                                       following_only)
+        if self.__parent is not None:
+            return self._process_switches([desc for child in self.__children
+                                           for desc in
+                                           child.__descs_and_self_unsorted()],
+                                          add_self, ordered, preceding_only,
+                                          following_only)
+        # the descendants of a root are taken from the cache
+        if preceding_only and following_only:
+            raise RuntimeException('Cannot return preceding_only ' +
+                                   'and following_only nodes')
+        if not (ordered or preceding_only or following_only):
+            nodes = list(self.__get_cached_descendants())
+            if add_self:
+                nodes.append(self)
+            return nodes
+        nodes = self.__get_cached_ordered_descendants()
+        if preceding_only:
+            return [node for node in nodes if node < self]
+        if following_only:
+            return [node for node in nodes if node > self]
+        if add_self:
+            return list(nodes)
+        return [node for node in nodes if node is not self]
+
+    def __get_cached_descendants(self):
+        "Return the cached descendants of a root, in any order."
+        if self.__descendants is None:
+            self.__descendants = [desc for child in self.__children
+                                  for desc in
+                                  child.__descs_and_self_unsorted()]
+        return self.__descendants
+
+    def __get_cached_ordered_descendants(self):
+        "Return the cached ordered descendants of a root, including the root."
+        if self.__ordered_descendants is None:
+            self.__ordered_descendants = self._process_switches(
+                list(self.__get_cached_descendants()), True, True, False,
+                False)
+        return self.__ordered_descendants
+
+    def _reset_ordering(self):
+        """Drop the cached ordered descendants of the root of this node,
+        must be called whenever the ordering changes."""
+        if self.__root is not None:
+            self.__root.__ordered_descendants = None
+
+    def __reset_descendants(self):
+        "Drop the cached descendants of this node as a root."
+        self.__descendants = None
+        self.__ordered_descendants = None
 
     def get_children(self, add_self=False, ordered=False,
                      preceding_only=False, following_only=False):
@@ -297,9 +367,12 @@ class Node(object):
             nodes = filter(lambda node: node < self, nodes)
         elif following_only:
             nodes = filter(lambda node: node > self, nodes)
-        # sorting
+        # sorting (directly by the ord, if possible)
         if ordered:
-            nodes.sort()
+            if isinstance(self, Ordered):
+                nodes.sort(key=attrgetter('ord'))
+            else:
+                nodes.sort()
         return nodes
 
     def create_child(self, id=None, data=None):
@@ -344,14 +417,22 @@ class Node(object):
         if self.__parent:
             self.__parent.__children = [child for child
                                         in self.__parent.__children
-                                        if child != self]
-        # set new parent and update its children, set new root
+                                        if child is not self]
+        # set new parent and update its children
         self.__parent = value
         if self.__parent:
             self.__parent.__children.append(self)
-            self.__root = self.__parent.__root
+            root = self.__parent.__root
         else:
-            self.__root = self
+            root = self
+        # the cached descendants of the original and the new root are dropped
+        if self.__root is not None:
+            self.__root.__reset_descendants()
+        root.__reset_descendants()
+        # set new root (for the whole subtree)
+        if root is not self.__root:
+            for node in self.__descs_and_self_unsorted():
+                node.__root = root
 
     def get_depth(self):
         "Return the depth, i.e. the distance to the root."
@@ -425,6 +506,19 @@ class Ordered(object):
     attrib = [('ord', types.IntType)]
     ref_attrib = []
 
+    # the value of ord is kept in the '_ord' slot of the node classes
+    __slots__ = ()
+
+    @property
+    def ord(self):
+        "The position of the node in the ordering of its tree."
+        return self._ord
+
+    @ord.setter
+    def ord(self, value):
+        self._ord = value
+        self._reset_ordering()
+
     def __lt__(self, other):
         return self.ord < other.ord
 
@@ -451,9 +545,9 @@ class Ordered(object):
         in the ordering.
         """
         subtree = other.get_descendants(ordered=True, add_self=True)
-        if len(subtree) <= 1 and self == other:
+        if len(subtree) <= 1 and self is other:
             return  # no point if self==other and there are no children
-        self.__shift_to_node(subtree[0] == self and subtree[1] or subtree[0],
+        self.__shift_to_node(subtree[0] is self and subtree[1] or subtree[0],
                              after=False)
 
     def shift_after_subtree(self, other, without_children=False):
@@ -461,9 +555,9 @@ class Ordered(object):
         Shift one node after the whole subtree of another node in the ordering.
         """
         subtree = other.get_descendants(ordered=True, add_self=True)
-        if len(subtree) <= 1 and self == other:
+        if len(subtree) <= 1 and self is other:
             return   # no point if self==other and there are no children
-        self.__shift_to_node(subtree[-1] == self
+        self.__shift_to_node(subtree[-1] is self
                              and subtree[-2] or subtree[-1], after=True)
 
     def __shift_to_node(self, other, after, without_children=False):
@@ -471,18 +565,19 @@ class Ordered(object):
         all_nodes = self.root.get_descendants(ordered=True, add_self=True)
         # determine what's being moved
         to_move = [self] if without_children else self.get_descendants(ordered=True, add_self=True)
-        moving = set(to_move)
+        # (the nodes are compared by identity, t-nodes are hashed by subtrees)
+        moving = set(id(node) for node in to_move)
         # do the moving
         cur_ord = 0
         for node in all_nodes:
             # skip nodes moved, handle them when we're at the reference node
-            if node in moving:
+            if id(node) in moving:
                 continue
             if after:
                 node.ord = cur_ord
                 cur_ord += 1
             # we're at the target node, move all needed
-            if node == other:
+            if node is other:
                 for moving_node in to_move:
                     moving_node.ord = cur_ord
                     cur_ord += 1
@@ -546,6 +641,8 @@ class EffectiveRelations(object):
     attrib = [('is_member', types.BooleanType)]
     ref_attrib = []
 
+    __slots__ = ()
+
     def is_coap_root(self):
         """\
         Testing whether the node is a coordination/apposition root.
@@ -683,6 +780,8 @@ class InClause(object):
               ('is_clause_head', types.BooleanType)]
     ref_attrib = []
 
+    __slots__ = ()
+
     def get_clause_root(self):
         "Return the root of the clause the current node resides in."
         # default to self if clause number is not defined
@@ -731,6 +830,9 @@ class T(Node, Ordered, EffectiveRelations, InClause):
     ref_attrib = ['a/lex.rf', 'a/aux.rf', 'compl.rf', 'coref_gram.rf',
                   'coref_text.rf']
 
+    __slots__ = ('_ord',) + _attr_slots(attrib, EffectiveRelations.attrib,
+                                        InClause.attrib)
+
     def __init__(self, data=None, parent=None, zone=None):
         "Constructor"
         Node.__init__(self, data, parent, zone)
@@ -980,6 +1082,9 @@ class A(Node, Ordered, EffectiveRelations, InClause):
               ('p_terminal.rf', types.UnicodeType), ]
     ref_attrib = ['p_terminal.rf']
 
+    __slots__ = ('_ord',) + _attr_slots(attrib, EffectiveRelations.attrib,
+                                        InClause.attrib)
+
     morphcat_members = ['pos', 'subpos', 'gender', 'number', 'case', 'person',
                         'tense', 'negation', 'voice', 'grade', 'mood',
                         'possnumber', 'possgender']
@@ -1110,6 +1215,8 @@ class N(Node):
               ('a.rf', types.ListType), ]
     ref_attrib = ['a.rf']
 
+    __slots__ = _attr_slots(attrib)
+
     def __init__(self, data=None, parent=None, zone=None):
         "Constructor"
         Node.__init__(self, data, parent, zone)
@@ -1125,6 +1232,8 @@ class P(Node):
               ('functions', types.UnicodeType), ]
     ref_attrib = []
 
+    __slots__ = _attr_slots(attrib)
+
     def __init__(self, data=None, parent=None, zone=None):
         "Constructor"
         Node.__init__(self, data, parent, zone)
@@ -6,6 +6,7 @@
 from __future__ import unicode_literals
 import sys
 import codecs
+import time
 from alex.components.nlg.tectotpl.core import ScenarioException
 from alex.components.nlg.tectotpl.core.log import log_info
 from io import StringIO
@@ -52,6 +53,7 @@ class Scenario(object):
             self.blocks.append(class_obj(self, args))
             # load models etc.
             self.blocks[-1].load()
+        self.reset_block_times()
 
     def apply_to(self, string, language=None, selector=None):
         """
@@ -59,17 +61,56 @@ class Scenario(object):
         the first block of the scenario), return the sentence(s) of the
         given target language and selector.
         """
+        return "\n".join(self.apply_to_lines([string], language, selector))
+
+    def apply_to_lines(self, strings, language=None, selector=None):
+        """
+        Apply the whole scenario to several strings at once, joined into
+        one document (the reader creates a bundle for every line), return
+        the list of the sentences of all bundles. The blocks which process
+        whole documents may batch their work over all the strings.
+        """
         # check if we know the target language and selector
         language = language or self.global_args['language']
         selector = selector or self.global_args.get('selector', '')
         # the first block is supposed to be a reader which creates the document
-        fh = StringIO(string)
+        fh = StringIO("\n".join(strings))
+        start = time.time()
         doc = self.blocks[0].process_document(fh)
+        self.block_times[0] += time.time() - start
         # apply all other blocks
         for block_no, block in enumerate(self.blocks[1:], start=2):
             log_info('Applying block ' + str(block_no) + '/' +
                      str(len(self.blocks)) + ': ' + block.__class__.__name__)
+            start = time.time()
             block.process_document(doc)
+            self.block_times[block_no - 1] += time.time() - start
+        self.applied += 1
         # return the text of all bundles for the specified sentence
-        return "\n".join([b.get_zone(language, selector).sentence
-                          for b in doc.bundles])
+        return [b.get_zone(language, selector).sentence for b in doc.bundles]
+
+    def reset_block_times(self):
+        "Reset the times spent in the individual blocks."
+        self.block_times = [0.0] * len(self.blocks)
+        self.applied = 0
+
+    def get_block_times(self):
+        """
+        Return the names of the blocks with the total time (in seconds)
+        spent in them and the average time per application of the scenario,
+        sorted from the slowest block.
+        """
+        times = []
+        for block, block_time in zip(self.blocks, self.block_times):
+            times.append((block.__class__.__name__, block_time,
+                          block_time / max(self.applied, 1)))
+        return sorted(times, key=lambda t: t[1], reverse=True)
+
+    def log_block_times(self):
+        "Log the times spent in the individual blocks."
+        total = sum(self.block_times) or 1.0
+        log_info('Block times after ' + str(self.applied) + ' applications:')
+        for name, block_time, avg_time in self.get_block_times():
+            log_info('%-30s %10.3f s %10.3f ms/appl. %6.1f %%' %
+                     (name, block_time, 1000 * avg_time,
+                      100 * block_time / total))
@@ -20,9 +20,11 @@ except:
     from sklearn.metrics import zero_one_loss as zero_one_score
 from alex.components.nlg.tectotpl.tool.ml.dataset import DataSet
 from sklearn.dummy import DummyClassifier
+from sklearn.feature_extraction import DictVectorizer
 from alex.components.nlg.tectotpl.core.exception import RuntimeException
 from alex.components.nlg.tectotpl.tool.cluster import Job
 import numpy as np
+import scipy.sparse as sp
 import pickle
 import marshal
 import re
@@ -291,6 +293,11 @@ class Model(AbstractModel):
             # TODO pre-filtering here?
             return data.as_bunch(target=self.class_attr,
                                  select_attrib=self.select_attr).data
+        # a fitted DictVectorizer: the dictionaries are vectorized directly
+        if self.vectorizer_trained and \
+                isinstance(self.vectorizer, DictVectorizer) and \
+                not isinstance(data, DataSet):
+            return self.__vectorize_dicts(data)
         # vectorization needed: converted to dictionary
         # and passed to the vectorizer
         if isinstance(data, DataSet):
@@ -309,6 +316,39 @@ class Model(AbstractModel):
             self.vectorizer_trained = True
         return self.vectorizer.transform(data).tocsr()
 
+    def __vectorize_dicts(self, data):
+        """\
+        Vectorize a list of dictionaries using the vocabulary of the fitted
+        DictVectorizer, selecting and filtering the attributes on the way.
+        Gives the same sparse matrix as the vectorizer without building
+        the filtered dictionaries.
+        """
+        vocab = self.vectorizer.vocabulary_
+        separator = self.vectorizer.separator
+        dtype = self.vectorizer.dtype
+        select_attr = set(self.select_attr)
+        select_attr.discard(self.class_attr)
+        indices = []
+        values = []
+        indptr = [0]
+        for inst in data:
+            for key, val in inst.iteritems():
+                if key not in select_attr or \
+                        (self.filter_attr and not self.filter_attr(key, val)):
+                    continue
+                if isinstance(val, basestring):
+                    key = '%s%s%s' % (key, separator, val)
+                    val = 1
+                idx = vocab.get(key)
+                if idx is not None:
+                    indices.append(idx)
+                    values.append(dtype(val))
+            indptr.append(len(indices))
+        matrix = sp.csr_matrix((values, indices, indptr),
+                               shape=(len(data), len(vocab)), dtype=dtype)
+        matrix.sort_indices()
+        return matrix
+
     def __filter_features(self, data, classes=None):
         """\
         Filter features according to the pre-selected filter. Return the
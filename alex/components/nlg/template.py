@@ -6,7 +6,10 @@ from __future__ import unicode_literals
 import random
 import itertools
 import copy
+import json
+import os
 import re
+from collections import OrderedDict
 
 from alex.components.slu.da import DialogueAct
 from alex.utils.config import load_as_module
@@ -62,11 +65,15 @@ class AbstractTemplateNLG(object):
             self.templates = {}
             # generalised templates
             self.gtemplates = {}
+            # generalised templates indexed by the strings of their items
+            self.gtemplates_index = {}
             for k, v in templates.iteritems():
                 da = DialogueAct(k)
                 # k.sort()
                 self.templates[unicode(da)] = v
-                self.gtemplates[unicode(self.get_generic_da(da))] = (da, v)
+                generic_da = self.get_generic_da(da)
+                self.gtemplates[unicode(generic_da)] = (da, v)
+                self.gtemplates_index[tuple(unicode(dai) for dai in generic_da)] = (da, v)
 
         except Exception as e:
             raise TemplateNLGException('No templates loaded from %s -- %s!' % (file_name, e))
@@ -100,6 +107,16 @@ class AbstractTemplateNLG(object):
                     dai.value = "{%s}" % dai.name
         return da
 
+    def get_generic_dai_str(self, dai):
+        """\
+        Returns the string of the dialogue act item with its value substituted
+        with a generic value as get_generic_da_given_svs() does it, without
+        copying the whole dialogue act.
+        """
+        generic_dai = copy.copy(dai)
+        generic_dai.value = "{%s}" % dai.name
+        return unicode(generic_dai)
+
     def match_generic_templates(self, da, svs):
         """\
         Find a matching template for a dialogue act using substitutions
@@ -107,6 +124,10 @@ class AbstractTemplateNLG(object):
 
         Returns a matching template and a dialogue act where values of some
         of the slots are substituted with a generic value.
+
+        The generalised dialogue acts are not copied and rendered, they are
+        looked up in the template index by the tuples of the strings of
+        their items.
         """
         tpl = None
         # try to find increasingly generic templates
@@ -120,11 +141,27 @@ class AbstractTemplateNLG(object):
         else:
             rng = [1, len(svs) - 1, len(svs)]
 
+        # the keys of the generalised templates are composed of the strings
+        # of the dialogue act items and of their generic versions, remember
+        # which items are generalised by every slot and value
+        dais = [unicode(dai) for dai in da]
+        generic_dais = list(dais)
+        generalised = []
+        for name, value in svs:
+            generalised.append([])
+            for i, dai in enumerate(da):
+                if dai.name == name and dai.value == value:
+                    generic_dais[i] = self.get_generic_dai_str(dai)
+                    generalised[-1].append(i)
+
         for r in rng:
-            for cmb in itertools.combinations(svs, r):
-                generic_da = self.get_generic_da_given_svs(da, cmb)
+            for cmb in itertools.combinations(generalised, r):
+                key = list(dais)
+                for indexes in cmb:
+                    for i in indexes:
+                        key[i] = generic_dais[i]
                 try:
-                    gda, tpls = self.gtemplates[unicode(generic_da)]
+                    gda, tpls = self.gtemplates_index[tuple(key)]
                     tpl = self.random_select(tpls)
                 except KeyError:
                     continue
@@ -316,8 +353,9 @@ class AbstractTemplateNLG(object):
             dax_len = None
             # greedily look for the longest template that will cover the next
             # dialogue act items (try longer templates first, from maximum
-            # length given in settings down to 1).
-            for sub_len in xrange(self.compose_greedy_lookahead, 0, -1):
+            # length given in settings down to 1, windows longer than the rest
+            # of the DA would only repeat the same lookups).
+            for sub_len in xrange(min(self.compose_greedy_lookahead, len(da) - sub_start), 0, -1):
                 dax = DialogueAct()
                 dax.extend(da[sub_start:sub_start + sub_len])
                 try:
@@ -434,6 +472,10 @@ class TemplateNLGPostprocessing(object):
 class TectoTemplateNLG(AbstractTemplateNLG):
     """\
     Template generation using tecto-trees and NLG rules.
+
+    The realisations of the filled templates are cached, the size of the cache
+    is set by 'cache_size' (0 disables it) and 'cache_file' names an optional
+    file which keeps the realisations between restarts.
     """
 
     def __init__(self, cfg):
@@ -455,6 +497,90 @@ class TectoTemplateNLG(AbstractTemplateNLG):
         # load NLG system
         self.nlg_rules = Scenario(mycfg)
         self.nlg_rules.load_blocks()
+        # cache of the realisations of the filled templates, the least
+        # recently used ones are dropped; the new realisations are appended
+        # to the cache file, which warm-starts the cache after a restart
+        self.realisations = OrderedDict()
+        self.realisations_size = mycfg.get('cache_size', 10000)
+        self.realisations_file = mycfg.get('cache_file')
+        self.realisations_hits = self.realisations_misses = 0
+        if self.realisations_file:
+            self.load_realisations(self.realisations_file)
+
+    def load_realisations(self, file_name):
+        """\
+        Load the cached realisations of the filled templates from a file
+        with one JSON-encoded pair of a filled template and its realisation
+        per line. The file is compacted if the cache is enabled and the file
+        contains many more lines than the cache can hold.
+        """
+        if not os.path.exists(file_name):
+            return
+        n_lines = 0
+        with open(file_name, 'r') as fh:
+            for line in fh:
+                n_lines += 1
+                try:
+                    filled_tpl, text = json.loads(line)
+                except ValueError:
+                    # skip a line which was not written completely
+                    continue
+                self.realisations.pop(filled_tpl, None)
+                self._cache_realisation(filled_tpl, text)
+        if self.realisations_size > 0 and \
+                n_lines > 2 * self.realisations_size:
+            with open(file_name + '.tmp', 'w') as fh:
+                for filled_tpl, text in self.realisations.iteritems():
+                    fh.write(json.dumps([filled_tpl, text]) + '\n')
+            os.rename(file_name + '.tmp', file_name)
+
+    def _cache_realisation(self, filled_tpl, text):
+        if self.realisations_size > 0:
+            self.realisations[filled_tpl] = text
+            if len(self.realisations) > self.realisations_size:
+                self.realisations.popitem(last=False)
+
+    def _save_realisation(self, filled_tpl, text):
+        self.realisations_misses += 1
+        if self.realisations_file:
+            with open(self.realisations_file, 'a') as fh:
+                fh.write(json.dumps([filled_tpl, text]) + '\n')
+
+    def realise(self, filled_tpl):
+        """\
+        Apply the NLG rules to a filled tecto-template, the realisations
+        are cached.
+        """
+        try:
+            text = self.realisations.pop(filled_tpl)
+            self.realisations_hits += 1
+        except KeyError:
+            text = self.nlg_rules.apply_to(filled_tpl)
+            self._save_realisation(filled_tpl, text)
+        self._cache_realisation(filled_tpl, text)
+        return text
+
+    def realise_all(self, filled_tpls):
+        """\
+        Realise several filled tecto-templates, e.g. to generate test sets
+        offline or to warm up the cache. The templates which are not cached
+        are realised together in one document, so that the blocks can batch
+        their work (e.g. the morphological inflection).
+        """
+        batch = [filled_tpl for filled_tpl in OrderedDict.fromkeys(filled_tpls)
+                 if filled_tpl not in self.realisations and
+                 filled_tpl.strip() and '\n' not in filled_tpl]
+        texts = {}
+        if batch:
+            sentences = self.nlg_rules.apply_to_lines(batch)
+            # every template must have been read as one bundle
+            if len(sentences) == len(batch):
+                texts = dict(zip(batch, sentences))
+                for filled_tpl in batch:
+                    self._save_realisation(filled_tpl, texts[filled_tpl])
+                    self._cache_realisation(filled_tpl, texts[filled_tpl])
+        return [texts[filled_tpl] if filled_tpl in texts
+                else self.realise(filled_tpl) for filled_tpl in filled_tpls]
 
     def fill_in_template(self, tpl, svs):
         """\
@@ -463,4 +589,4 @@ class TectoTemplateNLG(AbstractTemplateNLG):
         """
         tpl = unicode(tpl)
         filled_tpl = tpl.format(**dict(svs))
-        return self.nlg_rules.apply_to(filled_tpl)
+        return self.realise(filled_tpl)
@@ -2,14 +2,26 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import unicode_literals
+import copy
+import json
+import os
+import tempfile
 import unittest
 
 if __name__ == "__main__":
     import autopath
 import __init__
 
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.linear_model import LogisticRegression
+
 from alex.components.slu.da import DialogueAct
 from alex.components.nlg.template import TectoTemplateNLG
+from alex.components.nlg.tectotpl.core.document import Document
+from alex.components.nlg.tectotpl.tool.ml.dataset import DataSet
+from alex.components.nlg.tectotpl.tool.ml.model import Model
+from alex.components.nlg.tectotpl.block.t2a.cs.generatewordforms import \
+    GenerateWordForms
 from alex.utils.config import Config, as_project_path
 
 CONFIG_DICT = {
@@ -81,6 +93,174 @@ class TestTectoTemplateNLG(unittest.TestCase):
             # test the result
             self.assertEqual(correct_text, generated_text)
 
+    def test_realisation_cache(self):
+        # the blocks which need the word forms are left out, they need the
+        # morphology model
+        config = copy.deepcopy(CONFIG_DICT)
+        scenario = config['NLG']['TectoTemplate']['scenario']
+        config['NLG']['TectoTemplate']['scenario'] = [
+            block for block in scenario if block['block'].split('.')[-1] not in
+            ['GenerateWordForms', 'VocalizePrepos', 'CapitalizeSentStart']]
+        config['NLG']['TectoTemplate']['cache_size'] = 1
+        fd, cache_file = tempfile.mkstemp()
+        os.close(fd)
+        config['NLG']['TectoTemplate']['cache_file'] = cache_file
+        try:
+            cfg = Config.load_configs(config=config, use_default=False,
+                                      log=False)
+            nlg = TectoTemplateNLG(cfg)
+            texts = [nlg.generate(DialogueAct(da)) for da in DAS + DAS[1:]]
+            # the last DA is realised from the cache
+            self.assertEqual(texts[2], texts[1])
+            self.assertEqual((nlg.realisations_hits, nlg.realisations_misses),
+                             (1, 2))
+            self.assertEqual(len(nlg.realisations), 1)
+            self.assertEqual(nlg.nlg_rules.applied, 2)
+            self.assertEqual(len(nlg.nlg_rules.get_block_times()),
+                             len(nlg.nlg_rules.blocks))
+            # the cache is warm-started from the file
+            nlg = TectoTemplateNLG(cfg)
+            self.assertEqual(nlg.generate(DialogueAct(DAS[1])), texts[1])
+            self.assertEqual(nlg.nlg_rules.applied, 0)
+            # the filled templates are realised together in one document
+            with open(cache_file) as fh:
+                filled_tpls = [json.loads(line)[0] for line in fh]
+            cfg['NLG']['TectoTemplate']['cache_file'] = None
+            nlg = TectoTemplateNLG(cfg)
+            self.assertEqual(nlg.realise_all(filled_tpls * 2), texts[:2] * 2)
+            self.assertEqual(nlg.nlg_rules.applied, 1)
+            # the file is not compacted when the cache is disabled
+            with open(cache_file, 'a') as fh:
+                for filled_tpl, text in zip(filled_tpls, texts):
+                    fh.write(json.dumps([filled_tpl, text]) + '\n')
+            cfg['NLG']['TectoTemplate']['cache_file'] = cache_file
+            cfg['NLG']['TectoTemplate']['cache_size'] = 0
+            nlg = TectoTemplateNLG(cfg)
+            with open(cache_file) as fh:
+                self.assertEqual(len(fh.readlines()), 4)
+            # it is compacted to the size of the cache otherwise
+            cfg['NLG']['TectoTemplate']['cache_size'] = 1
+            nlg = TectoTemplateNLG(cfg)
+            with open(cache_file) as fh:
+                self.assertEqual(len(fh.readlines()), 1)
+        finally:
+            os.remove(cache_file)
+
+
+class TestGenerateWordForms(unittest.TestCase):
+
+    LEMMAS = [('pes', '1', ''), ('pes', '2', '>2sa'), ('kočka', '1', ''),
+              ('kočka', '2', '>1y'), ('ryba', '2', '>1y')]
+
+    FORMS = ['pes', 'a', 'psa', 'a', 'kočka', 'a', 'kočky', 'a', 'ryby', 'a']
+
+    def setUp(self):
+        train = DataSet()
+        train.load_from_dict([{'Lemma': lemma, 'Tag_Cas': case,
+                               'LemmaSuff_1': lemma[-1:],
+                               'Inflection': inflection}
+                              for lemma, case, inflection in self.LEMMAS])
+        model = Model({'class_attr': 'Inflection',
+                       'select_attr': ['Lemma', 'Tag_Cas', 'LemmaSuff_1'],
+                       'vectorizer': DictVectorizer(),
+                       'classifier_class': LogisticRegression,
+                       'classifier_params': {'C': 100, 'solver': 'lbfgs',
+                                             'multi_class': 'multinomial'}})
+        model.train_on_data(train)
+        self.block = GenerateWordForms(None, {'language': 'cs',
+                                              'model': None})
+        self.block.model = model
+        # count the instances in the calls of the classifier
+        self.calls = []
+        classify = model.classify
+        model.classify = lambda instances: (self.calls.append(len(instances))
+                                            or classify(instances))
+
+    def create_document(self):
+        doc = Document()
+        for lemma, case, _ in self.LEMMAS * 2:
+            atree = doc.create_bundle().create_zone('cs', '').create_atree()
+            atree.create_child(data={'lemma': lemma,
+                                     'morphcat': {'pos': 'N', 'case': case}})
+            atree.create_child(data={'lemma': 'a',
+                                     'morphcat': {'pos': 'J'}})
+        return doc
+
+    def get_forms(self, doc):
+        return [anode.form for bundle in doc.bundles
+                for anode in bundle.get_zone('cs', '').atree.get_descendants(
+                    ordered=True)]
+
+    def test_batch_inflection(self):
+        doc = self.create_document()
+        self.block.process_document(doc)
+        self.assertEqual(self.get_forms(doc), self.FORMS * 2)
+        # one batch of the distinct lemmas and tags
+        self.assertEqual(self.calls, [5])
+        # the inflections are cached
+        self.block.process_document(self.create_document())
+        self.assertEqual(self.calls, [5])
+        # the a-trees are inflected one by one without the cache
+        self.block.cache_size = 0
+        self.block.inflections.clear()
+        doc = self.create_document()
+        for bundle in doc.bundles:
+            self.block.process_atree(bundle.get_zone('cs', '').atree)
+        self.assertEqual(self.calls, [5] + [1] * 10)
+        self.assertEqual(self.get_forms(doc), self.FORMS * 2)
+
+
+class TestNode(unittest.TestCase):
+
+    def create_atree(self, doc=None):
+        doc = doc or Document()
+        atree = doc.create_bundle().create_zone('cs', '').create_atree()
+        for ord, lemma in enumerate(['c', 'a', 'b'], start=1):
+            atree.create_child(data={'lemma': lemma, 'ord': ord})
+        return atree
+
+    def get_lemmas(self, node, **kwargs):
+        return [anode.lemma for anode in node.get_descendants(**kwargs)]
+
+    def test_slots(self):
+        anode = self.create_atree().get_children()[0]
+        self.assertFalse(hasattr(anode, '__dict__'))
+        self.assertRaises(AttributeError, setattr, anode, 'lemmma', 'd')
+        anode.set_attr('p_terminal.rf', 'p-node-1')
+        self.assertEqual(anode.get_attr('p_terminal.rf'), 'p-node-1')
+
+    def test_cached_descendants(self):
+        atree = self.create_atree()
+        self.assertEqual(self.get_lemmas(atree, ordered=True), ['c', 'a', 'b'])
+        # the cache is updated after shifting
+        c, a, b = atree.get_children(ordered=True)
+        c.shift_after_node(b)
+        self.assertEqual(self.get_lemmas(atree, ordered=True), ['a', 'b', 'c'])
+        self.assertEqual(self.get_lemmas(atree, following_only=True),
+                         ['a', 'b', 'c'])
+        self.assertEqual(self.get_lemmas(c, add_self=True, ordered=True),
+                         ['c'])
+        # ... after setting the ord directly
+        a.ord = 10
+        self.assertEqual(self.get_lemmas(atree, ordered=True), ['b', 'c', 'a'])
+        # ... after moving and removing nodes
+        b.parent = c
+        self.assertEqual(b.root, atree)
+        self.assertEqual(self.get_lemmas(c), ['b'])
+        d = b.create_child(data={'lemma': 'd', 'ord': 5})
+        self.assertEqual(self.get_lemmas(atree, ordered=True),
+                         ['b', 'c', 'd', 'a'])
+        a.remove()
+        self.assertEqual(self.get_lemmas(atree, ordered=True),
+                         ['b', 'c', 'd'])
+        # a subtree moved to another tree gets the new root
+        other_atree = self.create_atree(atree.document)
+        b.parent = other_atree
+        self.assertEqual(d.root, other_atree)
+        self.assertEqual(self.get_lemmas(atree), ['c'])
+        self.assertEqual(self.get_lemmas(other_atree, ordered=True),
+                         ['c', 'a', 'b', 'b', 'd'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import itertools
 import unittest
 
 if __name__ == "__main__":
@@ -9,6 +10,7 @@ import __init__
 
 from alex.components.slu.da import DialogueAct
 from alex.components.nlg.template import TemplateNLG
+from alex.components.nlg.exceptions import TemplateNLGException
 from alex.utils.config import Config, as_project_path
 
 CONFIG_DICT = {
@@ -74,5 +76,30 @@ class TestTemplateNLG(unittest.TestCase):
 
         self.assertEqual(unicode(correct_text), unicode(generated_text))
 
+    def test_generic_templates(self):
+
+        cfg = self.cfg
+        nlg = TemplateNLG(cfg)
+
+        for k in sorted(nlg.templates):
+            da = DialogueAct(k)
+            for dai in da:
+                if dai.value and dai.value.startswith('{'):
+                    dai.value = dai.name + '_value'
+            svs = da.get_slots_and_values()
+
+            # the first generalised DA found in the templates by its string
+            expected = None
+            for r in sorted(set([1, len(svs) - 1, len(svs)]) - set([-1, 0])):
+                for cmb in itertools.combinations(svs, r):
+                    generic_da = unicode(nlg.get_generic_da_given_svs(da, cmb))
+                    if expected is None and generic_da in nlg.gtemplates:
+                        expected = nlg.gtemplates[generic_da][0]
+
+            try:
+                self.assertIs(nlg.match_generic_templates(da, svs)[1], expected)
+            except TemplateNLGException:
+                self.assertIsNone(expected)
+
 if __name__ == '__main__':
     unittest.main()
@@ -40,6 +40,7 @@ class CategoryLabelDatabase(object):
 
        - instead of testing all surface forms from the CLDB from the longest to the shortest in the utterance, we test
          all the substrings in the utterance from the longest to the shortest
+       - the longest surface forms are found by walking a word trie of all surface forms, see ``iter_longest_forms``
 
 
     """
@@ -49,6 +50,9 @@ class CategoryLabelDatabase(object):
         self.forms = []
         self.form_value_cl = []
         self.form2value2cl = nesteddict()
+        self.form_trie = {}
+        self.form2other_label = {}
+        self.word2other_label = {}
 
         if file_name:
             self.load(file_name)
@@ -99,6 +103,8 @@ class CategoryLabelDatabase(object):
         self.gen_synonym_value_category()
         self.gen_form_value_cl_list()
         self.gen_mapping_form2value2cl()
+        self.gen_form_trie()
+        self.gen_other_labels()
 
         self._form_val_upname = None
         self._form_upnames_vals = None
@@ -153,6 +159,72 @@ class CategoryLabelDatabase(object):
 
         self.forms.sort(key=lambda f: len(f), reverse=True)
 
+    def gen_form_trie(self):
+        """
+        Generates a word level trie of all surface forms in the database. Each node of the trie is a dictionary mapping
+        the next word to the child node. The node where a surface form ends stores the form under the ``None`` key.
+
+        :return: none
+        """
+        self.form_trie = {}
+        for form in self.form2value2cl:
+            if not form:
+                continue
+
+            node = self.form_trie
+            for word in form:
+                node = node.setdefault(word, {})
+            node[None] = form
+
+    def gen_other_labels(self):
+        """
+        Generates the mapping of the surface forms to the CL_OTHER_* labels of their categories, which the SLU uses
+        to abstract the surface forms other than the one being classified, and its subset of the single word forms
+        keyed by the word.
+
+        :return: none
+        """
+        self.form2other_label = {}
+        for form in self.form2value2cl:
+            for value in self.form2value2cl[form]:
+                for cl in self.form2value2cl[form][value]:
+                    self.form2other_label[form] = 'CL_OTHER_' + cl.upper()
+
+        self.word2other_label = dict((form[0], label) for form, label in self.form2other_label.iteritems()
+                                     if len(form) == 1)
+
+    def iter_longest_forms(self, utterance):
+        """
+        Scans the utterance from left to right and yields the longest surface forms from the database found in
+        the utterance. Once a surface form is found, the scan continues right after its end; therefore, the yielded
+        surface forms do not overlap.
+
+        The values and category labels of the yielded surface forms can be looked up in ``form2value2cl``.
+
+        :param utterance: an Utterance instance or a list of words
+        :return: an iterator over (start, end, form) tuples where form == tuple(utterance[start:end])
+        """
+        words = list(utterance)
+
+        start = 0
+        while start < len(words):
+            node = self.form_trie
+            form, end = None, start
+            for idx in xrange(start, len(words)):
+                node = node.get(words[idx])
+                if node is None:
+                    break
+                if None in node:
+                    form, end = node[None], idx + 1
+
+            if form:
+                yield start, end, form
+
+                # skip all substring for this form
+                start = end
+            else:
+                start += 1
+
 
 class SLUPreprocessing(object):
     """Implements preprocessing of utterances or utterances and dialogue acts.
@@ -15,7 +15,7 @@ from alex.components.slu.exceptions import SLUException, DialogueActException, D
     DialogueActConfusionNetworkException
 from alex.ml.exceptions import NBListException
 from alex.ml.features import Abstracted
-from alex.ml.hypothesis import Hypothesis, NBList, ConfusionNetwork
+from alex.ml.hypothesis import Hypothesis, NBList, ConfusionNetwork, iter_kbest
 from alex.utils.text import split_by
 
 
@@ -948,6 +948,22 @@ class DialogueActConfusionNetwork(SLUHypothesis, ConfusionNetwork):
         res.sort(reverse=True)
         return res
 
+    def iter_da_hyps(self):
+        """Lazily generates the dialogue act hypotheses from the most probable one.
+
+        Each dialogue act item is either included in the hypothesis (index 0)
+        or excluded (index 1).  The generation can be stopped at any time by
+        the caller.
+
+        Returns a generator of (prob, hyp_index) tuples.
+
+        """
+        # The log-probabilities only order the search. The probabilities of the
+        # generated hypotheses are computed as the plain product so that they
+        # do not differ in rounding from get_prob.
+        for logprob, hyp_index in iter_kbest([[p, 1.0 - p] for p, dai in self.cn]):
+            yield self.get_prob(hyp_index), hyp_index
+
     def get_da_nblist(self, n=10, prune_prob=0.005):
         """Parses the input dialogue act item confusion network and generates N-best hypotheses.
 
@@ -959,46 +975,13 @@ class DialogueActConfusionNetwork(SLUHypothesis, ConfusionNetwork):
 
         """
 
-        #print "cn", [(p, unicode(dai)) for p, dai in self.cn]
-
-        open_hyp = []
         closed_hyp = {}
-
-        for j, (p, dai) in enumerate(self.cn):
-            if p < 0.5:
-                i = j
-                break
-        else:
-            i = len(self.cn)
-
-        # create index for the best hypothesis
-        best_hyp = tuple([0,] * i + [1,] * (len(self.cn) - i))
-        best_prob = self.get_prob(best_hyp)
-        open_hyp.append((best_prob, best_hyp))
-        # print "i, bp, bh", i, best_prob, best_hyp
-
-        i = 0
-        while open_hyp and i < n*100:
-            i += 1
-
-            current_prob, current_hyp_index = open_hyp.pop(0)
-
-            if current_hyp_index not in closed_hyp:
-                # process only those hypotheses which were not processed so far
-
-                closed_hyp[current_hyp_index] = current_prob
-                # print "current_prob, current_hyp_index:", current_prob, current_hyp_index
-
-                for hyp_index in self.get_next_worse_candidates(current_hyp_index):
-                    # print hyp_index
-                    prob = self.get_prob(hyp_index)
-                    open_hyp.append((prob, hyp_index))
-
-                open_hyp.sort(reverse=True)
-
+        for prob, hyp_index in self.iter_da_hyps():
             if len(closed_hyp) >= n:
                 break
 
+            closed_hyp[hyp_index] = prob
+
         nblist = DialogueActNBList()
         for idx in closed_hyp:
             # print "p = ",closed_hyp[idx], "hyp = ", self.get_hyp_index_dialogue_act(idx)
@@ -13,7 +13,8 @@ import cPickle as pickle
 
 from collections import defaultdict
 from sklearn.linear_model import LogisticRegression
-from scipy.sparse import lil_matrix
+from scipy.sparse import lil_matrix, csr_matrix
+from scipy.special import expit
 
 from alex.components.asr.utterance import Utterance, UtteranceHyp, UtteranceNBList, UtteranceConfusionNetwork
 from alex.components.slu.exceptions import DAILRException
@@ -23,6 +24,11 @@ from alex.utils.cache import lru_cache
 
 CONFNET2NBLIST_EXPANSION_APPROX = 40
 
+# surface forms found in a confusion network with lower probability are not reported as a form, value, category tuple
+CONFNET_FORM_PRUNE_PROB = 0.005
+# partial n-grams and abstracted surface forms with lower probability are ignored in the confusion network features
+CONFNET_NGRAM_PRUNE_PROB = 0.005
+
 
 class Features(object):
     """
@@ -159,6 +165,193 @@ class UtteranceFeatures(Features):
 
 
 
+class ConfusionNetworkLattice(object):
+    """
+    This is a lattice representation of a word confusion network. It is used to extract expected n-gram features
+    from a confusion network without expanding it into an n-best list.
+
+    Attributes:
+        nodes: a list of nodes, each node is a list of outgoing edges (end, prob, words, is_word) where end is the index
+               of the target node, words is a tuple of emitted words (empty for the empty word), and is_word marks
+               the edges of the original confusion network
+        abstracted: a list of the abstracted multi-word surface forms, each of them is represented as a dictionary
+                    mapping the node index to the index of the used edge
+
+    An abstraction of a multi-word surface form adds two edges covering the form: an edge emitting the category
+    label with the probability of the form, and an edge emitting the words of the form with the negative probability.
+    Since the features are linear in the probability of the paths, the latter cancels out the paths going through
+    the original words of the surface form.
+    """
+
+    def __init__(self, confnet=None):
+        self.nodes = [[], ]
+        self.abstracted = []
+
+        if confnet is not None:
+            # long links are ignored the same way as in the UtteranceConfusionNetwork.get_utterance_nblist
+            self.nodes = [[(i + 1, p, tuple(w.split()), True) for p, w in alts] for i, alts in enumerate(confnet)]
+            self.nodes.append([])
+
+    def find_forms(self, form_trie, prune_prob=CONFNET_FORM_PRUNE_PROB):
+        """
+        Finds all surface forms from the trie on the paths of the original confusion network. The empty words inside
+        of the surface forms are skipped.
+
+        :param form_trie: a word level trie of surface forms, see CategoryLabelDatabase.gen_form_trie
+        :param prune_prob: the surface forms with lower probability are ignored
+        :return: a list of (prob, form, edges) tuples where edges maps node indices to the indices of the used edges
+        """
+        forms = []
+        for start in range(len(self.nodes)):
+            stack = [(start, form_trie, 1.0, ()), ]
+            while stack:
+                node, trie_node, prob, path = stack.pop()
+                for edge_idx, (end, p, words, is_word) in enumerate(self.nodes[node]):
+                    if not is_word or prob * p < prune_prob:
+                        continue
+
+                    if not words:
+                        # skip the empty word only inside of a surface form
+                        if trie_node is not form_trie:
+                            stack.append((end, trie_node, prob * p, path + ((node, edge_idx),)))
+                        continue
+
+                    next_trie_node = trie_node
+                    for w in words:
+                        next_trie_node = next_trie_node.get(w)
+                        if next_trie_node is None:
+                            break
+                    else:
+                        next_path = path + ((node, edge_idx),)
+                        if None in next_trie_node:
+                            forms.append((prob * p, next_trie_node[None], dict(next_path)))
+                        stack.append((end, next_trie_node, prob * p, next_path))
+
+        return forms
+
+    def abstract(self, form2label, form_trie, prune_prob=CONFNET_NGRAM_PRUNE_PROB, word2label=None):
+        """
+        Returns a new lattice where the surface forms are replaced by their labels. Single word surface forms are
+        simply renamed. A multi-word surface form is skipped if a path can go through both it and an already
+        abstracted surface form.
+
+        :param form2label: a dictionary mapping surface forms to their labels
+        :param form_trie: a word level trie of surface forms including those in form2label
+        :param prune_prob: the multi-word surface forms with lower probability are not abstracted
+        :param word2label: the labels of the single word surface forms keyed by the word, if they are precomputed,
+                           e.g. CategoryLabelDatabase.word2other_label
+        :return: a new ConfusionNetworkLattice instance
+        """
+        rename = word2label
+        if rename is None:
+            rename = dict((f[0], label) for f, label in form2label.iteritems() if len(f) == 1)
+
+        abs_lattice = ConfusionNetworkLattice()
+        abs_lattice.abstracted = list(self.abstracted)
+        abs_lattice.nodes = [[(end, p, tuple(rename.get(w, w) for w in words), is_word)
+                              for end, p, words, is_word in edges]
+                             for edges in self.nodes]
+
+        forms = [(prob, f, edges) for prob, f, edges in self.find_forms(form_trie, prune_prob)
+                 if len(f) > 1 and f in form2label]
+        forms.sort(key=lambda pfe: (-len(pfe[1]), min(pfe[2])))
+
+        for prob, f, edges in forms:
+            if any(all(edges[n] == abs_edges[n] for n in shared)
+                   for abs_edges in abs_lattice.abstracted
+                   for shared in [set(edges) & set(abs_edges)] if shared):
+                continue
+
+            start, last = min(edges), max(edges)
+            end = self.nodes[last][edges[last]][0]
+            words = tuple(rename.get(w, w) for n in sorted(edges) for w in self.nodes[n][edges[n]][2])
+
+            abs_lattice.nodes[start].append((end, prob, (form2label[f],), False))
+            abs_lattice.nodes[start].append((end, -prob, words, False))
+            abs_lattice.abstracted.append(edges)
+
+        return abs_lattice
+
+
+class ConfusionNetworkFeatures(Features):
+    """
+    This is a confusion network version of the UtteranceFeatures. The features are the expected values of
+    the UtteranceFeatures over all paths in a ConfusionNetworkLattice. The expected n-gram counts are computed
+    in one pass over the lattice nodes and they are clipped at 1.0 since the UtteranceFeatures are binary.
+    """
+
+    def __init__(self, type='ngram', size=3, lattice=None, prune_prob=CONFNET_NGRAM_PRUNE_PROB):
+        super(ConfusionNetworkFeatures, self).__init__()
+
+        self.type = type
+        self.size = size
+        self.prune_prob = prune_prob
+
+        if lattice:
+            self.parse(lattice)
+
+    def parse(self, lattice):
+        last = len(lattice.nodes) - 1
+
+        # the probability of reaching the node, the probability of reaching the node by empty words only,
+        # and the probability of n-grams (shorter than self.size) which can be still extended in the node
+        alpha = [0.0] * len(lattice.nodes)
+        empty = [0.0] * len(lattice.nodes)
+        partial = [defaultdict(float) for node in lattice.nodes]
+        counts = defaultdict(float)
+
+        alpha[0] = empty[0] = 1.0
+        counts[('<s>',)] = 1.0
+        if self.size > 1:
+            partial[0][('<s>',)] = 1.0
+
+        for node, edges in enumerate(lattice.nodes):
+            ngrams = [(ngram, m) for ngram, m in partial[node].iteritems() if abs(m) >= self.prune_prob]
+
+            for end, p, words, is_word in edges:
+                alpha[end] += alpha[node] * p
+
+                if not words:
+                    empty[end] += empty[node] * p
+                    for ngram, m in ngrams:
+                        partial[end][ngram] += m * p
+                    continue
+
+                extended = [(ngram, m * p) for ngram, m in ngrams]
+                for w in words:
+                    new_extended = []
+                    for ngram, m in extended:
+                        ngram += (w,)
+                        counts[ngram] += m
+                        if len(ngram) < self.size:
+                            new_extended.append((ngram, m))
+
+                    counts[(w,)] += alpha[node] * p
+                    if self.size > 1:
+                        new_extended.append(((w,), alpha[node] * p))
+
+                    extended = new_extended
+
+                for ngram, m in extended:
+                    partial[end][ngram] += m
+
+        for ngram, m in partial[last].iteritems():
+            counts[ngram + ('</s>',)] += m
+        counts[('</s>',)] += alpha[last]
+
+        skip_counts = defaultdict(float)
+        for ngram, m in counts.iteritems():
+            if 3 <= len(ngram) <= 6:
+                skip_counts[(ngram[0], '*%d' % (len(ngram) - 2), ngram[-1])] += m
+        counts.update(skip_counts)
+
+        self.features[('_bias_',)] = 1.0
+        self.features[('_empty_',)] = empty[last]
+        for ngram, m in counts.iteritems():
+            if m > self.prune_prob:
+                self.features[ngram] = min(m, 1.0)
+
+
 class DAILogRegClassifier(SLUInterface):
     """Implements learning of dialogue act item classifiers based on logistic
     regression.
@@ -180,11 +373,24 @@ class DAILogRegClassifier(SLUInterface):
 
     """
 
-    def __init__(self, cldb, preprocessing, features_size=4, *args, **kwargs):
+    def __init__(self, cldb, preprocessing, features_size=4, compiled=True, confnet_native=False, *args, **kwargs):
         self.features_size = features_size
         self.cldb = cldb
         self.preprocessing = preprocessing
 
+        # if set, the confusion networks are parsed directly using the expected n-gram features instead of parsing
+        # the n-best list generated from the confusion network; the features differ, therefore, the model must be
+        # trained on confusion networks in this mode, the flag is stored with the model
+        self.confnet_native = confnet_native
+
+        # if set, all classifiers are evaluated at once using the stacked weight matrix, see compile_model()
+        self.compiled = compiled
+        self.compiled_classifiers = None
+        self.compiled_cl_values = None
+        self.compiled_features_mapping = None
+        self.compiled_weights = None
+        self.compiled_intercepts = None
+
     def __repr__(self):
         r = "DAILogRegClassifier({cldb},{preprocessing},{features_size})"\
             .format(cldb=self.cldb, preprocessing=self.preprocessing, features_size=self.features_size)
@@ -200,31 +406,12 @@ class DAILogRegClassifier(SLUInterface):
 
         abs_utts = []
 
-        start = 0
-        while start < len(utterance):
-            end = len(utterance)
-            while end > start:
-                f = tuple(utterance[start:end])
-                #print start, end
-                #print f
-
-                if f in self.cldb.form2value2cl:
-                    for v in self.cldb.form2value2cl[f]:
-                        for c in self.cldb.form2value2cl[f][v]:
-                            u = copy.deepcopy(utterance)
-                            u = u.replace2(start, end, 'CL_' + c.upper())
-
-                            abs_utts.append((u, f, v, c))
-
-                    #print f
-
-                    # skip all substring for this form
-                    start = end
-                    break
-                end -= 1
-            else:
-                start += 1
+        for start, end, f in self.cldb.iter_longest_forms(utterance):
+            for v in self.cldb.form2value2cl[f]:
+                for c in self.cldb.form2value2cl[f][v]:
+                    u = utterance.replace2(start, end, 'CL_' + c.upper())
 
+                    abs_utts.append((u, f, v, c))
 
         return abs_utts
 
@@ -244,20 +431,12 @@ class DAILogRegClassifier(SLUInterface):
             return abs_utt
 
         start = 0
-        while start < len(utterance):
-            end = len(utterance)
-            while end > start:
-                f = tuple(utterance[start:end])
-                #print start, end
-                #print f, form
-
-                if f == form:
-                    abs_utt = abs_utt.replace2(start, end, c)
-
-                    # skip all substring for this form
-                    start = end
-                    break
-                end -= 1
+        while start <= len(utterance) - len(form):
+            if tuple(utterance[start:start + len(form)]) == form:
+                abs_utt = abs_utt.replace2(start, start + len(form), c)
+
+                # skip all substring for this form
+                start += len(form)
             else:
                 start += 1
 
@@ -273,25 +452,10 @@ class DAILogRegClassifier(SLUInterface):
 
         abs_utt = copy.deepcopy(utterance)
 
-        start = 0
-        while start < len(utterance):
-            end = len(utterance)
-            while end > start:
-                f = tuple(utterance[start:end])
-                #print start, end
-                #print f
-
-                if f in self.cldb.form2value2cl:
-                    for v in self.cldb.form2value2cl[f]:
-                        for c in self.cldb.form2value2cl[f][v]:
-                            abs_utt = abs_utt.replace2(start, end, 'CL_OTHER_' + c.upper())
-
-                    # skip all substring for this form
-                    start = end
-                    break
-                end -= 1
-            else:
-                start += 1
+        for start, end, f in self.cldb.iter_longest_forms(utterance):
+            for v in self.cldb.form2value2cl[f]:
+                for c in self.cldb.form2value2cl[f][v]:
+                    abs_utt = abs_utt.replace2(start, end, 'CL_OTHER_' + c.upper())
 
         return abs_utt
 
@@ -325,26 +489,13 @@ class DAILogRegClassifier(SLUInterface):
 
         fvcs = set()
 
-        start = 0
-        while start < len(utterance):
-            end = len(utterance)
-            while end > start:
-                f = tuple(utterance[start:end])
-
-                # this looks for an exact surface form in the CLDB
-                # however, we could also search for those withing a some distance from the exact surface form,
-                # for example using a string edit distance
-                if f in self.cldb.form2value2cl:
-                    for v in self.cldb.form2value2cl[f]:
-                        for c in self.cldb.form2value2cl[f][v]:
-                            fvcs.add((f, v, c))
-
-                    # skip all substring for this form
-                    start = end
-                    break
-                end -= 1
-            else:
-                start += 1
+        # this looks for an exact surface form in the CLDB
+        # however, we could also search for those withing a some distance from the exact surface form,
+        # for example using a string edit distance
+        for start, end, f in self.cldb.iter_longest_forms(utterance):
+            for v in self.cldb.form2value2cl[f]:
+                for c in self.cldb.form2value2cl[f][v]:
+                    fvcs.add((f, v, c))
 
         return fvcs
 
@@ -371,9 +522,29 @@ class DAILogRegClassifier(SLUInterface):
         :param nblist: an UtteranceConfusionNetwork instance
         :return: a list of form, value, and category label tuples found in the input sentence
         """
-        nblist = confnet.get_utterance_nblist(n=CONFNET2NBLIST_EXPANSION_APPROX)
+        if self.confnet_native:
+            fvcs = set()
+            lattice = self.get_confnet_lattice_features(confnet)[0]
+            for prob, f, edges in lattice.find_forms(self.cldb.form_trie):
+                for v in self.cldb.form2value2cl[f]:
+                    for c in self.cldb.form2value2cl[f][v]:
+                        fvcs.add((f, v, c))
+
+            return fvcs
+
+        nblist = self.get_confnet_nblist(confnet)
+
+        return self.get_fvc_in_nblist(nblist)
+
+    @lru_cache(maxsize=1000)
+    def get_confnet_nblist(self, confnet):
+        """
+        Return the n-best list generated from the confusion network.
 
-        return self.get_fvc_in_confnet(nblist)
+        :param confnet: an UtteranceConfusionNetwork instance
+        :return: an UtteranceNBList instance
+        """
+        return confnet.get_utterance_nblist(n=CONFNET2NBLIST_EXPANSION_APPROX)
 
     @lru_cache(maxsize=1000)
     def get_fvc(self, obs):
@@ -440,9 +611,61 @@ class DAILogRegClassifier(SLUInterface):
 
         return feat
 
+    @lru_cache(maxsize=1000)
+    def get_confnet_lattice_features(self, confnet):
+        """
+        Return the lattice of the confusion network, the expected n-gram features of the lattice and of the lattice
+        where all surface forms are abstracted, and the global features of the confusion network. They are shared by
+        all abstractions, therefore, they are computed only once per confusion network.
+
+        The global features replace the n-best list features: the probability of the best path and the probability
+        mass outside the best path.
+
+        :param confnet: an UtteranceConfusionNetwork instance
+        :return: a tuple of a ConfusionNetworkLattice, two ConfusionNetworkFeatures, and a dictionary of global
+                 features
+        """
+        lattice = ConfusionNetworkLattice(confnet)
+        lattice_feat = ConfusionNetworkFeatures(size=self.features_size, lattice=lattice)
+        other_lattice = lattice.abstract(self.cldb.form2other_label, self.cldb.form_trie,
+                                         word2label=self.cldb.word2other_label)
+        other_feat = ConfusionNetworkFeatures(size=self.features_size, lattice=other_lattice)
+
+        best_prob = 1.0
+        total_prob = 1.0
+        for alts in confnet:
+            best_prob *= max(p for p, w in alts)
+            total_prob *= sum(p for p, w in alts)
+
+        cn_global = {"cn_best_prob": best_prob, "cn_other_prob": max(total_prob - best_prob, 0.0)}
+
+        return lattice, lattice_feat, other_feat, cn_global
+
     def get_features_in_confnet(self, confnet, fvc, fvcs):
-        nblist = confnet.get_utterance_nblist(n=CONFNET2NBLIST_EXPANSION_APPROX)
-        return self.get_features_in_nblist(nblist, fvc, fvcs)
+        if not self.confnet_native:
+            nblist = self.get_confnet_nblist(confnet)
+            return self.get_features_in_nblist(nblist, fvc, fvcs)
+
+        # the expected features are computed directly from the confusion network, no n-best list is generated
+        lattice, lattice_feat, other_feat, cn_global = self.get_confnet_lattice_features(confnet)
+
+        form, v, c = fvc
+        abs_feat, abs_feat2 = lattice_feat, other_feat
+        if form:
+            abs_lattice = lattice.abstract({form: c}, self.cldb.form_trie)
+            abs_lattice2 = abs_lattice.abstract(self.cldb.form2other_label, self.cldb.form_trie,
+                                                word2label=self.cldb.word2other_label)
+            abs_feat = ConfusionNetworkFeatures(size=self.features_size, lattice=abs_lattice)
+            abs_feat2 = ConfusionNetworkFeatures(size=self.features_size, lattice=abs_lattice2)
+
+        feat = UtteranceFeatures(size=self.features_size)
+        scale = 1.0 / 3
+        feat.merge(lattice_feat, weight=scale)
+        feat.merge(abs_feat, weight=scale)
+        feat.merge(abs_feat2, weight=scale)
+        feat.merge(cn_global)
+
+        return feat
 
     # @lru_cache(maxsize=1000)
     def get_features(self, obs, fvc, fvcs):
@@ -677,7 +900,7 @@ class DAILogRegClassifier(SLUInterface):
                 print "Training classifier: ", clser, ' #', n+1 , '/', len(self.classifiers)
                 print "  Matrix:            ", (len(self.classifiers_outputs[clser]), len(self.classifiers_features_list[clser]))
 
-            classifier_input = np.zeros((training_data_size, len(self.classifiers_features_list[clser])))
+            classifier_input = np.zeros((len(self.classifiers_outputs[clser]), len(self.classifiers_features_list[clser])))
             for i, feat in enumerate(self.classifiers_features[clser]):
                 classifier_input[i] = feat.get_feature_vector(self.classifiers_features_mapping[clser])
 
@@ -691,9 +914,11 @@ class DAILogRegClassifier(SLUInterface):
                 print "  Prediction mean accuracy on the training data: %6.2f" % (100.0 * mean_accuracy, )
                 print "  Size of the params:", lr.coef_.shape
 
+        self.compile_model()
+
     def save_model(self, file_name, gzip=None):
         data = [self.classifiers_features_list, self.classifiers_features_mapping, self.trained_classifiers,
-                self.parsed_classifiers, self.features_size]
+                self.parsed_classifiers, self.features_size, self.confnet_native]
 
         if gzip is None:
             gzip = file_name.endswith('gz')
@@ -716,8 +941,51 @@ class DAILogRegClassifier(SLUInterface):
             open_meth = open
 
         with open_meth(file_name, 'rb') as model_file:
-            (self.classifiers_features_list, self.classifiers_features_mapping, self.trained_classifiers,
-             self.parsed_classifiers, self.features_size) = pickle.load(model_file)
+            data = pickle.load(model_file)
+
+        # the older models do not store the confnet_native flag, they were trained on the n-best lists
+        if len(data) == 5:
+            data.append(False)
+
+        (self.classifiers_features_list, self.classifiers_features_mapping, self.trained_classifiers,
+         self.parsed_classifiers, self.features_size, self.confnet_native) = data
+
+        self.compile_model()
+
+    def compile_model(self):
+        """
+        Stacks the weight vectors of all trained classifiers into one sparse weight matrix over a shared feature
+        index. Then, all classifiers can be evaluated by a single matrix product followed by a vectorised sigmoid
+        instead of calling ``predict_proba`` of each classifier separately.
+
+        :return: none
+        """
+        self.compiled_classifiers = list(self.trained_classifiers)
+        self.compiled_cl_values = []
+        self.compiled_features_mapping = {}
+        self.compiled_intercepts = np.zeros(len(self.compiled_classifiers))
+
+        data, rows, cols = [], [], []
+        for j, clser in enumerate(self.compiled_classifiers):
+            value = self.parsed_classifiers[clser].value
+            self.compiled_cl_values.append(value if value and value.startswith('CL_') else None)
+
+            lr = self.trained_classifiers[clser]
+            coef = lr.coef_[0]
+            for f, i in self.classifiers_features_mapping[clser].iteritems():
+                if coef[i] == 0.0:
+                    continue
+                if f not in self.compiled_features_mapping:
+                    self.compiled_features_mapping[f] = len(self.compiled_features_mapping)
+
+                data.append(coef[i])
+                rows.append(self.compiled_features_mapping[f])
+                cols.append(j)
+
+            self.compiled_intercepts[j] = np.ravel(lr.intercept_)[0]
+
+        self.compiled_weights = csr_matrix((data, (rows, cols)),
+                                           shape=(len(self.compiled_features_mapping), len(self.compiled_classifiers)))
 
     def parse_X(self, utterance, verbose=False):
         if verbose:
@@ -734,7 +1002,23 @@ class DAILogRegClassifier(SLUInterface):
             print unicode(utterance)
             print unicode(utterance_fvcs)
 
+        if self.compiled:
+            da_confnet = self.parse_X_compiled(utterance, utterance_fvcs, verbose)
+        else:
+            da_confnet = self.parse_X_per_classifier(utterance, utterance_fvcs, verbose)
+
+        da_confnet.sort().merge().prune()
+
+        return da_confnet
+
+    def parse_X_per_classifier(self, utterance, utterance_fvcs, verbose=False):
+        """
+        Evaluates the trained classifiers one by one on the already normalised utterance.
 
+        :param utterance: the normalised utterance being processed in multiple formats
+        :param utterance_fvcs: a set of form, value, category label tuples found in the utterance
+        :return: an unsorted DialogueActConfusionNetwork instance
+        """
         da_confnet = DialogueActConfusionNetwork()
         for clser in self.trained_classifiers:
             if verbose:
@@ -781,7 +1065,62 @@ class DAILogRegClassifier(SLUInterface):
 
                 da_confnet.add(p[0][1], self.parsed_classifiers[clser])
 
-        da_confnet.sort().merge().prune()
+        return da_confnet
+
+    def parse_X_compiled(self, utterance, utterance_fvcs, verbose=False):
+        """
+        Evaluates all trained classifiers at once on the already normalised utterance.
+
+        The features are extracted once for the concrete classifiers and once for every form, value, category label
+        tuple which is of interest to some abstracted classifier. The resulting feature matrix is multiplied by
+        the weight matrix prepared by compile_model().
+
+        :param utterance: the normalised utterance being processed in multiple formats
+        :param utterance_fvcs: a set of form, value, category label tuples found in the utterance
+        :return: an unsorted DialogueActConfusionNetwork instance
+        """
+        if self.compiled_weights is None:
+            self.compile_model()
+
+        cl_values = set(self.compiled_cl_values)
+        abstractions = [(None, None, None), ]
+        for f, v, c in utterance_fvcs:
+            cc = "CL_" + c.upper()
+            if cc in cl_values:
+                abstractions.append((f, v, cc))
+
+        data, rows, cols = [], [], []
+        for r, fvc in enumerate(abstractions):
+            classifiers_features = self.get_features(utterance, fvc, utterance_fvcs)
+            d, c = classifiers_features.get_feature_vector_lil(self.compiled_features_mapping)
+            data.extend(d)
+            rows.extend([r, ] * len(d))
+            cols.extend(c)
+
+        classifiers_inputs = csr_matrix((data, (rows, cols)),
+                                        shape=(len(abstractions), len(self.compiled_features_mapping)))
+        p = expit(classifiers_inputs.dot(self.compiled_weights).toarray() + self.compiled_intercepts)
+
+        da_confnet = DialogueActConfusionNetwork()
+        for j, clser in enumerate(self.compiled_classifiers):
+            if verbose:
+                print "Using classifier: ", unicode(clser)
+
+            if self.compiled_cl_values[j]:
+                # process abstracted classifiers
+                for r, (f, v, cc) in enumerate(abstractions[1:], start=1):
+                    if self.compiled_cl_values[j] == cc:
+                        if verbose:
+                            print '  Probability:', p[r, j]
+
+                        dai = DialogueActItem(self.parsed_classifiers[clser].dat, self.parsed_classifiers[clser].name, v)
+                        da_confnet.add(p[r, j], dai)
+            else:
+                # process concrete classifiers
+                if verbose:
+                    print '  Probability:', p[0, j]
+
+                da_confnet.add(p[0, j], self.parsed_classifiers[clser])
 
         return da_confnet
 
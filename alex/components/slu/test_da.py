@@ -109,5 +109,28 @@ class TestDA(unittest.TestCase):
 
         self.assertEqual(unicode(merged_confnets), unicode(correct_merged_confnet))
 
+    def test_get_da_nblist(self):
+        confnet = DialogueActConfusionNetwork()
+        confnet.add(0.3, DialogueActItem('hello'))
+        confnet.add(0.8, DialogueActItem('inform', 'food', 'chinese'))
+        confnet.add(0.6, DialogueActItem('inform', 'area', 'north'))
+
+        hyps = list(confnet.iter_da_hyps())
+        self.assertEqual(len(hyps), 8)
+        self.assertEqual(hyps[0][1], (1, 0, 0))
+        for (prob1, hyp_index1), (prob2, hyp_index2) in zip(hyps, hyps[1:]):
+            self.assertGreaterEqual(prob1, prob2)
+
+        nblist = confnet.get_da_nblist(n=3)
+
+        correct_nblist = DialogueActNBList()
+        correct_nblist.add(0.7*0.8*0.6, DialogueAct('inform(food="chinese")&inform(area="north")'))
+        correct_nblist.add(0.7*0.8*0.4, DialogueAct('inform(food="chinese")'))
+        correct_nblist.add(0.3*0.8*0.6, DialogueAct('hello()&inform(food="chinese")&inform(area="north")'))
+        correct_nblist.merge()
+        correct_nblist.add_other()
+
+        self.assertEqual(unicode(nblist), unicode(correct_nblist))
+
 if __name__ == '__main__':
     unittest.main()
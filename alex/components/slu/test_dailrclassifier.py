@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import cPickle as pickle
+import os
+import tempfile
+import unittest
+
+if __name__ == "__main__":
+    import autopath
+import __init__
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from alex.components.asr.utterance import Utterance, UtteranceNBList, UtteranceConfusionNetwork
+from alex.components.slu.base import CategoryLabelDatabase, SLUPreprocessing
+from alex.components.slu.da import DialogueActItem
+from alex.components.slu.dailrclassifier import DAILogRegClassifier, ConfusionNetworkLattice, ConfusionNetworkFeatures
+
+
+class TestDAILogRegClassifier(unittest.TestCase):
+    def setUp(self):
+        cldb = CategoryLabelDatabase(None)
+        cldb.database = {
+            'food': {'chinese': ['chinese', 'chinese food'], 'indian': ['indian', ]},
+            'area': {'centre': ['centre', 'city centre'], 'north': ['north', ]},
+        }
+        cldb.normalise_database()
+        cldb.gen_synonym_value_category()
+        cldb.gen_form_value_cl_list()
+        cldb.gen_mapping_form2value2cl()
+        cldb.gen_form_trie()
+        cldb.gen_other_labels()
+
+        self.slu = DAILogRegClassifier(cldb, SLUPreprocessing(cldb), features_size=3)
+        self.utterances = [Utterance('i want chinese food in the city centre'),
+                           Utterance('anything in the north'),
+                           Utterance('thank you goodbye'),
+                           Utterance('indian please')]
+
+        # train the classifiers on random targets; only the agreement of both parsing modes is tested
+        rnd = np.random.RandomState(0)
+        self.slu.classifiers_features_list = {}
+        self.slu.classifiers_features_mapping = {}
+        self.slu.trained_classifiers = {}
+        self.slu.parsed_classifiers = {}
+        for clser in ['inform(food="CL_FOOD")', 'inform(area="CL_AREA")', 'bye()', 'thankyou()', 'affirm()']:
+            dai = DialogueActItem()
+            dai.parse(clser)
+            self.slu.parsed_classifiers[clser] = dai
+
+            fvc = (None, None, None)
+            feats = []
+            for utt in self.utterances:
+                fvcs = self.slu.get_fvc_in_utterance(utt)
+                for f, v, c in fvcs:
+                    if dai.value == 'CL_' + c.upper():
+                        fvc = (f, v, dai.value)
+                feats.append(self.slu.get_features(utt, fvc, fvcs))
+
+            features_list = sorted(set(f for feat in feats for f in feat))
+            mapping = dict((f, i) for i, f in enumerate(features_list))
+            inputs = np.array([feat.get_feature_vector(mapping) for feat in feats])
+
+            lr = LogisticRegression('l2', C=1.0, tol=1e-6)
+            lr.fit(inputs, [0, 1, 0, 1] if rnd.rand() > 0.5 else [1, 0, 1, 0])
+
+            self.slu.classifiers_features_list[clser] = features_list
+            self.slu.classifiers_features_mapping[clser] = mapping
+            self.slu.trained_classifiers[clser] = lr
+
+        self.slu.compile_model()
+
+    def assertSameConfnet(self, obs):
+        self.slu.compiled = False
+        expected = self.slu.parse_X(obs)
+        self.slu.compiled = True
+        parsed = self.slu.parse_X(obs)
+
+        self.assertEqual([unicode(dai) for p, dai in expected], [unicode(dai) for p, dai in parsed])
+        for (p1, dai1), (p2, dai2) in zip(expected, parsed):
+            self.assertAlmostEqual(p1, p2)
+
+    def test_fvc_in_utterance(self):
+        utt = Utterance('chinese food in the city centre or chinese in the north centre')
+
+        self.assertEqual(list(self.slu.cldb.iter_longest_forms(utt)),
+                         [(0, 2, ('chinese', 'food')), (4, 6, ('city', 'centre')), (7, 8, ('chinese', )),
+                          (10, 11, ('north', )), (11, 12, ('centre', ))])
+        self.assertEqual(self.slu.get_fvc_in_utterance(utt),
+                         set([(('chinese', 'food'), 'chinese', 'food'), (('city', 'centre'), 'centre', 'area'),
+                              (('chinese', ), 'chinese', 'food'), (('north', ), 'north', 'area'),
+                              (('centre', ), 'centre', 'area')]))
+
+    def test_compiled_utterance(self):
+        for utt in self.utterances + [Utterance('cheap chinese'), Utterance('')]:
+            self.assertSameConfnet(utt)
+
+    def test_compiled_nblist(self):
+        nblist = UtteranceNBList()
+        nblist.add(0.6, self.utterances[0])
+        nblist.add(0.3, self.utterances[1])
+        nblist.add(0.1, self.utterances[3])
+        nblist.merge().normalise().sort()
+
+        self.assertSameConfnet(nblist)
+
+    def test_confnet_features(self):
+        confnet = UtteranceConfusionNetwork()
+        confnet.add([[0.6, 'chinese'], [0.4, '']])
+        confnet.add([[0.5, 'food'], [0.5, 'please']])
+
+        features = ConfusionNetworkFeatures(size=2, lattice=ConfusionNetworkLattice(confnet)).features
+        self.assertAlmostEqual(features[('_empty_',)], 0.0)
+        self.assertAlmostEqual(features[('<s>', 'chinese')], 0.6)
+        self.assertAlmostEqual(features[('<s>', 'food')], 0.2)
+        self.assertAlmostEqual(features[('chinese', 'food')], 0.3)
+        self.assertAlmostEqual(features[('please', '</s>')], 0.5)
+        self.assertAlmostEqual(features[('<s>', 'please')], 0.2)
+
+        abs_lattice = ConfusionNetworkLattice(confnet).abstract({('chinese', 'food'): 'CL_FOOD'},
+                                                                self.slu.cldb.form_trie)
+        features = ConfusionNetworkFeatures(size=2, lattice=abs_lattice).features
+        self.assertAlmostEqual(features[('CL_FOOD',)], 0.3)
+        self.assertAlmostEqual(features[('chinese', 'food')], 0.0)
+        self.assertAlmostEqual(features[('chinese', 'please')], 0.3)
+        self.assertAlmostEqual(features[('food',)], 0.2)
+
+    def test_confnet_native(self):
+        # all paths fit into the n-best list and no word is repeated in a path, hence both modes must agree
+        # on the n-gram features; the global features differ
+        confnet = UtteranceConfusionNetwork()
+        confnet.add([[0.7, 'indian'], [0.3, 'chinese']])
+        confnet.add([[0.6, 'in'], [0.4, '']])
+        confnet.add([[0.5, 'the'], [0.5, 'city']])
+        confnet.add([[0.8, 'centre'], [0.2, 'north']])
+
+        self.slu.confnet_native = False
+        fvcs = self.slu.get_fvc_in_confnet(confnet)
+        expected = [self.slu.get_features_in_confnet(confnet, fvc, fvcs) for fvc in sorted(fvcs)]
+        da_confnet = self.slu.parse_X(confnet)
+
+        self.slu.confnet_native = True
+        self.slu.get_confnet_nblist.clear()
+        self.assertEqual(self.slu.get_fvc_in_confnet(confnet), fvcs)
+        for fvc, feat in zip(sorted(fvcs), expected):
+            native_feat = self.slu.get_features_in_confnet(confnet, fvc, fvcs)
+            for f in set(feat.features) | set(native_feat.features):
+                if isinstance(f, basestring):
+                    # the global features
+                    continue
+                self.assertAlmostEqual(feat.features[f], native_feat.features[f])
+
+            self.assertAlmostEqual(native_feat.features['cn_best_prob'], 0.7 * 0.6 * 0.5 * 0.8)
+            self.assertAlmostEqual(native_feat.features['cn_other_prob'], 1.0 - 0.7 * 0.6 * 0.5 * 0.8)
+            self.assertNotIn('nbl_len', native_feat.features)
+
+        native_da_confnet = self.slu.parse_X(confnet)
+        self.assertEqual(self.slu.get_confnet_nblist.misses, 0)
+        self.assertEqual([unicode(dai) for p, dai in da_confnet], [unicode(dai) for p, dai in native_da_confnet])
+        for (p1, dai1), (p2, dai2) in zip(da_confnet, native_da_confnet):
+            self.assertAlmostEqual(p1, p2)
+
+    def test_save_load_model(self):
+        fn_model = tempfile.mktemp(suffix='.model')
+        try:
+            self.slu.confnet_native = True
+            self.slu.save_model(fn_model)
+
+            slu = DAILogRegClassifier(self.slu.cldb, self.slu.preprocessing)
+            slu.load_model(fn_model)
+            self.assertTrue(slu.confnet_native)
+            self.assertEqual(slu.features_size, 3)
+
+            # the older models without the confnet_native flag were trained on the n-best lists
+            with open(fn_model, 'wb') as model_file:
+                pickle.dump([self.slu.classifiers_features_list, self.slu.classifiers_features_mapping,
+                             self.slu.trained_classifiers, self.slu.parsed_classifiers, 3], model_file)
+            slu.load_model(fn_model)
+            self.assertFalse(slu.confnet_native)
+        finally:
+            if os.path.exists(fn_model):
+                os.remove(fn_model)
+
+
+if __name__ == '__main__':
+    unittest.main()
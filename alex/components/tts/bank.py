@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This code is PEP8-compliant. See http://www.python.org/dev/peps/pep-0008.
+
+from __future__ import unicode_literals
+
+import json
+import mmap
+import struct
+
+from alex.components.tts import TTSInterface
+from alex.components.tts.exceptions import TTSException
+from alex.components.tts.preprocessing import split_into_segments
+
+""" The prompt bank is an archive of the audio of the prompts synthesized in advance.
+
+The archive is a single file with a header, the audio of all the prompts in the default format and a JSON index
+of the prompts:
+
+    MAGIC | the offset of the index (8 bytes, little endian) | audio ... | index
+
+The index maps the normalised texts of the prompts to the offsets and the lengths of their audio and stores
+the sample rate of the audio.
+
+"""
+
+MAGIC = b'ALEXPB1\n'
+HEADER = struct.Struct(b'<8sQ')
+
+
+def normalise_text(text):
+    """Returns the key of the text in the prompt bank, which does not depend on the white space."""
+    return ' '.join(text.split())
+
+
+def save_prompt_bank(file_name, sample_rate, prompts):
+    """
+    Writes the prompts into a prompt bank.
+
+    :param prompts: an iterable of the texts and their audio in the default format
+    :return: the number of the prompts in the bank
+    """
+    index = {}
+    with open(file_name, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, 0))
+
+        offset = HEADER.size
+        for text, wav in prompts:
+            text = normalise_text(text)
+            if text in index:
+                continue
+
+            f.write(wav)
+            index[text] = (offset, len(wav))
+            offset += len(wav)
+
+        f.write(json.dumps({'sample_rate': sample_rate, 'prompts': index}, ensure_ascii=False,
+                           sort_keys=True).encode('utf-8'))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, offset))
+
+    return len(index)
+
+
+class PromptBank(object):
+    """Reads the audio of the prompts from a memory-mapped prompt bank, the audio is read from the file only as it
+    is served and the pages of the file are shared by all the processes which open the bank.
+    """
+
+    def __init__(self, file_name):
+        with open(file_name, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, index_offset = HEADER.unpack(self.mmap[:HEADER.size])
+        if magic != MAGIC:
+            raise TTSException('Not a prompt bank: %s' % file_name)
+
+        index = json.loads(self.mmap[index_offset:].decode('utf-8'))
+        self.sample_rate = index['sample_rate']
+        self.prompts = index['prompts']
+
+    def __len__(self):
+        return len(self.prompts)
+
+    def __contains__(self, text):
+        return normalise_text(text) in self.prompts
+
+    def get(self, text):
+        """Returns the audio of the prompt or None if the prompt is not in the bank."""
+        try:
+            offset, length = self.prompts[normalise_text(text)]
+        except KeyError:
+            return None
+
+        return self.mmap[offset:offset + length]
+
+    def close(self):
+        self.mmap.close()
+
+
+class PromptBankTTS(TTSInterface):
+    """
+    Serves the audio of the prompts from a prompt bank and synthesizes the rest by a live TTS engine.
+
+    A text is served from the bank if it is in the bank as a whole. Otherwise, the text is split into segments
+    as the TTS component splits the prompts and the segments in the bank are served from it, the rest are
+    synthesized by the live engine. The counts of the texts served as a whole, of the texts served by segments
+    and of the texts synthesized by the live engine are kept in hits, segment_hits and misses.
+
+    """
+
+    def __init__(self, cfg, fallback=None):
+        super(PromptBankTTS, self).__init__(cfg)
+
+        self.bank = PromptBank(self.cfg['TTS']['PromptBank']['file'])
+        if self.bank.sample_rate != self.cfg['Audio']['sample_rate']:
+            raise TTSException('The sample rate of the prompt bank %d does not match the sample rate %d.' %
+                               (self.bank.sample_rate, self.cfg['Audio']['sample_rate']))
+
+        self.fallback = fallback
+        self.hits = self.segment_hits = self.misses = 0
+
+    def synthesize_live(self, text):
+        if self.fallback is None:
+            self.cfg['Logging']['system_logger'].warning('The prompt is not in the prompt bank: %s' % text)
+            return b""
+
+        return self.fallback.synthesize(text)
+
+    def synthesize(self, text):
+        """
+        Returns the audio of the text in default format and sample rate from the prompt bank or synthesized
+        by the live engine.
+        """
+        wav = self.bank.get(text)
+        if wav is not None:
+            self.hits += 1
+            return wav
+
+        segments = split_into_segments(text)
+        wavs = [self.bank.get(segment) for segment in segments]
+        if len(segments) > 1 and any(wav is not None for wav in wavs):
+            self.segment_hits += 1
+            return b''.join(wav if wav is not None else self.synthesize_live(segment)
+                            for segment, wav in zip(segments, wavs))
+
+        self.misses += 1
+        return self.synthesize_live(text)
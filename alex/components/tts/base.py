@@ -1,9 +1,16 @@
 #!/usr/bin/env python
 # coding: utf-8
 
+import alex.utils.cache as cache
+
+
 class TTSInterface(object):
     def __init__(self, cfg):
         self.cfg = cfg
 
+        # the budget of the persistent cache of the synthesized audio
+        if 'persistent_cache' in self.cfg['TTS']:
+            cache.configure_persistent_cache(**self.cfg['TTS']['persistent_cache'])
+
     def synthesize(self, text):
         raise NotImplementedError("TTS")
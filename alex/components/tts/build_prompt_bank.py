@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import argparse
+import codecs
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.components.nlg.common import get_nlg_type, nlg_factory
+from alex.components.slu.base import CategoryLabelDatabase
+from alex.components.slu.da import DialogueAct
+from alex.components.tts.bank import normalise_text, save_prompt_bank
+from alex.components.tts.common import get_tts_type, tts_factory
+from alex.components.tts.preprocessing import split_into_segments
+from alex.utils.config import Config
+
+# the TTS engine of the worker process
+_tts = None
+
+
+def init_worker(configs):
+    global _tts
+    cfg = Config.load_configs(configs, log=False)
+    tts_type = get_tts_type(cfg)
+    if tts_type == 'PromptBank':
+        tts_type = cfg['TTS']['PromptBank']['fallback']
+    _tts = tts_factory(tts_type, cfg)
+
+
+def synthesize(text):
+    """
+    Synthesizes the text by the TTS engine of the worker process.
+
+    :return: the text, the audio or None and the error or None
+    """
+    try:
+        return text, _tts.synthesize(text), None
+    except Exception as e:
+        return text, None, '%s: %s' % (type(e).__name__, e)
+
+
+def expand_template(tpl):
+    """Yields all the alternatives of a template, see AbstractTemplateNLG.random_select()."""
+    if isinstance(tpl, basestring):
+        yield tpl
+        return
+
+    for tpl_or in tpl:
+        if isinstance(tpl_or, basestring):
+            yield tpl_or
+        else:
+            for tpls_and in itertools.product(*[list(expand_template(t)) for t in tpl_or]):
+                yield ' '.join(tpls_and).replace('  ', ' ')
+
+
+def get_slot_values(slot, values, cldb):
+    """Returns the values of the slot from the given dictionary or from the category of the CLDB named as the slot
+    or as its last part, e.g. stop for from_stop."""
+    if slot in values:
+        return values[slot]
+
+    if cldb is not None:
+        for category in [slot, slot.split('_')[-1]]:
+            if category in cldb.database:
+                return sorted(cldb.database[category])
+
+    return []
+
+
+def enumerate_texts(nlg, values, cldb, max_fills):
+    """
+    Enumerates the texts of all the alternatives of the templates with the generic slots filled in by at most
+    max_fills combinations of the values.
+
+    :return: the set of the texts and the number of the templates which could not be filled in
+    """
+    texts = set()
+    unfilled = 0
+    for k, tpl in sorted(nlg.templates.iteritems()):
+        generic_slots = [dai.value[1:-1] for dai in DialogueAct(k) if dai.value and dai.value.startswith('{')]
+        slot_values = [get_slot_values(slot, values, cldb) for slot in generic_slots]
+        if not all(slot_values):
+            unfilled += 1
+            continue
+
+        try:
+            for fill in itertools.islice(itertools.product(*slot_values), max_fills):
+                for alternative in expand_template(tpl):
+                    texts.add(nlg.fill_in_template(alternative, zip(generic_slots, fill)))
+        except (KeyError, IndexError, ValueError):
+            unfilled += 1
+
+    return texts, unfilled
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Builds a prompt bank: enumerates the texts of the templates of the template NLG, splits them into
+        the segments as the TTS component does, synthesizes the segments by the TTS engine of the configs in a pool
+        of processes and stores their audio in a memory-mapped archive served by the PromptBank TTS.
+
+        The generic slots of the templates are filled in from a JSON dictionary of the lists of the values
+        of the slots, ordered from the most frequent, or by the values of the CLDB categories named as the slots
+        or as their last part, e.g. stop for from_stop.
+
+        Example:
+          ./build_prompt_bank.py -c ../../applications/PublicTransportInfoCS/ptics.cfg -o ptics_prompts.bank
+      """)
+
+    parser.add_argument('-c', '--configs', nargs='+', required=True,
+                        help='the configs of the NLG and the TTS')
+    parser.add_argument('-o', '--output', required=True,
+                        help='the prompt bank')
+    parser.add_argument('-v', '--values', default=None,
+                        help='a JSON dictionary of the lists of the values of the slots')
+    parser.add_argument('--cldb', default=None,
+                        help='the CLDB with the values of the slots')
+    parser.add_argument('-n', '--max_fills', type=int, default=10,
+                        help='the maximal number of the combinations of the values filled in a template')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='the number of processes')
+    args = parser.parse_args()
+
+    sys.stdout = codecs.getwriter('utf-8')(sys.stdout)
+
+    cfg = Config.load_configs(args.configs, log=False)
+    nlg = nlg_factory(get_nlg_type(cfg), cfg)
+
+    values = {}
+    if args.values:
+        with codecs.open(args.values, 'r', 'utf-8') as f:
+            values = json.load(f)
+    cldb = CategoryLabelDatabase(args.cldb) if args.cldb else None
+
+    texts, unfilled = enumerate_texts(nlg, values, cldb, args.max_fills)
+    segments = sorted(set(normalise_text(segment) for text in texts for segment in split_into_segments(text)) - {""})
+
+    start = time.time()
+    failures = []
+    n_bytes = [0]
+
+    def synthesized(results):
+        for text, wav, error in results:
+            if error is not None or not wav:
+                failures.append((text, error or 'no audio'))
+            else:
+                n_bytes[0] += len(wav)
+                yield text, wav
+
+    pool = multiprocessing.Pool(args.jobs, init_worker, (args.configs, ))
+    try:
+        n_prompts = save_prompt_bank(args.output, cfg['Audio']['sample_rate'],
+                                     synthesized(pool.imap_unordered(synthesize, segments, chunksize=4)))
+    finally:
+        pool.close()
+        pool.join()
+    wall_time = time.time() - start
+    audio_time = n_bytes[0] / 2.0 / cfg['Audio']['sample_rate']
+
+    print "=" * 120
+    print "Prompt bank: %s" % args.output
+    print "-" * 120
+    print "templates: %d  texts: %d  segments: %d  unfilled templates: %d" % \
+          (len(nlg.templates), len(texts), len(segments), unfilled)
+    print "prompts: %d  failed: %d  audio: %.1f min  size: %.1f MB" % \
+          (n_prompts, len(failures), audio_time / 60, n_bytes[0] / 1024.0 ** 2)
+    print "synthesis: %.1f s with %d jobs, %.1f prompts/s" % (wall_time, args.jobs, n_prompts / wall_time)
+    if failures:
+        print "-" * 120
+        print "Failures:"
+        for text, error in failures[:10]:
+            print "  %s\n    %s" % (text, error)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
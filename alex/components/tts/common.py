@@ -4,6 +4,7 @@ import alex.components.tts.google as GTTS
 import alex.components.tts.flite as FTTS
 import alex.components.tts.speechtech as STTS
 import alex.components.tts.voicerss as VTTS
+import alex.components.tts.bank as BTTS
 from alex.components.tts import TTSInterface
 from alex.components.tts.exceptions import TTSException
 
@@ -25,5 +26,9 @@ def tts_factory(tts_type, cfg):
         return STTS.SpeechtechTTS(cfg)
     elif tts_type == 'VoiceRss':
         return VTTS.VoiceRssTTS(cfg)
+    elif tts_type == 'PromptBank':
+        # the prompts which are not in the bank are synthesized by the fallback engine
+        fallback = cfg['TTS']['PromptBank'].get('fallback')
+        return BTTS.PromptBankTTS(cfg, tts_factory(fallback, cfg) if fallback else None)
     else:
         raise TTSException('Unsupported TTS engine: %s' % (tts_type, ))
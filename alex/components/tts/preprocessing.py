@@ -4,6 +4,7 @@
 from __future__ import unicode_literals
 
 import re
+import string
 
 from alex.utils.config import load_as_module
 
@@ -35,3 +36,27 @@ class TTSPreprocessing(object):
             text = re.sub(pattern, repl, text)
 
         return text
+
+
+def split_into_segments(text):
+    """Splits the text into the segments which are synthesized separately, the text is split after the punctuation
+    which ends a word and is followed by a capitalised word.
+    """
+    segments = []
+    last_split = 0
+    lc = [c for c in string.lowercase]
+    lc.extend('ěščřžýáíéňťďůú')
+    up = [c for c in string.uppercase]
+    up.extend('ĚŠČŘŽÝÁÍÉŇŤĎŮÚ')
+
+    for i in range(1, len(text)-2):
+        if (text[i-1] in lc
+            and text[i] in ['.', ",", "?"]
+            and text[i+1] == " "
+            and text[i+2] in up):
+            segments.append(text[last_split:i+1])
+            last_split = i + 2
+    else:
+        segments.append(text[last_split:])
+
+    return segments
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import unicode_literals
+
+import logging
+import os
+import tempfile
+import unittest
+
+if __name__ == "__main__":
+    import autopath
+
+from alex.components.tts import TTSInterface
+from alex.components.tts.bank import PromptBank, PromptBankTTS, save_prompt_bank
+from alex.components.tts.common import tts_factory
+from alex.components.tts.exceptions import TTSException
+
+PROMPTS = [('Dobrý den.', b'\x01\x00' * 10),
+           ('Jak vám mohu pomoci?', b'\x02\x00' * 20),
+           ('Na  shledanou.', b'\x03\x00' * 30)]
+
+
+class LiveTTS(TTSInterface):
+    def synthesize(self, text):
+        return b'\x04\x00' * len(text)
+
+
+class TestPromptBank(unittest.TestCase):
+    def setUp(self):
+        fd, self.file_name = tempfile.mkstemp()
+        os.close(fd)
+        self.assertEqual(save_prompt_bank(self.file_name, 16000, PROMPTS + PROMPTS[:1]), 3)
+
+        self.cfg = {'Audio': {'sample_rate': 16000},
+                    'TTS': {'PromptBank': {'file': self.file_name, 'fallback': LiveTTS}},
+                    'Logging': {'system_logger': logging.getLogger('test_bank')}}
+
+    def tearDown(self):
+        os.remove(self.file_name)
+
+    def test_prompt_bank(self):
+        bank = PromptBank(self.file_name)
+        self.assertEqual(len(bank), 3)
+        self.assertEqual(bank.sample_rate, 16000)
+        for text, wav in PROMPTS:
+            self.assertEqual(bank.get(text), wav)
+        # the white space is normalised
+        self.assertEqual(bank.get(' Na shledanou.'), PROMPTS[2][1])
+        self.assertTrue('Dobrý  den.' in bank)
+        self.assertIsNone(bank.get('Dobrý den'))
+        bank.close()
+
+        with open(self.file_name, 'r+b') as f:
+            f.write(b'RIFF')
+        self.assertRaises(TTSException, PromptBank, self.file_name)
+
+    def test_prompt_bank_tts(self):
+        tts = tts_factory('PromptBank', self.cfg)
+        self.assertIsInstance(tts, PromptBankTTS)
+
+        self.assertEqual(tts.synthesize('Dobrý den.'), PROMPTS[0][1])
+        # the segments in the bank are served from it, the rest are synthesized live
+        self.assertEqual(tts.synthesize('Dobrý den. Jak vám mohu pomoci? Kam chcete jet?'),
+                         PROMPTS[0][1] + PROMPTS[1][1] + b'\x04\x00' * len('Kam chcete jet?'))
+        self.assertEqual(tts.synthesize('Kam chcete jet?'), b'\x04\x00' * len('Kam chcete jet?'))
+        self.assertEqual((tts.hits, tts.segment_hits, tts.misses), (1, 1, 1))
+
+        # without the live engine, the missing prompts are silent
+        tts = PromptBankTTS(self.cfg)
+        self.assertEqual(tts.synthesize('Kam chcete jet?'), b"")
+
+        self.cfg['Audio']['sample_rate'] = 8000
+        self.assertRaises(TTSException, PromptBankTTS, self.cfg)
+
+
+if __name__ == '__main__':
+    unittest.main()
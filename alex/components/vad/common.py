@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from alex.components.asr.exceptions import ASRException
+
+
+def get_vad_type(cfg):
+    """Get VAD type from the configuration."""
+    return cfg['VAD']['type']
+
+
+def vad_factory(vad_type, cfg):
+    # the VADs are imported here since they use the functions of this module
+    import alex.components.vad.power as PVAD
+    import alex.components.vad.gmm as GVAD
+    import alex.components.vad.ffnn as NNVAD
+
+    if vad_type == 'power':
+        return PVAD.PowerVAD(cfg)
+    elif vad_type == 'gmm':
+        return GVAD.GMMVAD(cfg)
+    elif vad_type == 'ffnn':
+        return NNVAD.FFNNVAD(cfg)
+    else:
+        raise ASRException('Unsupported VAD engine: %s' % (vad_type, ))
+
+
+def decide_batch_by_posteriors(vad, frames, framesize, frameshift, get_log_probs_speech):
+    """Returns the posterior probabilities of speech averaged in the smoothing window of the VAD after every input
+    frame, the frames are strings of the same length or a 2D array of samples.
+
+    The VAD keeps the audio in audio_recorded_in, a FrameBuffer of the frames of its front_end, the last log
+    posteriors of speech in the deque log_probs_speech whose length is the smoothing window, and the decision
+    for the input frames before the first frame of the front end in last_decision. All the frames of the front end
+    are scored at once by get_log_probs_speech(), which returns the log posteriors of speech for the features
+    of the frames. The decisions are the same as for the frames one by one.
+    """
+    if not isinstance(frames, np.ndarray):
+        frames = np.frombuffer(b''.join(frames), dtype=np.int16).reshape(len(frames), -1)
+
+    # the number of the complete frames of the front end after every input frame
+    n_samples = len(vad.audio_recorded_in) + frames.shape[1] * np.arange(1, len(frames) + 1)
+    n_complete = np.maximum((n_samples - framesize - 1) // frameshift + 1, 0)
+
+    vad.audio_recorded_in.append(frames.astype(np.int16).tostring())
+    frames = vad.audio_recorded_in.pop_frames()
+
+    log_probs = np.array(vad.log_probs_speech)
+    if len(frames):
+        log_probs = np.concatenate([log_probs, get_log_probs_speech(vad.front_end.param_batch(frames))])
+
+    # the averages of the log posteriors of speech in the smoothing window after every input frame
+    ends = len(vad.log_probs_speech) + n_complete
+    starts = np.maximum(ends - vad.log_probs_speech.maxlen, 0)
+    cumsum = np.concatenate([[0.0], np.cumsum(log_probs)])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        log_prob_speech_avg = (cumsum[ends] - cumsum[starts]) / (ends - starts)
+
+    decisions = np.where(ends > 0, np.exp(log_prob_speech_avg), vad.last_decision)
+
+    vad.log_probs_speech.extend(log_probs[len(vad.log_probs_speech):])
+    if len(decisions):
+        vad.last_decision = decisions[-1]
+
+    return decisions
+
+
+def smoothe_decisions(cfg, decisions, last_vad=False):
+    """Smoothes the decisions of a VAD for consecutive frames in the speech and the silence windows.
+
+    The smoothed decisions are the same as returned by VAD.smoothe_decison() of the VAD component for the decisions
+    one by one, however, the averages of the decisions in the windows are computed at once.
+
+    :return: a boolean array of the smoothed decisions, True for speech
+    """
+    decisions = np.asarray(decisions, dtype=np.float64)
+    cumsum = np.concatenate([[0.0], np.cumsum(decisions)])
+    ends = np.arange(1, len(decisions) + 1)
+
+    averages = []
+    for window in [cfg['VAD']['decision_frames_speech'], cfg['VAD']['decision_frames_sil']]:
+        starts = np.maximum(ends - window, 0)
+        averages.append((cumsum[ends] - cumsum[starts]) / (ends - starts + 1.0))
+    speech, sil = averages
+
+    vad = np.empty(len(decisions), dtype=np.bool_)
+    speech_threshold = cfg['VAD']['decision_speech_threshold']
+    non_speech_threshold = cfg['VAD']['decision_non_speech_threshold']
+    for i in range(len(decisions)):
+        if last_vad:
+            last_vad = sil[i] >= non_speech_threshold
+        else:
+            last_vad = speech[i] > speech_threshold
+        vad[i] = last_vad
+
+    return vad
+
+
+def get_speech_segments(cfg, vad):
+    """Returns the segments of speech in the smoothed decisions as sent by the VAD component.
+
+    A segment starts with the frames buffered before the change to speech, at most speech_buffer_frames frames
+    which follow the previous segment, and ends before the first frame of silence or at the end of the audio.
+
+    :return: a list of the indices of the first and after the last frames of the segments
+    """
+    edges = np.diff(np.concatenate([[0], np.asarray(vad, dtype=np.int8), [0]]))
+
+    segments = []
+    last_end = 0
+    for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+        start = max(start - cfg['VAD']['speech_buffer_frames'] + 1, last_end)
+        segments.append((int(start), int(end)))
+        last_end = end
+
+    return segments
@@ -3,14 +3,11 @@
 
 from collections import deque
 import numpy as np
-from scipy.misc import logsumexp
-import struct
-
-from math import log
 
 from alex.components.asr.exceptions import ASRException
-from alex.ml.tffnn import TheanoFFNN
-from alex.utils.mfcc import MFCCFrontEnd
+from alex.components.vad.common import decide_batch_by_posteriors
+from alex.ml.nffnn import NumpyFFNN
+from alex.utils.mfcc import MFCCFrontEnd, FrameBuffer
 
 
 class FFNNVAD():
@@ -22,13 +19,19 @@ class FFNNVAD():
     def __init__(self, cfg):
         self.cfg = cfg
 
-        self.audio_recorded_in = []
+        self.audio_recorded_in = FrameBuffer(self.cfg['VAD']['ffnn']['framesize'],
+                                             self.cfg['VAD']['ffnn']['frameshift'])
 
-        self.ffnn = TheanoFFNN()
+        # the NumPy engine loads the TheanoFFNN models without importing and compiling Theano
+        if self.cfg['VAD']['ffnn']['engine'] == 'theano':
+            from alex.ml.tffnn import TheanoFFNN
+            self.ffnn = TheanoFFNN()
+        else:
+            self.ffnn = NumpyFFNN()
         self.ffnn.load(self.cfg['VAD']['ffnn']['model'])
 
+        # log posteriors of speech in the smoothing window
         self.log_probs_speech = deque(maxlen=self.cfg['VAD']['ffnn']['filter_length'])
-        self.log_probs_sil = deque(maxlen=self.cfg['VAD']['ffnn']['filter_length'])
 
         self.last_decision = 0.0
 
@@ -47,6 +50,23 @@ class FFNNVAD():
         else:
             raise ASRException('Unsupported frontend: %s' % (self.cfg['VAD']['ffnn']['frontend'], ))
 
+    def get_log_probs_speech(self, mfcc):
+        """Returns the log posteriors of speech for the features of the frames."""
+        probs = self.ffnn.predict_normalise(mfcc)
+        log_probs_sil = np.log(probs[:, 0])
+        log_probs_speech = np.log(probs[:, 1])
+        return log_probs_speech - np.logaddexp(log_probs_speech, log_probs_sil)
+
+    def decide_batch(self, frames):
+        """Processes the input frames whether the input segments are speech or non speech.
+
+        The frames are strings of the same length or a 2D array of samples. The decisions are the same as returned
+        by decide() for the frames one by one, however, all the frames are processed at once.
+        """
+
+        return decide_batch_by_posteriors(self, frames, self.cfg['VAD']['ffnn']['framesize'],
+                                          self.cfg['VAD']['ffnn']['frameshift'], self.get_log_probs_speech)
+
     def decide(self, data):
         """Processes the input frame whether the input segment is speech or non speech.
 
@@ -54,32 +74,5 @@ class FFNNVAD():
         It returns 1.0 for 100% speech segment and 0.0 for 100% non speech segment.
         """
 
-        data = struct.unpack('%dh' % (len(data) / 2, ), data)
-        self.audio_recorded_in.extend(data)
-
-        while len(self.audio_recorded_in) > self.cfg['VAD']['ffnn']['framesize']:
-            frame = self.audio_recorded_in[:self.cfg['VAD']['ffnn']['framesize']]
-            self.audio_recorded_in = self.audio_recorded_in[self.cfg['VAD']['ffnn']['frameshift']:]
-
-            mfcc = self.front_end.param(frame)
-
-            prob_sil, prob_speech = self.ffnn.predict_normalise(mfcc.reshape(1,len(mfcc)))[0]
-
-            # print prob_sil, prob_speech
-
-            self.log_probs_speech.append(log(prob_speech))
-            self.log_probs_sil.append(log(prob_sil))
-
-            log_prob_speech_avg = 0.0
-            for log_prob_speech, log_prob_sil in zip(self.log_probs_speech, self.log_probs_sil):
-                log_prob_speech_avg += log_prob_speech - logsumexp([log_prob_speech, log_prob_sil])
-            log_prob_speech_avg /= len(self.log_probs_speech)
-
-            prob_speech_avg = np.exp(log_prob_speech_avg)
-
-            # print 'prob_speech_avg: %5.3f' % prob_speech_avg
-
-            self.last_decision = prob_speech_avg
-
         # returns a speech / non-speech decisions
-        return self.last_decision
+        return self.decide_batch([data])[0]
@@ -3,12 +3,11 @@
 
 from collections import deque
 import numpy as np
-from scipy.misc import logsumexp
-import struct
 
 from alex.components.asr.exceptions import ASRException
+from alex.components.vad.common import decide_batch_by_posteriors
 from alex.ml.gmm import GMM
-from alex.utils.mfcc import MFCCFrontEnd
+from alex.utils.mfcc import MFCCFrontEnd, FrameBuffer
 
 
 class GMMVAD():
@@ -20,15 +19,16 @@ class GMMVAD():
     def __init__(self, cfg):
         self.cfg = cfg
 
-        self.audio_recorded_in = []
+        self.audio_recorded_in = FrameBuffer(self.cfg['VAD']['gmm']['framesize'],
+                                             self.cfg['VAD']['gmm']['frameshift'])
 
         self.gmm_speech = GMM()
         self.gmm_speech.load_model(self.cfg['VAD']['gmm']['speech_model'])
         self.gmm_sil = GMM()
         self.gmm_sil.load_model(self.cfg['VAD']['gmm']['sil_model'])
 
+        # log posteriors of speech in the smoothing window
         self.log_probs_speech = deque(maxlen=self.cfg['VAD']['gmm']['filter_length'])
-        self.log_probs_sil = deque(maxlen=self.cfg['VAD']['gmm']['filter_length'])
 
         self.last_decision = 0.0
 
@@ -46,6 +46,22 @@ class GMMVAD():
         else:
             raise ASRException('Unsupported frontend: %s' % (self.cfg['VAD']['gmm']['frontend'], ))
 
+    def get_log_probs_speech(self, mfcc):
+        """Returns the log posteriors of speech for the features of the frames."""
+        log_probs_speech = self.gmm_speech.score_samples(mfcc)
+        log_probs_sil = self.gmm_sil.score_samples(mfcc)
+        return log_probs_speech - np.logaddexp(log_probs_speech, log_probs_sil)
+
+    def decide_batch(self, frames):
+        """Processes the input frames whether the input segments are speech or non speech.
+
+        The frames are strings of the same length or a 2D array of samples. The decisions are the same as returned
+        by decide() for the frames one by one, however, all the frames are processed at once.
+        """
+
+        return decide_batch_by_posteriors(self, frames, self.cfg['VAD']['gmm']['framesize'],
+                                          self.cfg['VAD']['gmm']['frameshift'], self.get_log_probs_speech)
+
     def decide(self, data):
         """Processes the input frame whether the input segment is speech or non speech.
 
@@ -53,31 +69,5 @@ class GMMVAD():
         It returns 1.0 for 100% speech segment and 0.0 for 100% non speech segment.
         """
 
-        data = struct.unpack('%dh' % (len(data) / 2, ), data)
-        self.audio_recorded_in.extend(data)
-
-        while len(self.audio_recorded_in) > self.cfg['VAD']['gmm']['framesize']:
-            frame = self.audio_recorded_in[:self.cfg['VAD']['gmm']['framesize']]
-            self.audio_recorded_in = self.audio_recorded_in[self.cfg['VAD']['gmm']['frameshift']:]
-
-            mfcc = self.front_end.param(frame)
-
-            log_prob_speech = self.gmm_speech.score(mfcc)
-            log_prob_sil = self.gmm_sil.score(mfcc)
-
-            self.log_probs_speech.append(log_prob_speech)
-            self.log_probs_sil.append(log_prob_sil)
-
-            log_prob_speech_avg = 0.0
-            for log_prob_speech, log_prob_sil in zip(self.log_probs_speech, self.log_probs_sil):
-                log_prob_speech_avg += log_prob_speech - logsumexp([log_prob_speech, log_prob_sil])
-            log_prob_speech_avg /= len(self.log_probs_speech)
-
-            prob_speech_avg = np.exp(log_prob_speech_avg)
-
-#      print 'prob_speech_avg: %5.3f' % prob_speech_avg
-
-            self.last_decision = prob_speech_avg
-
         # returns a speech / non-speech decisions
-        return self.last_decision
+        return self.decide_batch([data])[0]
@@ -1,42 +1,88 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import struct
-import math
+from collections import deque
+import numpy as np
 
 
 class PowerVAD():
     """ This is implementation of a simple power based voice activity detector.
 
     It only implements simple decisions whether input frame is speech of non speech.
+
+    The threshold of the energy is adapted to the mean energy of the first adaptation_frames frames. If
+    noise_floor_percentile is configured, the threshold keeps adapting after them: it is the given percentile
+    of the energies of the last noise_floor_window frames, which follows the level of the background noise.
     """
     def __init__(self, cfg):
         self.cfg = cfg
         self.power_threshold_adapted = self.cfg['VAD']['power']['threshold']
         self.in_frames = 0
 
-    def decide(self, frame):
-        """Returns whether the input segment is speech or non speech.
+        self.noise_floor_percentile = self.cfg['VAD']['power'].get('noise_floor_percentile')
+        self.energies = deque(maxlen=self.cfg['VAD']['power'].get('noise_floor_window', 300))
 
-        The returned values can be in range from 0.0 to 1.0.
-        It returns 1.0 for 100% speech segment and 0.0 for 100% non speech segment.
-        """
+    def get_energies(self, frames):
+        """Returns the energies of the frames, the frames are strings of the same length or a 2D array of samples."""
+
+        if not isinstance(frames, np.ndarray):
+            frames = np.frombuffer(b''.join(frames), dtype=np.int16).reshape(len(frames), -1)
+        frames = frames.astype(np.float64)
+
+        return np.sqrt(np.einsum('ij,ij->i', frames, frames)) / frames.shape[1]
+
+    def adapt_thresholds(self, energies):
+        """Returns the adapted thresholds for the energies of the consecutive frames and updates the state."""
+
+        thresholds = np.empty(len(energies))
+
+        # the threshold is the running mean of the energies of the first frames
+        n_adapted = min(max(self.cfg['VAD']['power']['adaptation_frames'] - 1 - self.in_frames, 0), len(energies))
+        for i in range(n_adapted):
+            in_frames = self.in_frames + i + 1
+            self.power_threshold_adapted = (in_frames * self.power_threshold_adapted + energies[i]) / (in_frames + 1)
+            thresholds[i] = self.power_threshold_adapted
 
-        speech_segment = 0.0
+        if n_adapted < len(energies):
+            if self.noise_floor_percentile is None:
+                thresholds[n_adapted:] = self.power_threshold_adapted
+            else:
+                # the windows of the last energies, the missing energies at the start are NaNs
+                window = self.energies.maxlen
+                n_last = min(len(self.energies), window - 1)
+                history = np.empty(window - 1 + len(energies))
+                history[:window - 1 - n_last] = np.nan
+                history[window - 1 - n_last:window - 1] = list(self.energies)[len(self.energies) - n_last:]
+                history[window - 1:] = energies
+                windows = np.lib.stride_tricks.as_strided(history[n_adapted:],
+                                                          shape=(len(energies) - n_adapted, window),
+                                                          strides=(history.strides[0], history.strides[0]))
+                percentile = np.percentile if n_last + n_adapted >= window - 1 else np.nanpercentile
+                thresholds[n_adapted:] = percentile(windows, self.noise_floor_percentile, axis=1)
+                self.power_threshold_adapted = thresholds[-1]
 
-        self.in_frames += 1
+        self.energies.extend(energies)
+        self.in_frames += len(energies)
 
-        a = struct.unpack('%dh' % (len(frame) / 2, ), frame)
-        a = [abs(x) ** 2 for x in a]
-        energy = math.sqrt(sum(a)) / len(a)
+        return thresholds
 
-        if self.in_frames < self.cfg['VAD']['power']['adaptation_frames']:
-            self.power_threshold_adapted = self.in_frames * \
-                self.power_threshold_adapted
-            self.power_threshold_adapted += energy
-            self.power_threshold_adapted /= self.in_frames + 1
+    def decide_batch(self, frames):
+        """Returns whether the input frames are speech or non speech.
 
-        if energy > self.cfg['VAD']['power']['threshold_multiplier'] * self.power_threshold_adapted:
-            speech_segment = 1.0
+        The frames are strings of the same length or a 2D array of samples. The decisions are the same as returned
+        by decide() for the frames one by one.
+        """
+
+        energies = self.get_energies(frames)
+        thresholds = self.adapt_thresholds(energies)
+
+        return (energies > self.cfg['VAD']['power']['threshold_multiplier'] * thresholds).astype(np.float64)
+
+    def decide(self, frame):
+        """Returns whether the input segment is speech or non speech.
+
+        The returned values can be in range from 0.0 to 1.0.
+        It returns 1.0 for 100% speech segment and 0.0 for 100% non speech segment.
+        """
 
-        return speech_segment
+        return self.decide_batch([frame])[0]
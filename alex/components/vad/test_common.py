@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    import autopath
+
+import unittest
+
+import numpy as np
+
+from alex.components.hub.messages import Frame
+from alex.components.hub.vad import VAD
+from alex.components.vad.common import get_speech_segments, smoothe_decisions, vad_factory
+
+
+class FakeLogger(object):
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, obj):
+        self.sent.append(obj)
+
+
+CFG = {
+    'Logging': {'system_logger': FakeLogger(), 'session_logger': FakeLogger()},
+    'VAD': {
+        'debug': False,
+        'type': 'power',
+        'speech_buffer_frames': 10,
+        'decision_frames_speech': 5,
+        'decision_frames_sil': 15,
+        'decision_speech_threshold': 0.7,
+        'decision_non_speech_threshold': 0.1,
+        'power': {'threshold': 300, 'threshold_multiplier': 2.0, 'adaptation_frames': 30},
+    },
+}
+
+
+class TestCommon(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        # noise with loud bursts of various lengths, some of them shorter than the smoothing windows
+        levels = np.full(400, 100.0)
+        for start, length in [(40, 60), (110, 3), (130, 8), (200, 100), (305, 20), (390, 10)]:
+            levels[start:start + length] = 3000.0
+        self.frames = (rnd.randn(len(levels), 256) * levels[:, np.newaxis]).astype(np.int16)
+
+    def run_component(self):
+        """Returns the indices of the frames sent by the VAD component and the smoothed decisions."""
+        audio_out = FakeConnection()
+        vad = VAD(CFG, FakeConnection(), None, audio_out, None)
+
+        frames = [Frame(frame.tostring()) for frame in self.frames]
+        indices = dict((id(frame), i) for i, frame in enumerate(frames))
+
+        decisions = []
+        for frame in frames:
+            vad.local_audio_in.append(frame)
+            vad.read_write_audio()
+            decisions.append(vad.last_vad)
+
+        return [indices[id(frame)] for frame in audio_out.sent if isinstance(frame, Frame)], decisions
+
+    def test_smoothe_decisions(self):
+        sent, decisions = self.run_component()
+
+        smoothed = smoothe_decisions(CFG, vad_factory('power', CFG).decide_batch(self.frames))
+        self.assertEqual(list(smoothed), decisions)
+
+        segments = get_speech_segments(CFG, smoothed)
+        self.assertTrue(len(segments) > 1)
+        self.assertEqual([i for start, end in segments for i in range(start, end)], sent)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    import autopath
+
+import copy
+import unittest
+
+import numpy as np
+
+from alex.components.vad.power import PowerVAD
+
+CFG = {'VAD': {'power': {'threshold': 70, 'threshold_multiplier': 1.0, 'adaptation_frames': 30}}}
+
+
+def decide_by_mean(energies, threshold, adaptation_frames):
+    """The decisions of the original PowerVAD with the threshold adapted only in the first frames."""
+    decisions = []
+    for in_frames, energy in enumerate(energies, start=1):
+        if in_frames < adaptation_frames:
+            threshold = (in_frames * threshold + energy) / (in_frames + 1)
+        decisions.append(1.0 if energy > threshold else 0.0)
+    return decisions
+
+
+class TestPowerVAD(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        # noise whose level rises ten times in the second half
+        levels = np.repeat(np.repeat([100.0, 1000.0], 50), 256)
+        self.frames = (rnd.randn(len(levels)) * levels).astype(np.int16).reshape(-1, 256)
+        samples = self.frames.astype(np.float64)
+        self.energies = np.sqrt((samples ** 2).sum(axis=1)) / 256
+
+    def decide(self, cfg, batch_sizes=(7, 50, 43)):
+        vad = PowerVAD(cfg)
+        decisions = [vad.decide(frame.tostring()) for frame in self.frames]
+
+        # the batches give the same decisions as the frames one by one
+        vad = PowerVAD(cfg)
+        batches = []
+        start = 0
+        for size in batch_sizes:
+            batches.extend(vad.decide_batch([frame.tostring() for frame in self.frames[start:start + size]]))
+            start += size
+        self.assertEqual(batches, decisions)
+
+        return decisions
+
+    def test_decide(self):
+        self.assertEqual(self.decide(CFG), decide_by_mean(self.energies, 70.0, 30))
+
+    def test_noise_floor(self):
+        cfg = copy.deepcopy(CFG)
+        cfg['VAD']['power'].update({'noise_floor_percentile': 50, 'noise_floor_window': 20})
+        decisions = self.decide(cfg)
+
+        expected = decide_by_mean(self.energies[:29], 70.0, 30)
+        for i in range(29, len(self.energies)):
+            threshold = np.percentile(self.energies[max(0, i - 19):i + 1], 50)
+            expected.append(1.0 if self.energies[i] > threshold else 0.0)
+        self.assertEqual(decisions, expected)
+
+        # the louder noise is speech for the threshold adapted in the first frames only, the noise floor follows it
+        self.assertEqual(sum(decide_by_mean(self.energies, 70.0, 30)[50:]), 50)
+        self.assertLess(sum(decisions[60:]), 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
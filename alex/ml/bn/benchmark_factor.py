@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.ml.bn.factor import Factor
+
+
+def apply_op_per_cell(f, g, op):
+    """The product of two factors as it was computed before the factor tables were broadcast: the output table is
+    walked cell by cell and the indexes into both input tables are updated by the strides of the variables.
+
+    It serves as the reference for the speed and the results of the factor operations.
+    """
+    new_variables = sorted(set(f.variables).union(g.variables))
+    new_cardinalities = dict(f.cardinalities)
+    new_cardinalities.update(g.cardinalities)
+    new_factor_table = np.empty(f._factor_table_length(new_cardinalities), np.float32)
+
+    assignment = defaultdict(int)
+    index_f = 0
+    index_g = 0
+    for i in range(len(new_factor_table)):
+        new_factor_table[i] = op(f.factor_table[index_f], g.factor_table[index_g])
+
+        for var in reversed(new_variables):
+            assignment[var] += 1
+            if assignment[var] == new_cardinalities[var]:
+                assignment[var] = 0
+                index_f -= (new_cardinalities[var] - 1) * f.strides.get(var, 0)
+                index_g -= (new_cardinalities[var] - 1) * g.strides.get(var, 0)
+            else:
+                index_f += f.strides.get(var, 0)
+                index_g += g.strides.get(var, 0)
+                break
+
+    return new_factor_table
+
+
+def marginalize_per_cell(f, keep):
+    """The marginalisation as it was computed before, every cell of the table is added to its output cell."""
+    assignment = defaultdict(int)
+    new_cardinalities = {x: f.cardinalities[x] for x in keep}
+    new_factor_table = np.empty(f._factor_table_length(new_cardinalities), np.float32)
+    new_factor_table[:] = f._zero
+    new_strides = f._compute_strides(keep, f.cardinalities, len(new_factor_table))
+
+    index = 0
+    for i in range(f.factor_length):
+        new_factor_table[index] = f._add(new_factor_table[index], f.factor_table[i])
+
+        for var in keep:
+            if (i + 1) % f.strides[var] == 0:
+                assignment[var] += 1
+                index += new_strides[var]
+            if assignment[var] == f.cardinalities[var]:
+                assignment[var] = 0
+                index -= f.cardinalities[var] * new_strides[var]
+
+    return new_factor_table
+
+
+def random_factor(rnd, variables, cardinalities):
+    table = np.log(rnd.rand(np.prod([cardinalities[var] for var in variables])).astype(np.float32))
+    return Factor(variables, {var: range(cardinalities[var]) for var in variables}, table)
+
+
+def timeit(function, repeat):
+    start = time.clock()
+    for i in range(repeat):
+        result = function()
+    return (time.clock() - start) / repeat, result
+
+
+def benchmark(cardinality, repeat):
+    """
+    Measures the operations of a transition factor of a slot, P(X1 | X0, A), with a belief over X0 and a hidden
+    action A with a few values, as they are used by the belief tracking.
+
+    :return: a list of (operation name, per-cell time, vectorised time, maximum difference)
+    """
+    rnd = np.random.RandomState(0)
+    cardinalities = {'A': 3, 'X0': cardinality, 'X1': cardinality}
+
+    transition = random_factor(rnd, ['A', 'X0', 'X1'], cardinalities)
+    belief = random_factor(rnd, ['X0'], cardinalities)
+    product = transition * belief
+
+    results = []
+    for name, reference, vectorised in [
+            ('multiply', lambda: apply_op_per_cell(transition, belief, transition._mul),
+             lambda: (transition * belief).factor_table),
+            ('divide', lambda: apply_op_per_cell(product, belief, product._div),
+             lambda: (product / belief).factor_table),
+            ('marginalize', lambda: marginalize_per_cell(product, ['X1']),
+             lambda: product.marginalize(['X1']).factor_table)]:
+        reference_time, reference_table = timeit(reference, repeat)
+        vectorised_time, vectorised_table = timeit(vectorised, repeat)
+        diff = np.max(np.abs(reference_table - vectorised_table))
+
+        results.append((name, reference_time, vectorised_time, diff))
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Compares the factor products, divisions and marginalisation computed cell by cell with the factor tables
+        broadcast as n-d arrays, for growing cardinalities of the slot variables.
+      """)
+
+    parser.add_argument('-c', '--cardinalities', type=int, nargs='+', default=[10, 30, 100, 300],
+                        help='the cardinalities of the slot variables')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='the number of repetitions of every operation')
+    args = parser.parse_args()
+
+    print "=" * 120
+    print "Factor benchmark: P(X1 | X0, A) with |A| = 3"
+    print "-" * 120
+    for cardinality in args.cardinalities:
+        for name, reference_time, vectorised_time, diff in benchmark(cardinality, args.repeat):
+            print "|X| = %4d  %-12s per-cell: %10.3f ms  vectorised: %8.3f ms  speed-up: %8.1f  " \
+                  "max. difference: %g" % (cardinality, name, 1e3 * reference_time, 1e3 * vectorised_time,
+                                           reference_time / vectorised_time, diff)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,6 @@ with probability distributions.
 import numpy as np
 import operator
 
-from collections import defaultdict
 from scipy.misc import logsumexp
 
 ZERO = 1e-20
@@ -64,6 +63,33 @@ def logsubexp(a, b):
     return a + np.log1p(-np.exp(b - a))
 
 
+def logsumexp_axes(a, axes, keepdims=False):
+    """Sum numbers in log arithmetic over the given axes.
+
+    The sum is computed in double precision.
+
+    :param a: Numbers in log arithmetic.
+    :type a: ndarray
+    :param axes: Axes which are summed out.
+    :type axes: tuple
+    :param keepdims: Whether the summed axes are left in the result with length one.
+    :type keepdims: bool
+    :returns: Sums in log arithmetic.
+    :rtype: ndarray
+    """
+    a = np.asarray(a, dtype=np.float64)
+    if not axes:
+        return a
+
+    a_max = np.max(a, axis=axes, keepdims=True)
+    a_max[~np.isfinite(a_max)] = 0.0
+
+    result = np.log(np.sum(np.exp(a - a_max), axis=axes, keepdims=True)) + a_max
+    if not keepdims:
+        result = np.squeeze(result, axis=axes)
+    return result
+
+
 class FactorError(Exception):
     pass
 
@@ -256,40 +282,12 @@ class Factor(object):
         new_cardinalities = dict(self.cardinalities)
         new_cardinalities.update(other.cardinalities)
 
-        # Compute the length of new factor table.
-        new_factor_length = self._factor_table_length(new_cardinalities)
-
-        # Create a new factor table.
-        new_factor_table = np.empty(new_factor_length, np.float32)
-
-        assignment = defaultdict(int)
-        index_self = 0
-        index_other = 0
-        reversed_variables = new_variables[::-1]
-
-        for i in range(new_factor_length):
-            # Apply the operator.
-            new_factor_table[i] = op(self.factor_table[index_self],
-                                     other.factor_table[index_other])
-
-            # Update indexes, start with variable with smallest stride.
-            for var in reversed_variables:
-                # Move to next value of a variable.
-                assignment[var] += 1
-                # If we go past the last value of one variable, we need to
-                # move onto next variable.
-                if assignment[var] == new_cardinalities[var]:
-                    assignment[var] = 0
-                    index_self -= ((new_cardinalities[var] - 1) *
-                                   self.strides.get(var, 0))
-                    index_other -= ((new_cardinalities[var] - 1) *
-                                    other.strides.get(var, 0))
-                # Otherwise we just update this variable and don't have to do
-                # anything with other variables.
-                else:
-                    index_self += self.strides.get(var, 0)
-                    index_other += other.strides.get(var, 0)
-                    break
+        # View both factor tables as arrays with an axis for each of the new
+        # variables, the variables missing in one of the factors have an axis
+        # of length one, and let the operator broadcast over them.
+        new_factor_table = op(self._table_view(new_variables, new_cardinalities),
+                              other._table_view(new_variables, new_cardinalities))
+        new_factor_table = np.ravel(new_factor_table).astype(np.float32)
 
         return Factor(new_variables,
                       new_variable_values,
@@ -330,6 +328,28 @@ class Factor(object):
                       op(self.factor_table, other),
                       self.logarithmetic)
 
+    def _table_view(self, variables, cardinalities):
+        """View the factor table as an n-d array with an axis for each of the
+        given variables.
+
+        The axes are in the order of `variables`, the variables which are not
+        in this factor get an axis of length one, so that the tables of two
+        factors can be broadcast against each other.
+
+        :param variables: Variables of the view, they must include all variables of this factor.
+        :type variables: list
+        :param cardinalities: Cardinalities of the variables.
+        :type cardinalities: dict
+        :rtype: ndarray
+        """
+        table = np.reshape(self.factor_table, [self.cardinalities[var] for var in self.variables])
+
+        own_variables = [var for var in variables if var in self.cardinalities]
+        if own_variables != self.variables:
+            table = table.transpose([self.variables.index(var) for var in own_variables])
+
+        return table.reshape([cardinalities[var] if var in self.cardinalities else 1 for var in variables])
+
     def _compute_strides(self, variables, cardinalities, factor_length):
         """Strides for variables of given factor table.
 
@@ -417,39 +437,18 @@ class Factor(object):
         :rtype: :class:`Factor`
 
         """
-        # Assignment counter
-        assignment = defaultdict(int)
-        # New cardinalities and new factor table.
-        new_cardinalities = {x: self.cardinalities[x] for x in keep}
-        new_factor_length = self._factor_table_length(new_cardinalities)
-        new_factor_table = np.empty(new_factor_length, np.float32)
-        new_factor_table[:] = self._zero
-        # Strides for resulting variables in the new factor table.
-        new_strides = self._compute_strides(keep,
-                                            self.cardinalities,
-                                            new_factor_length)
-        # Index into the new factor table.
-        index = 0
+        # Sum out the axes of the variables, which are not kept, and order the
+        # remaining axes as the variables in `keep`.
+        table = self._table_view(self.variables, self.cardinalities)
+        axes = tuple(i for i, var in enumerate(self.variables) if var not in keep)
+        if self.logarithmetic:
+            table = logsumexp_axes(table, axes)
+        else:
+            table = np.sum(table, axis=axes, dtype=np.float64)
 
-        # Iterate over every element in the old factor table and add them to
-        # the correct element in the new factor table.
-        for i in range(self.factor_length):
-            new_factor_table[index] = self._add(new_factor_table[index],
-                                                self.factor_table[i])
-
-            # Update the assignment and indexes.
-            for var in keep:
-                # The assignment of variable var changed, so we must add its
-                # stride to the index.
-                if (i + 1) % self.strides[var] == 0:
-                    assignment[var] += 1
-                    index += new_strides[var]
-                # The assignment of variable var overflowed to 0, we must
-                # subtract the cardinality from index.
-                if assignment[var] == self.cardinalities[var]:
-                    assignment[var] = 0
-                    index -= (self.cardinalities[var] *
-                              new_strides[var])
+        kept_variables = [var for var in self.variables if var in keep]
+        table = table.transpose([kept_variables.index(var) for var in keep])
+        new_factor_table = np.ravel(table).astype(np.float32)
 
         # Return new factor with marginalized variables.
         new_variable_values = {v: self.variable_values[v] for v in keep}
@@ -504,16 +503,14 @@ class Factor(object):
         :type parents: list
         """
         if parents is not None:
-            sums = defaultdict(lambda: self._zero)
-            assignments = {}
-
-            for i in range(self.factor_length):
-                value = self.factor_table[i]
-                assignments[i] = self._get_assignment_from_index(i, parents)
-                sums[assignments[i]] = self._add(sums[assignments[i]], value)
-
-            for i in range(self.factor_length):
-                self.factor_table[i] = self._div(self.factor_table[i], sums[assignments[i]])
+            table = self._table_view(self.variables, self.cardinalities)
+            axes = tuple(i for i, var in enumerate(self.variables) if var not in parents)
+            if self.logarithmetic:
+                sums = logsumexp_axes(table, axes, keepdims=True)
+            else:
+                sums = np.sum(table, axis=axes, dtype=np.float64, keepdims=True)
+
+            self.factor_table = np.ravel(self._div(table, sums)).astype(self.factor_table.dtype)
         else:
             self.factor_table = self._div(self.factor_table, self._sum(self.factor_table))
 
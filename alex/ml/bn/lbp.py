@@ -5,6 +5,10 @@
 
 import abc
 import itertools
+import time
+
+import numpy as np
+from scipy.misc import logsumexp
 
 
 class BPError(Exception):
@@ -15,6 +19,114 @@ class LBPError(BPError):
     pass
 
 
+class MessageSchedule(object):
+    """Static structure of a factor graph compiled for message passing.
+
+    Every node gets an integer ID and every directed edge (a message from a
+    node to its neighbor) gets an integer ID. The schedule keeps the last
+    message sent along every edge, so that the residual of a new message, the
+    largest change of its normalized values, can be computed. The messages of
+    a parameter node are its Dirichlet pseudo-counts, their residual is the
+    change of the normalized pseudo-counts.
+    """
+
+    def __init__(self, nodes, layers):
+        self.nodes = []
+        self.node_ids = {}
+        for node in itertools.chain(nodes, *layers):
+            self._add_node(node)
+        graph_nodes = list(self.nodes)
+
+        # The neighbors outside of the graph also get IDs, because messages
+        # are sent to them too.
+        for node in graph_nodes:
+            for neighbor in node.neighbors.values():
+                self._add_node(neighbor)
+
+        self.edges = []
+        self.edge_ids = {}
+        self.out_edges = [[] for node in self.nodes]
+        for node_id, node in enumerate(graph_nodes):
+            out_edges = self.out_edges[node_id]
+            for neighbor in node.neighbors.values():
+                edge = (node_id, self.node_ids[neighbor])
+                self.edge_ids[edge] = len(self.edges)
+                out_edges.append((len(self.edges), edge[1]))
+                self.edges.append(edge)
+
+        # Sequential strategy: forward and backward sweep.
+        self.sweep = [self.node_ids[node] for node in nodes]
+        self.sweep += self.sweep[::-1]
+
+        self.layers = [[self.node_ids[node] for node in layer] for layer in layers]
+        self.layer_sets = [set(layer) for layer in self.layers]
+        self.layer_edges = {}
+
+        self.messages = [None] * len(self.edges)
+        self.graph_nodes = graph_nodes
+        self.signature = self.get_signature(graph_nodes)
+
+    def _add_node(self, node):
+        if node not in self.node_ids:
+            self.node_ids[node] = len(self.nodes)
+            self.nodes.append(node)
+
+    @staticmethod
+    def get_signature(nodes):
+        """The numbers of neighbors of the nodes, the schedule must be compiled again if they change."""
+        return [len(node.neighbors) for node in nodes]
+
+    def get_layer_edges(self, from_layer, to_layer):
+        """Return the edges from nodes in one layer to nodes in another layer.
+
+        :param from_layer: Index of the layer of the sending nodes.
+        :param to_layer: Index of the layer of the receiving nodes.
+        :returns: A list of (node ID, list of (edge ID, neighbor ID)) for every node of the sending layer.
+        """
+        try:
+            return self.layer_edges[(from_layer, to_layer)]
+        except KeyError:
+            to_ids = self.layer_sets[to_layer]
+            edges = []
+            for node_id in self.layers[from_layer]:
+                edges.append((node_id, [(edge_id, neighbor_id)
+                                        for edge_id, neighbor_id in self.out_edges[node_id]
+                                        if neighbor_id in to_ids]))
+            self.layer_edges[(from_layer, to_layer)] = edges
+            return edges
+
+    def residual(self, edge_id):
+        """Compute the residual of the message just sent along the edge and remember the message.
+
+        Messages which are not kept by the receiving node have an infinite
+        residual, and so have the messages whose values cannot be normalized.
+        """
+        node_id, neighbor_id = self.edges[edge_id]
+        message = self.nodes[neighbor_id].last_message_from(self.nodes[node_id])
+        if message is None:
+            return float('inf')
+
+        # The messages are not normalized, so the values are normalized in
+        # the domain of the factor table, where they do not overflow.
+        values = np.asarray(message.factor_table, dtype=np.float64)
+        if values.size:
+            if message.logarithmetic:
+                values = np.exp(values - logsumexp(values))
+            else:
+                values = values / np.sum(values)
+
+        last_values = self.messages[edge_id]
+        self.messages[edge_id] = values
+        if last_values is None or last_values.shape != values.shape:
+            return float('inf')
+
+        if not values.size:
+            return 0.0
+
+        residual = float(np.max(np.abs(values - last_values)))
+        return residual if np.isfinite(residual) else float('inf')
+
+
 class BP(object):
     """Abstract class for Belief Propagation algorithm."""
 
@@ -36,21 +148,35 @@ class LBP(BP):
     node for update. Sequential strategy will update nodes in exact order in
     which they were added. Tree strategy will assume the graph is a tree
     (without checking) and will do one pass of sum-product algorithm.
+
+    The graph is compiled into a :class:`MessageSchedule` before the first run.
+    If a tolerance is given, the sequential strategy stops when no message
+    changed by more than the tolerance during an iteration, and it skips the
+    nodes whose incoming messages did not change since they last sent theirs.
+    Statistics of the last run are returned by :meth:`get_stats`. The residuals
+    of the messages are only computed if a tolerance is given or if they are
+    requested by residuals=True, otherwise the messages are just sent.
     """
 
-    def __init__(self, strategy="sequential", **kwargs):
+    def __init__(self, strategy="sequential", tolerance=None, residuals=False, **kwargs):
         """Initialize Loopy Belief Propagation algorithm."""
         self.strategy = strategy
         if self.strategy not in ('sequential', 'tree', 'layers'):
             raise LBPError('Unknown strategy.')
 
+        self.tolerance = tolerance
+        self.residuals = residuals
         self.options = kwargs
         self.nodes = []
         self.layers = []
 
+        self.schedule = None
+        self.stats = {}
+
     def add_nodes(self, nodes):
         """Add nodes to graph."""
         self.nodes.extend(nodes)
+        self.schedule = None
 
         # Create a tree structure for tree strategy.
         if self.strategy == 'tree':
@@ -61,12 +187,14 @@ class LBP(BP):
 
     def clear_nodes(self):
         self.nodes = []
+        self.schedule = None
 
     def add_layer(self, layer):
         self.add_nodes(layer)
 
         if self.strategy == 'layers':
             self.layers.append(layer)
+            self.schedule = None
 
     def add_layers(self, layers):
         """Add layers of nodes to graph."""
@@ -77,13 +205,27 @@ class LBP(BP):
         # Save information about layers.
         if self.strategy == 'layers':
             self.layers.extend(layers)
+            self.schedule = None
 
     def clear_layers(self):
         self.layers = []
         self.clear_nodes()
 
     def run(self, n_iterations=1, from_layer=None):
-        """Run the lbp algorithm."""
+        """Run the lbp algorithm.
+
+        :param n_iterations: The maximal number of iterations of the sequential strategy.
+        :param from_layer: Index of the first layer of the layers strategy, or 'last'.
+        """
+        start = time.time()
+        self._compile()
+        self.stats = {
+            'iterations': 0,
+            'messages': 0,
+            'skipped_nodes': 0,
+            'max_residual': 0.0 if self._tracks_residuals() else None,
+            'converged': False,
+        }
 
         if self.strategy == 'sequential':
             self._run_sequential(n_iterations)
@@ -95,6 +237,58 @@ class LBP(BP):
             self._run_layers(from_layer)
 
         self._normalize_nodes()
+        self.stats['time'] = time.time() - start
+
+    def get_stats(self):
+        """Return statistics of the last run.
+
+        :returns: The number of iterations, the number of sent messages, the
+                  number of skipped nodes, the largest residual of a message in
+                  the last iteration (None if the residuals were not computed),
+                  whether the messages converged and the wall time of the run
+                  in seconds. The residual of a message which cannot be
+                  normalized is infinite.
+        :rtype: dict
+        """
+        return dict(self.stats)
+
+    def _compile(self):
+        if (self.schedule is None or
+                self.schedule.signature != MessageSchedule.get_signature(self.schedule.graph_nodes)):
+            self.schedule = MessageSchedule(self.nodes, self.layers)
+
+    def _tracks_residuals(self):
+        return self.tolerance is not None or self.residuals
+
+    def _send_messages(self, node_id, edges):
+        """Update a node and send messages along the edges.
+
+        :returns: The largest residual of the sent messages and the IDs of
+                  neighbors whose messages changed by more than the tolerance.
+                  If the residuals are not computed, they are 0.0 and an empty
+                  list.
+        """
+        schedule = self.schedule
+        node = schedule.nodes[node_id]
+        node.update()
+
+        self.stats['messages'] += len(edges)
+        if not self._tracks_residuals():
+            for edge_id, neighbor_id in edges:
+                node.message_to(schedule.nodes[neighbor_id])
+            return 0.0, []
+
+        max_residual = 0.0
+        changed = []
+        for edge_id, neighbor_id in edges:
+            node.message_to(schedule.nodes[neighbor_id])
+            residual = schedule.residual(edge_id)
+            max_residual = max(max_residual, residual)
+            if self.tolerance is None or residual > self.tolerance:
+                changed.append(neighbor_id)
+
+        self.stats['max_residual'] = max(self.stats['max_residual'], max_residual)
+        return max_residual, changed
 
     def init_messages(self):
         for node in self.nodes:
@@ -105,12 +299,30 @@ class LBP(BP):
             node.normalize()
 
     def _run_sequential(self, n_iterations):
-        for i in range(n_iterations):
-            for node in self.nodes:
-                node.send_messages()
+        schedule = self.schedule
+        pending = [True] * len(schedule.nodes)
 
-            for node in reversed(self.nodes):
-                node.send_messages()
+        for i in range(n_iterations):
+            self.stats['iterations'] += 1
+            if self._tracks_residuals():
+                self.stats['max_residual'] = 0.0
+
+            for node_id in schedule.sweep:
+                # The messages of a node which did not receive any changed
+                # message since it sent its own would not change either.
+                if not pending[node_id]:
+                    self.stats['skipped_nodes'] += 1
+                    continue
+                if self.tolerance is not None:
+                    pending[node_id] = False
+
+                max_residual, changed = self._send_messages(node_id, schedule.out_edges[node_id])
+                for neighbor_id in changed:
+                    pending[neighbor_id] = True
+
+            if self.tolerance is not None and self.stats['max_residual'] <= self.tolerance:
+                self.stats['converged'] = True
+                break
 
     def _run_tree(self):
         ordering = []
@@ -125,11 +337,10 @@ class LBP(BP):
                     changed = True
 
                     remove.append(x)
-                    x.update()
                     ordering.append(x)
 
                     neighbor = x.wait_for_n.pop()
-                    x.message_to(neighbor)
+                    self._send_messages_to(x, [neighbor])
 
                     neighbor.wait_for_n.remove(x)
                     neighbor.backward_send_to.append(x)
@@ -138,29 +349,36 @@ class LBP(BP):
                 not_updated_nodes.remove(x)
 
         for node in not_updated_nodes:
-            node.send_messages()
+            self._send_messages_to(node, node.neighbors.values())
 
         while len(ordering) > 0:
             next_node = ordering.pop()
-            next_node.update()
-            for x in next_node.backward_send_to:
-                next_node.message_to(x)
+            self._send_messages_to(next_node, next_node.backward_send_to)
+
+        self.stats['iterations'] = 1
+
+    def _send_messages_to(self, node, neighbors):
+        node_id = self.schedule.node_ids[node]
+        self._send_messages(node_id, [(self.schedule.edge_ids[(node_id, self.schedule.node_ids[neighbor])],
+                                       self.schedule.node_ids[neighbor]) for neighbor in neighbors])
 
     def _run_layers(self, idx_last_layer=None):
+        n_layers = len(self.layers)
         if idx_last_layer is None:
             # Forward
-            self._send_messages_through_layers(self.layers)
+            self._send_messages_through_layers(range(n_layers))
             # Backward
-            self._send_messages_through_layers(reversed(self.layers))
+            self._send_messages_through_layers(reversed(range(n_layers)))
         else:
             # Forward
-            forward_layers = self.layers[idx_last_layer+1:]
-            last_layer = self.layers[idx_last_layer]
-            self._send_messages_through_layers(forward_layers, last_layer)
+            forward_layers = range(idx_last_layer + 1, n_layers)
+            self._send_messages_through_layers(forward_layers, idx_last_layer)
             # Backward
-            backward_layers = reversed(self.layers[idx_last_layer:])
+            backward_layers = reversed(range(idx_last_layer, n_layers))
             self._send_messages_through_layers(backward_layers)
 
+        self.stats['iterations'] = 1
+
     def _send_messages_through_layers(self, layers, last_layer=None):
         for layer in layers:
             # Send messages from last layer to this layer.
@@ -173,8 +391,5 @@ class LBP(BP):
             last_layer = layer
 
     def _send_messages_to_layer(self, from_layer, to_layer):
-        for node in from_layer:
-            node.update()
-            for name, neighbor in node.neighbors.iteritems():
-                if neighbor in to_layer:
-                    node.message_to(neighbor)
+        for node_id, edges in self.schedule.get_layer_edges(from_layer, to_layer):
+            self._send_messages(node_id, edges)
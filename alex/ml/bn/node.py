@@ -67,6 +67,10 @@ class Node(object):
         """Normalize belief state."""
         self.belief.normalize(parents)
 
+    def last_message_from(self, node):
+        """Return the last message received from neighboring node."""
+        return self.incoming_message.get(node.name)
+
     @abc.abstractmethod
     def init_messages(self):
         raise NotImplementedError()
@@ -248,6 +252,11 @@ class DirichletFactorNode(FactorNode):
         else:
             self.incoming_message[node.name] = message
 
+    def last_message_from(self, node):
+        if isinstance(node, DirichletParameterNode):
+            return self.incoming_parameter
+        return self.incoming_message.get(node.name)
+
     def update(self):
         self.belief = reduce(operator.mul, self.incoming_message.values())
 
@@ -246,6 +246,24 @@ class TestFactor(unittest.TestCase):
         factor_ac = factor.marginalize(["A", "C"])
         self.assertAlmostEqual(factor_ac[(0, 0)], 0.09)
 
+    def test_marginalize_broadcast(self):
+        rnd = np.random.RandomState(0)
+        values = {'A': range(2), 'B': range(3), 'C': range(4), 'D': range(5)}
+        table = rnd.rand(120).astype(np.float32)
+        f = Factor(['A', 'B', 'C', 'D'], values, to_log(np.array(table)))
+        g = Factor(['B', 'D'], values, to_log(rnd.rand(15).astype(np.float32)))
+
+        h = (f * g).marginalize(['A', 'D'])
+        for a in values['A']:
+            for d in values['D']:
+                expected = sum(f[(a, b, c, d)] * g[(b, d)] for b in values['B'] for c in values['C'])
+                self.assertAlmostEqual(h[(a, d)], expected, places=5)
+
+        f.normalize(parents=['B', 'D'])
+        for b in values['B']:
+            for d in values['D']:
+                self.assertAlmostEqual(sum(f[(a, b, c, d)] for a in values['A'] for c in values['C']), 1.0, places=5)
+
     def test_multiplication(self):
         f1 = Factor(
             ['A', 'B'],
@@ -3,6 +3,8 @@
 
 import unittest
 
+import numpy as np
+
 from alex.ml.bn.factor import Factor
 from alex.ml.bn.node import DiscreteVariableNode, DiscreteFactorNode, DirichletFactorNode, DirichletParameterNode
 from alex.ml.bn.lbp import LBP
@@ -292,6 +294,173 @@ class TestLBP(unittest.TestCase):
         lbp.run(from_layer='last')
         self.assertAlmostEqual(hid3.belief[('save',)], hid2.belief[('save',)] * 0.9 + hid2.belief[('del',)] * 0.1)
 
+    def _create_loop(self):
+        f_h_o = {
+            ("save", "osave"): 0.8,
+            ("del",  "osave"): 0.2,
+            ("save", "odel"): 0.3,
+            ("del",  "odel"): 0.7,
+        }
+
+        f_h_h = {
+            ("save", "save"): 0.7,
+            ("del",  "save"): 0.3,
+            ("save", "del"): 0.4,
+            ("del",  "del"): 0.6
+        }
+
+        nodes = []
+        hidden = []
+        for i in range(3):
+            hid = DiscreteVariableNode("hid%d" % i, ["save", "del"])
+            obs = DiscreteVariableNode("obs%d" % i, ["osave", "odel"])
+            fact = DiscreteFactorNode("fact_h%d_o%d" % (i, i), Factor(
+                ['hid%d' % i, 'obs%d' % i],
+                {
+                    "hid%d" % i: ["save", "del"],
+                    "obs%d" % i: ["osave", "odel"]
+                },
+                f_h_o))
+            obs.connect(fact)
+            fact.connect(hid)
+            obs.observed({(["osave", "odel"][i % 2],): 1})
+
+            nodes.extend([obs, fact, hid])
+            hidden.append(hid)
+
+        # The hidden variables form a loop.
+        for i in range(3):
+            j = (i + 1) % 3
+            names = sorted(["hid%d" % i, "hid%d" % j])
+            fact = DiscreteFactorNode("fact_%s_%s" % tuple(names), Factor(
+                names,
+                {
+                    names[0]: ["save", "del"],
+                    names[1]: ["save", "del"],
+                },
+                f_h_h))
+            hidden[i].connect(fact)
+            hidden[j].connect(fact)
+            nodes.append(fact)
+
+        return nodes, hidden
+
+    def test_convergence(self):
+        nodes, hidden = self._create_loop()
+        lbp = LBP()
+        lbp.add_nodes(nodes)
+        lbp.run(n_iterations=30)
+        expected = [hid.belief[('save',)] for hid in hidden]
+
+        stats = lbp.get_stats()
+        self.assertEqual(stats['iterations'], 30)
+        self.assertFalse(stats['converged'])
+        self.assertIsNone(stats['max_residual'])
+
+        nodes, hidden = self._create_loop()
+        lbp = LBP(residuals=True)
+        lbp.add_nodes(nodes)
+        lbp.run(n_iterations=30)
+
+        stats = lbp.get_stats()
+        self.assertEqual(stats['iterations'], 30)
+        self.assertFalse(stats['converged'])
+        self.assertTrue(stats['max_residual'] <= 1e-5)
+        for hid, belief in zip(hidden, expected):
+            self.assertAlmostEqual(hid.belief[('save',)], belief)
+
+        nodes, hidden = self._create_loop()
+        lbp = LBP(tolerance=1e-5)
+        lbp.add_nodes(nodes)
+        lbp.run(n_iterations=30)
+
+        stats = lbp.get_stats()
+        self.assertTrue(stats['converged'])
+        self.assertTrue(stats['iterations'] < 30)
+        self.assertTrue(stats['max_residual'] <= 1e-5)
+        self.assertTrue(stats['skipped_nodes'] > 0)
+        for hid, belief in zip(hidden, expected):
+            self.assertAlmostEqual(hid.belief[('save',)], belief, places=4)
+
+    def test_convergence_large_messages(self):
+        # The unnormalized messages of the loop overflow if they are exponentiated before normalization.
+        rnd = np.random.RandomState(0)
+        values = ["v%d" % j for j in range(50)]
+        hidden = [DiscreteVariableNode("hid%d" % i, values) for i in range(10)]
+        nodes = list(hidden)
+        for i in range(10):
+            j = (i + 1) % 10
+            names = sorted(["hid%d" % i, "hid%d" % j])
+            table = 10.0 ** (rnd.rand(50, 50) * 30)
+            fact = DiscreteFactorNode("fact_%s_%s" % tuple(names), Factor(
+                names,
+                {names[0]: values, names[1]: values},
+                dict(((a, b), table[x, y]) for x, a in enumerate(values) for y, b in enumerate(values))))
+            hidden[i].connect(fact)
+            hidden[j].connect(fact)
+            nodes.append(fact)
+
+        lbp = LBP(tolerance=1e-5)
+        lbp.add_nodes(nodes)
+        lbp.run(n_iterations=5)
+
+        stats = lbp.get_stats()
+        self.assertFalse(stats['converged'])
+        self.assertEqual(stats['iterations'], 5)
+        self.assertTrue(stats['max_residual'] > 1e-5)
+
+    def _create_shared_parameter(self):
+        theta = DirichletParameterNode('theta', Factor(
+            ['X0', 'X1'],
+            {
+                'X0': ['x0_0', 'x0_1'],
+                'X1': ['x1_0', 'x1_1'],
+            },
+            {
+                ('x0_0', 'x1_0'): 1,
+                ('x0_0', 'x1_1'): 2,
+                ('x0_1', 'x1_0'): 1,
+                ('x0_1', 'x1_1'): 1,
+            }))
+
+        nodes = [theta]
+        for i in range(3):
+            f = DirichletFactorNode('f%d' % i)
+            x0 = DiscreteVariableNode('X0', ['x0_0', 'x0_1'])
+            x1 = DiscreteVariableNode('X1', ['x1_0', 'x1_1'])
+
+            f.connect(x0, parent=False)
+            f.connect(x1)
+            f.connect(theta)
+
+            x0.observed({('x0_0',): 0.8, ('x0_1',): 0.2} if i % 2 else {('x0_0',): 0.3, ('x0_1',): 0.7})
+            x1.observed({('x1_0',): 0.6, ('x1_1',): 0.4})
+            nodes.extend([x0, x1, f])
+
+        return nodes, theta
+
+    def test_convergence_parameters(self):
+        nodes, theta = self._create_shared_parameter()
+        lbp = LBP()
+        lbp.add_nodes(nodes)
+        lbp.run(n_iterations=30)
+        expected = np.array(theta.alpha.factor_table)
+
+        nodes, theta = self._create_shared_parameter()
+        lbp = LBP(tolerance=1e-6)
+        lbp.add_nodes(nodes)
+        lbp.run(n_iterations=30)
+
+        # The messages of the parameter node are measured as well.
+        self.assertTrue(all(message is not None for message in lbp.schedule.messages))
+
+        stats = lbp.get_stats()
+        self.assertTrue(stats['converged'])
+        self.assertTrue(stats['iterations'] < 30)
+        self.assertTrue(stats['max_residual'] <= 1e-6)
+        for value, expected_value in zip(theta.alpha.factor_table, expected):
+            self.assertAlmostEqual(value, expected_value, places=5)
+
     def test_ep(self):
         # Create nodes.
         hid1 = DiscreteVariableNode("hid1", ["save", "del"])
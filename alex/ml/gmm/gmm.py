@@ -75,6 +75,98 @@ class GMM:
 
         return log_prob
 
+    def _log_prob_components(self, X):
+        """Get the log probs of the rows of X being generated by the components weighted by the component weights,
+        and the squared differences of the rows from the means."""
+        sq_diff = (X[:, np.newaxis, :] - self.means) ** 2
+        lpr = np.log(self.weights) - 0.5 * (X.shape[1] * np.log(2 * np.pi) + np.sum(np.log(self.covars), 1)) - \
+            0.5 * np.sum(sq_diff / self.covars, 2)
+
+        return lpr, sq_diff
+
+    def _log_sum_exp_rows(self, lpr):
+        lpr_max = np.max(lpr, 1)
+
+        return lpr_max + np.log(np.sum(np.exp(lpr - lpr_max[:, np.newaxis]), 1))
+
+    def score_samples(self, X, chunk_size=1000):
+        """Get the log probs of the rows of X being generated by the mixture.
+
+        The rows are scored in chunks of chunk_size rows to bound the memory used by the intermediate results.
+        """
+        X = np.asarray(X)
+
+        if len(X) <= chunk_size:
+            return self._log_sum_exp_rows(self._log_prob_components(X)[0])
+
+        return np.concatenate([self._log_sum_exp_rows(self._log_prob_components(X[i:i + chunk_size])[0])
+                               for i in range(0, len(X), chunk_size)])
+
+    def iter_blocks(self, X, chunk_size):
+        """Iterate over blocks of at most chunk_size rows of X.
+
+        X can be an array (e.g. a memory mapped array larger than RAM) or any iterable of frames,
+        for example the feature arrays from alex.utils.htk computing the features on the fly.
+        """
+        if hasattr(X, 'shape'):
+            for i in range(0, len(X), chunk_size):
+                yield np.asarray(X[i:i + chunk_size], dtype=np.float64)
+        else:
+            block = []
+            for x in X:
+                block.append(x)
+                if len(block) == chunk_size:
+                    yield np.array(block, dtype=np.float64)
+                    block = []
+            if block:
+                yield np.array(block, dtype=np.float64)
+
+    def accumulate(self, X, statistics=None):
+        """Accumulate the sufficient statistics of the E step for a block of frames.
+
+        The statistics of several blocks, possibly computed in different processes, can be added together
+        before the M step.
+
+        :param X: a 2D array with one frame per row
+        :param statistics: the statistics accumulated so far, None starts new statistics
+        :return: a dictionary with the number of frames, the total log prob of the frames, and the sums of
+                 responsibilities, of the responsibility weighted frames and of the responsibility weighted squared
+                 differences from the current means
+        """
+        if statistics is None:
+            statistics = {
+                'n': 0,
+                'log_prob': 0.0,
+                'weights': np.zeros(self.n_components),
+                'means': np.zeros((self.n_components, self.n_features)),
+                'covars': np.zeros((self.n_components, self.n_features)),
+            }
+
+        lpr, sq_diff = self._log_prob_components(X)
+        log_prob = self._log_sum_exp_rows(lpr)
+        responsibilities = np.exp(lpr - log_prob[:, np.newaxis])
+
+        statistics['n'] += len(X)
+        statistics['log_prob'] += np.sum(log_prob)
+        statistics['weights'] += np.sum(responsibilities, 0)
+        statistics['means'] += np.dot(responsibilities.T, X)
+        statistics['covars'] += np.einsum('nk,nkd->kd', responsibilities, sq_diff)
+
+        return statistics
+
+    def maximise(self, statistics):
+        """Re-estimate the parameters of the mixture from the accumulated sufficient statistics."""
+        n = statistics['n']
+        acc_weights = statistics['weights']
+
+        new_weights = (acc_weights + EPS) / (n + self.n_components * EPS)
+        new_means = (statistics['means'] + EPS) / (
+            acc_weights[:, np.newaxis] + self.n_components * EPS)
+        new_covars = (statistics['covars'] + EPS) / (acc_weights[:, np.newaxis]
+                                                     + self.n_components * EPS) + self.min_covar
+
+        self.weights, self.means, self.covars = new_weights, new_means, new_covars
+
     def mixup(self, n_new_mixies):
         """Add n new mixies to the mixture."""
 
@@ -112,66 +204,24 @@ class GMM:
 
             self.n_components += 1
 
-    def fit(self, X):
-        # init the algorithm
+    def fit(self, X, chunk_size=1000):
+        """Train the mixture by the EM algorithm.
 
+        X is read once per iteration in blocks of chunk_size frames and only the sufficient statistics
+        are kept in memory, see iter_blocks() for the supported types of X.
+        """
         self.log_probs = []
         for i in range(self.n_iter):
-            log_prob = 0
-            n = 0
+            statistics = None
+            for block in self.iter_blocks(X, chunk_size):
+                statistics = self.accumulate(block, statistics)
 
-            acc_weights = np.zeros(self.n_components)
-            acc_means = np.zeros((self.n_components, self.n_features))
-            acc_covars = np.zeros((self.n_components, self.n_features))
-
-            for x in X:
-                x_m = x.reshape((1, len(x)))
-                #expectation
-                log_prob_x, responsibilities = self.expectation(x_m)
-
-#        print x
-#        print "r", responsibilities
-
-                # maximisation
-                acc_weights += responsibilities
-
-                # make a column matrix from it
-                responsibilities = responsibilities[:, np.newaxis]
-
-#        print responsibilities
-
-                acc_means += np.dot(responsibilities, x_m)
-
-#        print (x_m - self.means)**2
-
-#        print "r", responsibilities.T
-#        print "d", x_m - self.means
-#        print "d**2", (x_m - self.means)**2
-#        print "ac", responsibilities * (x_m - self.means)**2
-
-                acc_covars += responsibilities * (x_m - self.means) ** 2
-
-                log_prob += log_prob_x
-                n += 1
-
-#        print "LP", log_prob_x
-#        if n > 100000:
-#          break
-
-            self.log_probs.append(log_prob / n)
-
-#      print "Iter:", i, "Log prob of data: ", log_prob/n
+            self.log_probs.append(statistics['log_prob'] / statistics['n'])
 
             if i > 2 and abs(self.log_probs[-1] - self.log_probs[-2]) < self.thresh:
                 break
 
-            new_weights = (acc_weights + EPS) / (n + self.n_components * EPS)
-            new_means = (acc_means + EPS) / (
-                acc_weights[:, np.newaxis] + self.n_components * EPS)
-            new_covars = (acc_covars + EPS) / (acc_weights[:, np.newaxis]
-                                               + self.n_components * EPS) + self.min_covar
-
-            self.weights, self.means, self.covars = new_weights, new_means, new_covars
+            self.maximise(statistics)
 
     def save_model(self, file_name):
         """Save the GMM model as a pickle."""
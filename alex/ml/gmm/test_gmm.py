@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    import autopath
+
+import unittest
+
+import numpy as np
+
+from alex.ml.gmm import GMM
+
+
+class TestGMM(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        self.X = np.vstack([rnd.randn(300, 4) * 2 + 3, rnd.randn(200, 4) - 1])
+
+    def train(self, X, chunk_size):
+        np.random.seed(0)
+        gmm = GMM(n_features=4, n_components=1, n_iter=5)
+        gmm.fit(X, chunk_size=chunk_size)
+        gmm.mixup(2)
+        gmm.fit(X, chunk_size=chunk_size)
+        return gmm
+
+    def test_fit_chunks(self):
+        gmm = self.train(self.X, 1000)
+        self.assertEqual(gmm.n_components, 3)
+        self.assertTrue(gmm.log_probs[-1] > gmm.log_probs[0])
+
+        # the chunks and the type of the input must not change the model
+        for X, chunk_size in [(self.X, 7), (list(self.X), 64), (list(self.X), 1)]:
+            other = self.train(X, chunk_size)
+            self.assertTrue(np.allclose(other.weights, gmm.weights, rtol=1e-12, atol=0.0))
+            self.assertTrue(np.allclose(other.means, gmm.means, rtol=1e-12, atol=0.0))
+            self.assertTrue(np.allclose(other.covars, gmm.covars, rtol=1e-12, atol=0.0))
+
+    def test_score_samples(self):
+        gmm = self.train(self.X, 1000)
+        expected = np.array([gmm.score(x) for x in self.X])
+
+        self.assertTrue(np.allclose(gmm.score_samples(self.X), expected, rtol=1e-12, atol=0.0))
+        self.assertTrue(np.allclose(gmm.score_samples(self.X, chunk_size=9), expected, rtol=1e-12, atol=0.0))
+
+    def test_accumulate(self):
+        gmm = self.train(self.X, 1000)
+
+        statistics = gmm.accumulate(self.X)
+        parts = gmm.accumulate(self.X[250:], gmm.accumulate(self.X[:250]))
+        for key in statistics:
+            self.assertTrue(np.allclose(parts[key], statistics[key]))
+        self.assertEqual(statistics['n'], len(self.X))
+        self.assertAlmostEqual(np.sum(statistics['weights']), len(self.X))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,14 +8,107 @@ value of a base type instance.
 
 from __future__ import unicode_literals
 
+import heapq
+
 from collections import namedtuple
+from math import log
+from operator import getitem, mul
 from alex.ml.exceptions import NBListException
-# from operator import mul
 
 
 _HypWithEv = namedtuple('HypothesisWithEvidence', ['prob', 'fact', 'evidence'])
 
 
+def iter_kbest(alternatives, per_parent=False):
+    """
+    Lazily enumerates the combinations of independent alternatives from the most probable to the least probable one.
+    It is the k-best search shared by the confusion networks.
+
+    Every combination is represented by the ranks of the chosen alternatives in each position. A combination is
+    generated only from its unique parent, the combination with the last non-zero rank decreased by one; therefore,
+    no combination is generated twice and no set of closed hypotheses is needed. The open hypotheses are kept in
+    a binary heap and the log-probability of a child is computed from the log-probability of its parent.
+
+    If per_parent is set, the search follows the historical search of the confusion networks, so that the n-best
+    lists limited by the number of generated combinations do not change. A combination is generated from each of its
+    parents, i.e. once for every position with a non-zero index, and all the copies are yielded; the children of
+    a copy are not generated again. The alternatives are taken in the given order, not sorted. The probabilities are
+    the products of the probabilities of the alternatives and their ties are broken by the larger index, as in the
+    reversed sorted list of the (prob, index) tuples.
+
+    :param alternatives: a list of lists of probabilities of the alternatives in each position
+    :param per_parent: if set, count the combinations per parent as the historical search
+    :return: a generator of (logprob, index) tuples where index is a tuple of the indices of the chosen alternatives,
+             or (prob, index) tuples if per_parent is set
+    """
+    if any(not alts for alts in alternatives):
+        # no combination exists
+        return
+
+    if per_parent:
+        for prob_index in _iter_kbest_per_parent(alternatives):
+            yield prob_index
+        return
+
+    # the alternatives sorted by probability and the log-probability changes when moving to the next worse alternative
+    orders = []
+    deltas = []
+    logprob = 0.0
+    for alts in alternatives:
+        order = sorted(range(len(alts)), key=lambda i: -alts[i])
+        logprobs = [log(alts[i]) if alts[i] > 0.0 else float('-inf') for i in order]
+
+        orders.append(order)
+        deltas.append([logprobs[r + 1] - logprobs[r] if logprobs[r] > float('-inf') else 0.0
+                       for r in range(len(logprobs) - 1)])
+        logprob += logprobs[0]
+
+    # the heap items are (-logprob, ranks, the last position with a non-zero rank)
+    open_hyp = [(-logprob, (0, ) * len(orders), 0), ]
+
+    while open_hyp:
+        neg_logprob, ranks, last = heapq.heappop(open_hyp)
+
+        yield -neg_logprob, tuple(order[r] for order, r in zip(orders, ranks))
+
+        for i in range(last, len(ranks)):
+            r = ranks[i]
+            if r < len(deltas[i]):
+                heapq.heappush(open_hyp, (neg_logprob - deltas[i][r], ranks[:i] + (r + 1, ) + ranks[i + 1:], i))
+
+
+def _iter_kbest_per_parent(alternatives):
+    """
+    The per_parent search of iter_kbest. The ties of the probabilities have to be the same as in the historical search,
+    therefore, the probability of every combination is the product of the probabilities in the same order and it is
+    not derived from the parent. The index is encoded as a number whose order is the lexicographic order of
+    the indices, so that the larger index wins a tie in the heap.
+    """
+    base = max(len(alts) for alts in alternatives) + 1 if alternatives else 1
+    weights = [base ** (len(alternatives) - 1 - i) for i in range(len(alternatives))]
+
+    def get_prob(index):
+        return reduce(mul, map(getitem, alternatives, index), 1.)
+
+    best = (0, ) * len(alternatives)
+    open_hyp = [(-get_prob(best), 0, best), ]
+    closed_hyp = set()
+
+    while open_hyp:
+        neg_prob, neg_code, index = heapq.heappop(open_hyp)
+
+        yield -neg_prob, index
+
+        if index in closed_hyp:
+            continue
+        closed_hyp.add(index)
+
+        for i in range(len(index)):
+            if index[i] + 1 < len(alternatives[i]):
+                child = index[:i] + (index[i] + 1, ) + index[i + 1:]
+                heapq.heappush(open_hyp, (-get_prob(child), neg_code - weights[i], child))
+
+
 class Hypothesis(object):
     """This is the base class for all forms of probabilistic hypotheses
     representations.
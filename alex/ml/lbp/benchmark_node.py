@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import time
+
+import numpy as np
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.ml.lbp.node import DiscreteNode, DiscreteFactor
+
+
+def create_slot(cardinality, precompute):
+    """Creates a goal of a slot in two consecutive turns connected by a transition factor and the observation of the
+    goal in the second turn as the belief tracker does.
+
+    :return: the previous goal, the goal, the observation and the transition and observation factors
+    """
+    rnd = np.random.RandomState(0)
+    values = ['v%d' % i for i in range(cardinality)]
+
+    def prob_table_trans(previous, current):
+        return np.log(0.9) if previous == current else np.log(0.1 / (cardinality - 1))
+
+    def prob_table_obs(goal, observation):
+        return np.log(0.8) if goal == observation else np.log(0.2 / (cardinality - 1))
+
+    nodes = []
+    for name, observed in [('goal_1', False), ('goal_2', False), ('obs_2', True)]:
+        node = DiscreteNode(name, '', cardinality, observed)
+        for value, log_prob in zip(values, np.log(rnd.rand(cardinality))):
+            node[value] = log_prob
+        nodes.append(node)
+    goal_1, goal_2, obs_2 = nodes
+
+    trans = DiscreteFactor('trans', '', prob_table_trans, precompute=precompute)
+    trans.attach_variable(goal_1)
+    trans.attach_variable(goal_2)
+
+    obs = DiscreteFactor('obs', '', prob_table_obs, precompute=precompute)
+    obs.attach_variable(goal_2)
+    obs.attach_variable(obs_2)
+
+    goal_1.attach_factor(trans, forward=True)
+    goal_2.attach_factor(trans)
+    goal_2.attach_factor(obs, forward=True)
+    obs_2.attach_factor(obs)
+
+    return goal_1, goal_2, obs_2, trans, obs
+
+
+def benchmark(cardinality, repeat):
+    """
+    Measures the computation of the messages from the transition and observation factors to the goals.
+
+    :return: the time of the first turn (including the precomputation of the tables), the time per turn,
+             and the maximum difference of the messages
+    """
+    results = []
+    for precompute in [False, True]:
+        goal_1, goal_2, obs_2, trans, obs = create_slot(cardinality, precompute)
+
+        times = []
+        for i in range(repeat):
+            start = time.clock()
+            for factor in [trans, obs]:
+                factor.update_input_messages()
+            messages = [trans.get_output_message(goal_2), trans.get_output_message(goal_1),
+                        obs.get_output_message(goal_2)]
+            times.append(time.clock() - start)
+
+        results.append((times[0], np.mean(times[1:]) if repeat > 1 else times[0], messages))
+
+    diff = max(np.max(np.abs(a - b)) for a, b in zip(results[0][2], results[1][2]))
+
+    return results[0][:2], results[1][:2], diff
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Compares the messages of the discrete factors computed by calling the prob_table function for every joint
+        assignment with the messages computed from the precomputed log probability tables, for a transition and
+        an observation factor of a slot goal with growing cardinality.
+      """)
+
+    parser.add_argument('-c', '--cardinalities', type=int, nargs='+', default=[10, 30, 100, 300],
+                        help='the cardinalities of the slot goals')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='the number of turns')
+    args = parser.parse_args()
+
+    print "=" * 120
+    print "Discrete factor benchmark: the transition and observation factors of a slot goal"
+    print "-" * 120
+    for cardinality in args.cardinalities:
+        (reference_first, reference_turn), (table_first, table_turn), diff = benchmark(cardinality, args.repeat)
+
+        print "|X| = %4d  prob_table: %10.3f ms/turn  table: first turn %10.3f ms, %8.3f ms/turn  " \
+              "speed-up: %8.1f  max. difference: %g" % (cardinality, 1e3 * reference_turn, 1e3 * table_first,
+                                                        1e3 * table_turn, reference_turn / table_turn, diff)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
@@ -50,17 +50,39 @@ class DiscreteFactor(Factor):
 
     The variables must be attached in the same order as are the parameters in the
     prob_table function.
+
+    If precompute is True, the prob_table function is evaluated only once for
+    every joint assignment of the variables and the results are stored in a dense
+    ndarray of log probabilities. The output messages are then computed by adding
+    the input messages to the table and summing out the other variables.
     """
-    def __init__(self, name, desc, prob_table):
+    def __init__(self, name, desc, prob_table, precompute=False):
         Factor.__init__(self, name, desc)
 
         self.prob_table = prob_table
+        self.precompute = precompute
+        self.log_prob_table = None
+
+    def compile_table(self):
+        """ Evaluates the prob_table function for all joint assignments of the variables.
+
+        The resulting table has an axis for each variable and it is indexed by the
+        indexes of the values of the variables.
+        """
+        shape = tuple(len(v) for v in self.variables)
+        list_of_lists_of_values = [[v.index_2_value[i] for i in range(len(v))] for v in self.variables]
+
+        self.log_prob_table = np.fromiter((self.prob_table(*x) for x in itertools.product(*list_of_lists_of_values)),
+                                          dtype=np.float64, count=int(np.prod(shape))).reshape(shape)
 
     def get_output_message(self, variable):
         """ Returns output messages from this factor to the given variable node.
 
         """
 
+        if self.precompute:
+            return self._get_output_message_from_table(variable)
+
         om = defaultdict(list)
 
         # FIXME: make this faster by using a dictionary
@@ -84,6 +106,25 @@ class DiscreteFactor(Factor):
 
         return omlp
 
+    def _get_output_message_from_table(self, variable):
+        # the table must be compiled again if the variables or their values changed
+        if self.log_prob_table is None or self.log_prob_table.shape != tuple(len(v) for v in self.variables):
+            self.compile_table()
+
+        variable_index = [v.name for v in self.variables].index(variable.name)
+
+        log_probs = self.log_prob_table
+        for i, v in enumerate(self.variables):
+            if v.name != variable.name:
+                shape = [1] * len(self.variables)
+                shape[i] = len(v)
+                log_probs = log_probs + self.input_messages[v.name].reshape(shape)
+
+        # sum out all other variables
+        log_probs = np.rollaxis(log_probs, variable_index).reshape(len(variable), -1)
+
+        return la.sum(log_probs, axis=1)
+
     def update_input_messages(self):
         """ Updates all input messages from connected variable nodes.
         """
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    import autopath
+
+import unittest
+
+import numpy as np
+
+from alex.ml.lbp.node import DiscreteNode, DiscreteFactor
+
+
+class TestDiscreteFactor(unittest.TestCase):
+    def create_factor(self, precompute):
+        rnd = np.random.RandomState(0)
+        nodes = []
+        for name, values in [('a', ['a1', 'a2', 'a3']), ('b', ['b1', 'b2']), ('c', ['c1', 'c2', 'c3', 'c4'])]:
+            node = DiscreteNode(name, '', len(values))
+            for value in values:
+                node[value] = np.log(rnd.rand())
+            nodes.append(node)
+
+        table = {}
+        for a in nodes[0].get_values():
+            for b in nodes[1].get_values():
+                for c in nodes[2].get_values():
+                    table[(a, b, c)] = np.log(rnd.rand())
+
+        factor = DiscreteFactor('f', '', lambda *x: table[x], precompute=precompute)
+        for node in nodes:
+            factor.attach_variable(node)
+            node.attach_factor(factor)
+        factor.update_input_messages()
+
+        return factor, nodes
+
+    def test_precomputed_messages(self):
+        factor, nodes = self.create_factor(False)
+        expected = [factor.get_output_message(node) for node in nodes]
+
+        factor, nodes = self.create_factor(True)
+        for node, message in zip(nodes, expected):
+            self.assertTrue(np.allclose(factor.get_output_message(node), message, rtol=0.0, atol=1e-12))
+
+        self.assertEqual(factor.log_prob_table.shape, (3, 2, 4))
+
+        # a new value of a variable makes the factor compile the table again
+        nodes[1]['b3'] = np.log(0.5)
+        self.assertRaises(KeyError, factor.get_output_message, nodes[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
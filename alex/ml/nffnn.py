@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import cPickle as pickle
+import sys
+
+import numpy as np
+
+from alex.ml.exceptions import FFNNException
+
+
+class TheanoObject(object):
+    """ A placeholder for the Theano objects (e.g. the activation functions) in the pickled TheanoFFNN models.
+
+    It allows to load the models without importing Theano.
+    """
+    def __init__(self, *args, **kwargs):
+        self.args = args
+
+    def __setstate__(self, state):
+        self.state = state
+
+
+_theano_classes = {}
+
+
+def _find_global(module, name):
+    if module == 'theano' or module.startswith('theano.'):
+        try:
+            return _theano_classes[(module, name)]
+        except KeyError:
+            cls = type(name, (TheanoObject, ), {'theano_module': module})
+            _theano_classes[(module, name)] = cls
+            return cls
+
+    __import__(module)
+    return getattr(sys.modules[module], name)
+
+
+def load_params(file_name):
+    """ Loads the parameters of a network saved by TheanoFFNN.save() or NumpyFFNN.save() without importing Theano.
+
+    :param file_name: file name of the saved NN
+    :return: the tuple of the parameters as returned by TheanoFFNN.get_params()
+    """
+    with open(file_name, "rb") as f:
+        unpickler = pickle.Unpickler(f)
+        unpickler.find_global = _find_global
+        return unpickler.load()
+
+
+ACTIVATION_NAMES = {
+    'tanh': 'tanh',
+    'sigmoid': 'sigmoid',
+    'scalarsigmoid': 'sigmoid',
+    'softplus': 'softplus',
+    'scalarsoftplus': 'softplus',
+    'relu': 'relu',
+}
+
+
+def activation_name(activation):
+    """ Returns the name of the hidden activation function of a TheanoFFNN.
+
+    :param activation: the name, the Theano elementwise operation or its unpickled placeholder
+    """
+    if isinstance(activation, basestring):
+        names = [activation]
+    else:
+        state = getattr(activation, 'state', None)
+        if not isinstance(state, dict):
+            state = {}
+        names = [state.get('name'), type(state.get('scalar_op')).__name__, getattr(activation, 'name', None),
+                 type(getattr(activation, 'scalar_op', None)).__name__, type(activation).__name__]
+
+    for name in names:
+        if isinstance(name, basestring) and name.lower() in ACTIVATION_NAMES:
+            return ACTIVATION_NAMES[name.lower()]
+
+    raise FFNNException("Unsupported hidden activation: %s" % (activation, ))
+
+
+class NumpyFFNN(object):
+    """ Implements the prediction of the feed-forward neural networks trained by TheanoFFNN using only NumPy.
+
+      -- input layer - activation function linear
+      -- hidden layers - activation function tanh, sigmoid, softplus or relu
+      -- output layer - activation function softmax
+
+    It loads the models saved by TheanoFFNN without importing Theano. The layers are computed in float32
+    into preallocated buffers, which grow with the largest batch of input frames.
+    """
+    def __init__(self):
+        self.weights = []
+        self.biases = []
+        self.hidden_activation = 'tanh'
+
+        self.input_m = 0.0
+        self.input_std = 1.0
+        self.n_inputs = 0
+        self.n_outputs = 0
+        self.n_hidden = []
+        self.weight_l2 = 0.0
+        self.prev_frames = 0
+        self.next_frames = 0
+        self.batch_size = 0
+        self.amp = [1.0, ]
+        self.amp_vec = np.ones(0)
+
+        self.buffers = []
+
+    def __str__(self):
+        s = ["Network layers:"]
+        for w, b in zip(self.weights, self.biases):
+            s.append(str(w.shape) + " : " + str(b.shape))
+        s.append("Hidden activation: " + self.hidden_activation)
+
+        return "\n".join(s)
+
+    def set_params(self, params):
+        """ Set the NN params in the format of TheanoFFNN.get_params().
+        """
+        self.input_m, \
+        self.input_std, \
+        layers, \
+        self.n_hidden, \
+        hidden_activation, \
+        self.n_inputs, \
+        self.n_outputs, \
+        self.weight_l2, \
+        self.prev_frames, \
+        self.next_frames, \
+        self.batch_size, \
+        self.amp, \
+        self.amp_vec = params
+
+        self.hidden_activation = activation_name(hidden_activation)
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in layers[0::2]]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in layers[1::2]]
+
+        for w, next_w in zip(self.weights[:-1], self.weights[1:]):
+            if w.shape[1] != next_w.shape[0]:
+                raise FFNNException("Incompatible layers: " + str(w.shape) + " " + str(next_w.shape))
+
+        self.buffers = []
+
+    def get_params(self):
+        """ Get all NN params, the hidden activation is stored by its name.
+        """
+        layers = []
+        for w, b in zip(self.weights, self.biases):
+            layers.extend([w, b])
+
+        return (self.input_m,
+                self.input_std,
+                layers,
+                self.n_hidden,
+                self.hidden_activation,
+                self.n_inputs,
+                self.n_outputs,
+                self.weight_l2,
+                self.prev_frames,
+                self.next_frames,
+                self.batch_size,
+                self.amp,
+                self.amp_vec,
+                )
+
+    def load(self, file_name):
+        """ Loads a NN saved by TheanoFFNN or NumpyFFNN.
+
+        :param file_name: file name of the saved NN
+        :return: None
+        """
+        self.set_params(load_params(file_name))
+
+    def save(self, file_name):
+        """ Saves the NN into a file which can be loaded without Theano.
+
+        :param file_name: name of the file where the NN will be saved
+        :return: None
+        """
+        with open(file_name, "wb") as f:
+            pickle.dump(self.get_params(), f, pickle.HIGHEST_PROTOCOL)
+
+    def _get_buffers(self, n_frames):
+        """ Returns the buffers for the input and the outputs of all layers for at least n_frames frames."""
+        if not self.buffers or len(self.buffers[0]) < n_frames:
+            n_rows = max(n_frames, 2 * len(self.buffers[0]) if self.buffers else 1)
+            self.buffers = [np.empty((n_rows, self.weights[0].shape[0]), dtype=np.float32)]
+            self.buffers += [np.empty((n_rows, w.shape[1]), dtype=np.float32) for w in self.weights]
+
+        return [b[:n_frames] for b in self.buffers]
+
+    def _activate(self, y):
+        if self.hidden_activation == 'tanh':
+            np.tanh(y, out=y)
+        elif self.hidden_activation == 'sigmoid':
+            np.negative(y, out=y)
+            np.exp(y, out=y)
+            y += 1.0
+            np.reciprocal(y, out=y)
+        elif self.hidden_activation == 'softplus':
+            np.logaddexp(0.0, y, out=y)
+        else:
+            np.maximum(y, 0.0, out=y)
+
+    def _forward(self, buffers):
+        y = buffers[0]
+        for i, (w, b, out) in enumerate(zip(self.weights, self.biases, buffers[1:])):
+            np.dot(y, w, out=out)
+            out += b
+
+            if i < len(self.weights) - 1:
+                self._activate(out)
+            y = out
+
+        # softmax over the outputs of every frame
+        y -= y.max(axis=1)[:, np.newaxis]
+        np.exp(y, out=y)
+        y /= y.sum(axis=1)[:, np.newaxis]
+
+        return y.copy()
+
+    def predict(self, data_x, batch_size=0, prev_frames=0, next_frames=0):
+        """ Returns the outputs of the last layer for every row of data_x.
+
+        :param data_x: a matrix with the input vectors in its rows
+        :param batch_size: the number of rows computed at once, all rows if 0
+        :param prev_frames: the number of previous frames stacked to every frame, see frame_multiply_x
+        :param next_frames: the number of next frames stacked to every frame, see frame_multiply_x
+        :return: a matrix of the probabilities of the classes
+        """
+        if not batch_size:
+            batch_size = max(len(data_x), 1)
+
+        res = []
+        for i in range(0, len(data_x), batch_size):
+            if prev_frames or next_frames:
+                mx = self.frame_multiply_x(data_x[i:i + batch_size], prev_frames, next_frames)
+            else:
+                mx = data_x[i:i + batch_size]
+
+            buffers = self._get_buffers(len(mx))
+            buffers[0][:] = mx
+            res.append(self._forward(buffers))
+
+        if len(res) == 1:
+            return res[0]
+        return np.vstack(res) if res else np.empty((0, self.weights[-1].shape[1]), dtype=np.float32)
+
+    def predict_normalise(self, input):
+        """ Normalises the input vectors as TheanoFFNN does and returns the outputs of the last layer.
+
+        Unlike in TheanoFFNN, the input matrix is not modified.
+        """
+        buffers = self._get_buffers(len(input))
+        x = buffers[0]
+        x[:] = input
+        x -= self.input_m
+        x /= self.input_std
+        x *= self.amp_vec
+
+        return self._forward(buffers)
+
+    def frame_multiply_x(self, x, prev_frames, next_frames):
+        """ Stacks the amplified previous and next frames to every frame as TheanoFFNN.frame_multiply_x() does.
+
+        The result has one row for every frame which has all its context in x.
+        """
+        x = np.asarray(x)
+        n_context = self.prev_frames + 1 + self.next_frames
+        n_rows = len(x) - n_context
+
+        mx = np.empty((max(n_rows, 0), n_context * x.shape[1]), dtype=np.result_type(x, np.float32))
+        for c, a in enumerate(self.amp):
+            mx[:, c * x.shape[1]:(c + 1) * x.shape[1]] = x[c:c + n_rows]
+            mx[:, c * x.shape[1]:(c + 1) * x.shape[1]] *= a
+
+        return mx
+
+
+def convert(theano_file_name, file_name):
+    """ Converts a TheanoFFNN model into a NumpyFFNN model.
+
+    :param theano_file_name: the file saved by TheanoFFNN.save()
+    :param file_name: the output file
+    :return: the converted network
+    """
+    nn = NumpyFFNN()
+    nn.load(theano_file_name)
+    nn.save(file_name)
+
+    return nn
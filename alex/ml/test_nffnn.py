@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import cPickle as pickle
+import os
+import sys
+import tempfile
+import types
+import unittest
+
+import numpy as np
+
+from alex.ml.nffnn import NumpyFFNN, convert
+
+
+class Elemwise(object):
+    """Mimics the pickled state of theano.tensor.elemwise.Elemwise."""
+    def __init__(self, name):
+        self.name = name
+        self.scalar_op = None
+
+    def __getstate__(self):
+        return {'name': self.name, 'scalar_op': self.scalar_op}
+
+
+def save_theano_model(file_name, params):
+    """Pickles the parameters as TheanoFFNN.save() does, the activation is pickled as a Theano object."""
+    names = ['theano', 'theano.tensor', 'theano.tensor.elemwise']
+    for name in names:
+        sys.modules[name] = types.ModuleType(name)
+    sys.modules['theano.tensor.elemwise'].Elemwise = Elemwise
+    Elemwise.__module__ = 'theano.tensor.elemwise'
+    try:
+        with open(file_name, 'wb') as f:
+            pickle.dump(params, f)
+    finally:
+        for name in names:
+            del sys.modules[name]
+        Elemwise.__module__ = __name__
+
+
+def predict_reference(params, x):
+    input_m, input_std, layers, activation = params[0], params[1], params[2], params[4]
+    activation = {'tanh': np.tanh, 'sigmoid': lambda y: 1.0 / (1.0 + np.exp(-y))}[activation.name]
+
+    y = (x - input_m) / input_std * params[12]
+    for i in range(0, len(layers), 2):
+        y = np.dot(y, layers[i]) + layers[i + 1]
+        if i < len(layers) - 2:
+            y = activation(y)
+
+    y = np.exp(y - y.max(axis=1)[:, np.newaxis])
+    return y / y.sum(axis=1)[:, np.newaxis]
+
+
+class TestNumpyFFNN(unittest.TestCase):
+    def setUp(self):
+        self.rnd = np.random.RandomState(0)
+        self.file_name = tempfile.mktemp()
+
+    def tearDown(self):
+        for file_name in [self.file_name, self.file_name + '.nffnn']:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+
+    def create_params(self, activation):
+        layers = []
+        for n1, n2 in [(12, 16), (16, 8), (8, 2)]:
+            layers.append(self.rnd.uniform(-0.5, 0.5, size=(n1, n2)).astype(np.float32))
+            layers.append(self.rnd.uniform(-0.1, 0.1, size=n2).astype(np.float32))
+
+        amp = [0.5, 1.0, 0.5]
+        return (self.rnd.randn(12), self.rnd.rand(12) + 0.5, layers, [16, 8], Elemwise(activation), 12, 2, 1e-6,
+                1, 1, 100, amp, np.repeat(amp, 4))
+
+    def test_theano_model(self):
+        for activation in ['tanh', 'sigmoid']:
+            params = self.create_params(activation)
+            save_theano_model(self.file_name, params)
+
+            nn = NumpyFFNN()
+            nn.load(self.file_name)
+            self.assertEqual(nn.hidden_activation, activation)
+
+            x = self.rnd.randn(50, 12).astype(np.float32)
+            x_copy = x.copy()
+            expected = predict_reference(params, x)
+            for batch in [x, x[:1], x[:7]]:
+                y = nn.predict_normalise(batch)
+                self.assertEqual(y.dtype, np.float32)
+                self.assertTrue(np.allclose(y, expected[:len(batch)], atol=1e-5))
+            # the input is not modified
+            self.assertTrue(np.array_equal(x, x_copy))
+
+            converted = convert(self.file_name, self.file_name + '.nffnn')
+            nn = NumpyFFNN()
+            nn.load(self.file_name + '.nffnn')
+            self.assertEqual(nn.hidden_activation, activation)
+            self.assertTrue(np.array_equal(nn.predict_normalise(x), converted.predict_normalise(x)))
+
+    def test_frame_multiply_x(self):
+        nn = NumpyFFNN()
+        nn.set_params(self.create_params('tanh'))
+
+        x = self.rnd.randn(10, 4).astype(np.float32)
+        rows = [(c, c + len(x) - 3) for c in range(0, 3)]
+        expected = np.hstack([a * x[l:r] for a, (l, r) in zip(nn.amp, rows)])
+
+        self.assertTrue(np.array_equal(nn.frame_multiply_x(x, 1, 1), expected))
+        self.assertTrue(np.array_equal(nn.predict(x, batch_size=4, prev_frames=1, next_frames=1),
+                                       np.vstack([nn.predict(nn.frame_multiply_x(x[i:i + 4], 1, 1))
+                                                  for i in range(0, 10, 4)])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import imp
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.ml.nffnn import NumpyFFNN, load_params
+
+
+def create_engine(engine, file_name):
+    """Loads the model by the NumPy engine or by TheanoFFNN, which compiles the Theano function of the network.
+
+    The parameters are read without Theano for both engines so that the models created by this script, which store
+    the hidden activation by its name, can be loaded by TheanoFFNN as well.
+    """
+    if engine == 'numpy':
+        nn = NumpyFFNN()
+        nn.load(file_name)
+        return nn
+
+    from theano import tensor as T
+    from alex.ml.tffnn import TheanoFFNN
+
+    params = list(load_params(file_name))
+    numpy_nn = NumpyFFNN()
+    numpy_nn.set_params(params)
+    params[4] = {'tanh': T.tanh, 'sigmoid': T.nnet.sigmoid, 'softplus': T.nnet.softplus}[numpy_nn.hidden_activation]
+
+    nn = TheanoFFNN()
+    nn.set_params(tuple(params))
+    return nn
+
+
+def startup(engine, file_name):
+    """Runs the import of the engine, the loading of the model and the first prediction in a new process as the VAD
+    does when a dialogue system starts.
+
+    :return: the wall time of the startup in seconds
+    """
+    script = "import sys, time, numpy as np\n" \
+             "start = time.time()\n" \
+             "from alex.tools.vad.benchmark_ffnn import create_engine\n" \
+             "nn = create_engine(sys.argv[1], sys.argv[2])\n" \
+             "nn.predict_normalise(np.zeros((1, nn.n_inputs), dtype=np.float32))\n" \
+             "print time.time() - start\n"
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')),
+                                         env.get('PYTHONPATH', '')])
+    output = subprocess.check_output([sys.executable, '-c', script, engine, file_name], env=env)
+    return float(output.split()[-1])
+
+
+def create_model(file_name, n_inputs, n_hidden_units, n_hidden_layers, n_outputs):
+    """Saves a random network with the shape of the VAD models."""
+    rnd = np.random.RandomState(0)
+    sizes = [n_inputs] + [n_hidden_units] * n_hidden_layers + [n_outputs]
+
+    layers = []
+    for n1, n2 in zip(sizes[:-1], sizes[1:]):
+        layers.append(rnd.uniform(-0.1, 0.1, size=(n1, n2)).astype(np.float32))
+        layers.append(np.zeros(n2, dtype=np.float32))
+
+    nn = NumpyFFNN()
+    nn.set_params((rnd.randn(n_inputs), rnd.rand(n_inputs) + 0.5, layers, sizes[1:-1], 'tanh', n_inputs, n_outputs,
+                   1e-6, 0, 0, 0, [1.0], np.ones(n_inputs)))
+    nn.save(file_name)
+
+
+def benchmark(engine, file_name, n_frames, rnd):
+    """
+    Measures the startup and the latency of the prediction of a single frame as the VAD calls predict_normalise()
+    for every frame.
+
+    :return: the startup time, the time per frame and the outputs for the frames
+    """
+    startup_time = startup(engine, file_name)
+
+    nn = create_engine(engine, file_name)
+    frames = rnd.randn(n_frames, nn.n_inputs).astype(np.float32)
+
+    outputs = []
+    start = time.time()
+    for frame in frames:
+        outputs.append(nn.predict_normalise(frame.reshape(1, -1).copy())[0])
+    frame_time = (time.time() - start) / n_frames
+
+    return startup_time, frame_time, np.array(outputs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Compares the startup time (import, loading of the model and the first prediction) and the per-frame latency
+        of the NumPy inference engine of the VAD neural networks with TheanoFFNN.
+
+        TheanoFFNN is measured only if Theano can be imported. Without a model, a random network of the size
+        of the VAD models is used.
+      """)
+
+    parser.add_argument('-m', '--model', default=None,
+                        help='a model saved by TheanoFFNN or NumpyFFNN')
+    parser.add_argument('-n', '--frames', type=int, default=1000,
+                        help='the number of frames')
+    parser.add_argument('--n_inputs', type=int, default=1196,
+                        help='the number of inputs of the random network')
+    parser.add_argument('--n_hidden_units', type=int, default=512,
+                        help='the number of units in the hidden layers of the random network')
+    parser.add_argument('--n_hidden_layers', type=int, default=1,
+                        help='the number of hidden layers of the random network')
+    args = parser.parse_args()
+
+    file_name = args.model
+    if not file_name:
+        file_name = tempfile.mktemp()
+        create_model(file_name, args.n_inputs, args.n_hidden_units, args.n_hidden_layers, 2)
+
+    engines = ['numpy']
+    try:
+        imp.find_module('theano')
+        engines.append('theano')
+    except ImportError:
+        pass
+
+    try:
+        print "=" * 120
+        print "FFNN VAD benchmark: %s" % (file_name if args.model else "random network")
+        print "-" * 120
+        results = {}
+        for engine in engines:
+            results[engine] = benchmark(engine, file_name, args.frames, np.random.RandomState(0))
+            startup_time, frame_time, outputs = results[engine]
+            print "%-8s startup: %8.3f s  per frame: %8.3f ms  frames/s: %10.1f" % \
+                  (engine, startup_time, 1e3 * frame_time, 1.0 / frame_time)
+
+        if 'theano' in results:
+            print "-" * 120
+            print "speed-up  startup: %8.1f  per frame: %8.1f  max. difference: %g" % \
+                  (results['theano'][0] / results['numpy'][0], results['theano'][1] / results['numpy'][1],
+                   np.max(np.abs(results['theano'][2] - results['numpy'][2])))
+        else:
+            print "Theano is not installed, TheanoFFNN is not measured."
+        print "=" * 120
+    finally:
+        if not args.model:
+            os.remove(file_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import math
+import struct
+import time
+import wave
+from collections import deque
+
+import numpy as np
+from scipy.misc import logsumexp
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.utils.config import Config
+
+
+def decide_per_frame(vad, vad_cfg, data, state):
+    """The streaming loop of the VADs as it was before the batched front end: the PCM data is unpacked into a list,
+    the list is re-sliced for every frame shift, every frame is parametrised and scored alone, and the whole
+    smoothing window is recomputed for every frame.
+
+    It only reuses the front end and the models of the VAD, and it serves as the reference for the speed and
+    the results of vad.decide().
+    """
+    data = struct.unpack('%dh' % (len(data) / 2, ), data)
+    state['audio'].extend(data)
+
+    while len(state['audio']) > vad_cfg['framesize']:
+        frame = state['audio'][:vad_cfg['framesize']]
+        state['audio'] = state['audio'][vad_cfg['frameshift']:]
+
+        mfcc = vad.front_end.param(frame)
+
+        if hasattr(vad, 'gmm_speech'):
+            log_prob_speech = vad.gmm_speech.score(mfcc)
+            log_prob_sil = vad.gmm_sil.score(mfcc)
+        else:
+            prob_sil, prob_speech = vad.ffnn.predict_normalise(mfcc.reshape(1, len(mfcc)))[0]
+            log_prob_speech, log_prob_sil = np.log(prob_speech), np.log(prob_sil)
+
+        state['speech'].append(log_prob_speech)
+        state['sil'].append(log_prob_sil)
+
+        log_prob_speech_avg = 0.0
+        for log_prob_speech, log_prob_sil in zip(state['speech'], state['sil']):
+            log_prob_speech_avg += log_prob_speech - logsumexp([log_prob_speech, log_prob_sil])
+        log_prob_speech_avg /= len(state['speech'])
+
+        state['decision'] = np.exp(log_prob_speech_avg)
+
+    return state['decision']
+
+
+def decide_power_per_sample(vad_cfg, frame, state):
+    """The decision of the PowerVAD as it was before the NumPy energies: the samples of every frame are unpacked
+    and squared in a Python list.
+
+    It serves as the reference for the speed and the results of PowerVAD.decide().
+    """
+    state['in_frames'] += 1
+
+    a = struct.unpack('%dh' % (len(frame) / 2, ), frame)
+    a = [abs(x) ** 2 for x in a]
+    energy = math.sqrt(sum(a)) / len(a)
+
+    if state['in_frames'] < vad_cfg['adaptation_frames']:
+        state['threshold'] = (state['in_frames'] * state['threshold'] + energy) / (state['in_frames'] + 1)
+
+    return 1.0 if energy > vad_cfg['threshold_multiplier'] * state['threshold'] else 0.0
+
+
+def load_audio(file_name, seconds, sample_rate):
+    """Loads a 16 bit mono wave file or generates noise with a changing level if no file is given."""
+    if file_name:
+        wf = wave.open(file_name, 'r')
+        data = wf.readframes(wf.getnframes())
+        wf.close()
+        return data
+
+    rnd = np.random.RandomState(0)
+    n_segments = int(seconds * 10)
+    levels = np.repeat(rnd.rand(n_segments) * 3000.0, sample_rate / 10)
+    return (rnd.randn(len(levels)) * levels).astype(np.int16).tostring()
+
+
+def benchmark(cfg, vad_type, data, packet_size):
+    """
+    Streams the audio through a VAD in packets as the VAD component does and compares the per-frame reference loop
+    with the batched front end. The PowerVAD decides every packet as one frame.
+
+    :return: the number of frames, the frames per second of CPU time for both versions, and the maximum difference
+             of the decisions
+    """
+    if vad_type == 'power':
+        from alex.components.vad.power import PowerVAD as VAD
+    elif vad_type == 'gmm':
+        from alex.components.vad.gmm import GMMVAD as VAD
+    else:
+        from alex.components.vad.ffnn import FFNNVAD as VAD
+
+    vad_cfg = cfg['VAD'][vad_type]
+    packets = [data[i:i + packet_size] for i in range(0, len(data), packet_size)]
+
+    vad = VAD(cfg)
+    start = time.clock()
+    if vad_type == 'power':
+        state = {'in_frames': 0, 'threshold': vad_cfg['threshold']}
+        reference = [decide_power_per_sample(vad_cfg, packet, state) for packet in packets]
+    else:
+        state = {'audio': [], 'decision': 0.0,
+                 'speech': deque(maxlen=vad_cfg['filter_length']), 'sil': deque(maxlen=vad_cfg['filter_length'])}
+        reference = [decide_per_frame(vad, vad_cfg, packet, state) for packet in packets]
+    reference_time = time.clock() - start
+
+    vad = VAD(cfg)
+    start = time.clock()
+    decisions = [vad.decide(packet) for packet in packets]
+    batched_time = time.clock() - start
+
+    if vad_type == 'power':
+        n_frames = len(packets)
+    else:
+        n_frames = max(0, (len(data) / 2 - vad_cfg['framesize'] - 1) // vad_cfg['frameshift'] + 1)
+    diff = np.max(np.abs(np.array(reference) - np.array(decisions))) if packets else 0.0
+
+    return n_frames, n_frames / reference_time, n_frames / batched_time, diff
+
+
+def benchmark_power_batch(cfg, data, packet_size):
+    """
+    Decides all the whole packets of the audio by one call of PowerVAD.decide_batch() as an offline segmentation
+    would and compares the decisions with the packets decided one by one.
+
+    :return: the frames per second of CPU time and the maximum difference of the decisions
+    """
+    from alex.components.vad.power import PowerVAD
+
+    frames = np.frombuffer(data[:len(data) // packet_size * packet_size], dtype=np.int16).reshape(-1, packet_size / 2)
+
+    vad = PowerVAD(cfg)
+    start = time.clock()
+    decisions = vad.decide_batch(frames)
+    batch_time = time.clock() - start
+
+    vad = PowerVAD(cfg)
+    reference = [vad.decide(frame.tostring()) for frame in frames]
+    diff = np.max(np.abs(np.array(reference) - decisions)) if len(frames) else 0.0
+
+    return len(frames) / batch_time, diff
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Measures the number of frames per second of CPU time processed by the power, GMM and FFNN VADs with
+        the original per-frame processing and with the batched streaming front end or, for the power VAD,
+        the NumPy energies.
+
+        The VAD models are taken from the configuration.
+      """)
+
+    parser.add_argument('-c', '--configs', nargs='+',
+                        help='additional configuration files')
+    parser.add_argument('-t', '--types', nargs='+', default=['gmm', ],
+                        help='the benchmarked VAD types: power, gmm, ffnn')
+    parser.add_argument('-w', '--wav', default=None,
+                        help='a 16 bit mono wave file, noise is generated if not given')
+    parser.add_argument('-s', '--seconds', type=float, default=60.0,
+                        help='the length of the generated noise in seconds')
+    parser.add_argument('-p', '--packet-frames', type=int, default=1,
+                        help='the number of audio frames in a packet passed to the VAD')
+    args = parser.parse_args()
+
+    cfg = Config.load_configs(args.configs)
+
+    data = load_audio(args.wav, args.seconds, cfg['Audio']['sample_rate'])
+    packet_size = 2 * cfg['Audio']['samples_per_frame'] * args.packet_frames
+
+    print "=" * 120
+    print "VAD benchmark: %.1f s of audio, packets of %d B" % (len(data) / 2.0 / cfg['Audio']['sample_rate'],
+                                                               packet_size)
+    print "-" * 120
+    for vad_type in args.types:
+        n_frames, reference_fps, batched_fps, diff = benchmark(cfg, vad_type, data, packet_size)
+
+        print "%-5s frames: %8d  per-frame: %10.0f frames/s  batched: %10.0f frames/s  speed-up: %6.2f  " \
+              "max. difference: %g" % (vad_type, n_frames, reference_fps, batched_fps, batched_fps / reference_fps,
+                                       diff)
+        if vad_type == 'power':
+            batch_fps, diff = benchmark_power_batch(cfg, data, packet_size)
+            print "%-5s frames: %8d  one batch: %10.0f frames/s  speed-up: %6.2f  max. difference: %g" % \
+                  (vad_type, n_frames, batch_fps, batch_fps / reference_fps, diff)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.ml.nffnn import convert
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Converts the VAD models saved by TheanoFFNN into the models of the NumPy inference engine (NumpyFFNN).
+
+        The NumPy engine loads the TheanoFFNN models as well, the converted models only do not need the placeholders
+        of the pickled Theano objects and they are stored with the highest pickle protocol so that they load faster.
+      """)
+
+    parser.add_argument('theano_model', help='the model saved by TheanoFFNN')
+    parser.add_argument('model', help='the output model')
+    args = parser.parse_args()
+
+    nn = convert(args.theano_model, args.model)
+    print nn
+    print "Saved into:", args.model
+
+
+if __name__ == '__main__':
+    main()
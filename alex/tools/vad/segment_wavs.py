@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import fnmatch
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.components.vad.common import get_speech_segments, get_vad_type, smoothe_decisions, vad_factory
+from alex.utils.audio import load_wav
+from alex.utils.config import Config
+
+# the configuration of the worker process
+_cfg = None
+
+
+def init_worker(configs):
+    global _cfg
+    _cfg = Config.load_configs(configs, log=False)
+
+
+def segment_wav(file_name):
+    """
+    Segments the wave file by the VAD of the worker process as the VAD component segments the audio stream. The audio
+    is decided in frames of samples_per_frame samples, all the frames of the file at once, and the last incomplete
+    frame is left out.
+
+    :return: the file name, the duration in seconds, the list of the start and end times of the speech segments
+             in seconds, the CPU time and the error or None
+    """
+    start = time.clock()
+    try:
+        samples_per_frame = _cfg['Audio']['samples_per_frame']
+        samples = np.frombuffer(load_wav(_cfg, file_name), dtype=np.int16)
+        frames = samples[:len(samples) // samples_per_frame * samples_per_frame].reshape(-1, samples_per_frame)
+
+        vad = vad_factory(get_vad_type(_cfg), _cfg)
+        segments = get_speech_segments(_cfg, smoothe_decisions(_cfg, vad.decide_batch(frames)))
+
+        frame_time = float(samples_per_frame) / _cfg['Audio']['sample_rate']
+        return (file_name, len(samples) / float(_cfg['Audio']['sample_rate']),
+                [(start_frame * frame_time, end_frame * frame_time) for start_frame, end_frame in segments],
+                time.clock() - start, None)
+    except Exception as e:
+        return file_name, 0.0, [], time.clock() - start, '%s: %s' % (type(e).__name__, e)
+
+
+def find_wavs(paths):
+    """Returns the wave files given or found in the given directories."""
+    wavs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in sorted(os.walk(path)):
+                wavs.extend(os.path.join(root, f) for f in sorted(fnmatch.filter(files, '*.wav')))
+        else:
+            wavs.append(path)
+
+    return wavs
+
+
+def write_mlf(f, file_name, duration, segments):
+    """Writes the segments of the file labelled as speech and the rest labelled as sil in HTK 100ns units."""
+    f.write('"%s.lab"\n' % os.path.splitext(file_name)[0].replace('./data/', '*/'))
+
+    last_end = 0
+    for start, end in [(int(start * 1e7), int(end * 1e7)) for start, end in segments] + [(int(duration * 1e7), None)]:
+        if start > last_end:
+            f.write('%d %d sil\n' % (last_end, start))
+        if end is not None:
+            f.write('%d %d speech\n' % (start, end))
+            last_end = end
+    f.write('.\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Segments wave files into speech and silence by the VAD of the configuration in a pool of processes.
+
+        The VAD decides all the frames of a file at once and the decisions are smoothed the same way as the VAD
+        component of the dialogue system does, so the segments are the segments the system would record. The speech
+        segments are saved as a list of the files with the start and end times in seconds and as a MLF with the speech
+        and sil labels. The throughput is reported in hours of audio per hour of CPU time of the workers.
+
+        Example:
+          ./segment_wavs.py -c ../../resources/default.cfg vad.cfg -s segments.txt -m vad.mlf ./data
+      """)
+
+    parser.add_argument('paths', nargs='+',
+                        help='the wave files or the directories with the wave files')
+    parser.add_argument('-c', '--configs', nargs='+', default=[],
+                        help='additional configuration files')
+    parser.add_argument('-s', '--segments', default=None,
+                        help='save the list of the speech segments')
+    parser.add_argument('-m', '--mlf', default=None,
+                        help='save the segments as a MLF')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='the number of processes')
+    args = parser.parse_args()
+
+    wavs = find_wavs(args.paths)
+
+    start = time.time()
+    pool = multiprocessing.Pool(args.jobs, init_worker, (args.configs, ))
+    try:
+        results = pool.map(segment_wav, wavs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+    wall_time = time.time() - start
+
+    if args.segments:
+        with open(args.segments, 'w') as f:
+            for file_name, _, segments, _, error in results:
+                for segment_start, segment_end in segments:
+                    f.write('%s %.3f %.3f\n' % (file_name, segment_start, segment_end))
+
+    if args.mlf:
+        with open(args.mlf, 'w') as f:
+            f.write('#!MLF!#\n')
+            for file_name, duration, segments, _, error in results:
+                if error is None:
+                    write_mlf(f, file_name, duration, segments)
+
+    failures = [(file_name, error) for file_name, _, _, _, error in results if error is not None]
+    audio_hours = sum(duration for _, duration, _, _, _ in results) / 3600.0
+    speech_hours = sum(end - start for _, _, segments, _, _ in results for start, end in segments) / 3600.0
+    cpu_hours = sum(cpu_time for _, _, _, cpu_time, _ in results) / 3600.0
+
+    print "=" * 120
+    print "VAD segmentation: %d files, %d failed, %d jobs" % (len(wavs), len(failures), args.jobs)
+    print "-" * 120
+    print "audio: %.3f h  speech: %.3f h  segments: %d" % \
+          (audio_hours, speech_hours, sum(len(segments) for _, _, segments, _, _ in results))
+    print "wall time: %.1f s  CPU time: %.1f s  audio-hours per CPU-hour: %.1f  audio-hours per wall-hour: %.1f" % \
+          (wall_time, 3600.0 * cpu_hours, audio_hours / max(cpu_hours, 1e-9), audio_hours / (wall_time / 3600.0))
+    if failures:
+        print "-" * 120
+        print "Failures:"
+        for file_name, error in failures[:10]:
+            print "  %s\n    %s" % (file_name, error)
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
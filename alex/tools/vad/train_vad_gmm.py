@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 import numpy as np
 import datetime
+import os
 from multiprocessing import *
 
 
@@ -16,6 +17,10 @@ max_frames_per_segment = 50
 trim_segments = 0
 n_iter = 10
 n_mixies = 64 # 32 # 16
+n_features = 36
+
+# the training frames of a label are stored in this file so that they do not have to fit in memory
+train_frames_file = 'model_voip/vad_%s_train_frames.f64'
 
 
 def load_mlf(train_data_sil_aligned, max_files, max_frames_per_segment):
@@ -63,11 +68,12 @@ def mixup(gmm, vta, name):
     print "-" * 120
 
 
-def train_gmm(name, vta):
+def train_gmm(name, n_frames):
 
-    vta = [frame for frame, label in vta if label == name]
+    # the frames are read from the disk in blocks by GMM.fit in every iteration
+    vta = np.memmap(train_frames_file % name, dtype=np.float64, mode='r', shape=(n_frames, n_features))
 
-    gmm = GMM(n_features=36, n_components=1, n_iter=n_iter)
+    gmm = GMM(n_features=n_features, n_components=1, n_iter=n_iter)
     gmm.fit(vta)
     while len(gmm.weights) < n_mixies:
         mixup(gmm, vta, name)
@@ -99,7 +105,8 @@ if __name__ == '__main__':
     vta.append_trn(train_data_speech)
 
     print "Generating the MFCC features"
-    train = []
+    train_files = {}
+    n_train = {'speech': 0, 'sil': 0}
     test = []
     i = 0
     for frame, label in vta:
@@ -112,13 +119,21 @@ if __name__ == '__main__':
 
         if i < n_crossvalid_frames:
             test.append((frame, label))
-        else:
-            train.append((frame, label))
+        elif label in n_train:
+            if label not in train_files:
+                train_files[label] = open(train_frames_file % label, 'wb')
+            np.asarray(frame, dtype=np.float64).tofile(train_files[label])
+            n_train[label] += 1
 
         i += 1
 
-    p_speech = Process(target=train_gmm, args=('speech',train))
-    p_sil = Process(target=train_gmm, args=('sil', train))
+    for f in train_files.values():
+        f.close()
+
+    print "Training frames:", n_train
+
+    p_speech = Process(target=train_gmm, args=('speech', n_train['speech']))
+    p_sil = Process(target=train_gmm, args=('sil', n_train['sil']))
     p_speech.start()
     p_sil.start()
 
@@ -129,6 +144,9 @@ if __name__ == '__main__':
     print "Speech GMM training finished"
     print datetime.datetime.now()
 
+    for label in train_files:
+        os.remove(train_frames_file % label)
+
     #train_speech_gmm()
     #train_sil_gmm()
 
@@ -148,24 +166,13 @@ if __name__ == '__main__':
     print "Length of test data:", len(vta)
     print datetime.datetime.now()
 
-    accuracy = 0.0
-    n = 0
-    for frame, label in vta:
-        log_prob_speech = gmm_speech.score(frame)
-        log_prob_sil = gmm_sil.score(frame)
-
-        ratio = log_prob_speech - log_prob_sil
-        if ratio >= 0:
-            rec_label = 'speech'
-        else:
-            rec_label = 'sil'
-
-        if rec_label == label:
-            accuracy += 1.0
+    frames = np.array([frame for frame, label in vta])
+    labels = np.array([label for frame, label in vta])
 
-        n += 1
+    ratio = gmm_speech.score_samples(frames) - gmm_sil.score_samples(frames)
+    rec_labels = np.where(ratio >= 0, 'speech', 'sil')
 
-    accuracy = accuracy * 100.0 / n
+    accuracy = np.mean(rec_labels == labels) * 100.0
 
     print "VAD accuracy : %0.3f%% " % accuracy
     print datetime.datetime.now()
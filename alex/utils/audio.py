@@ -3,15 +3,17 @@
 # This code is PEP8-compliant. See http://www.python.org/dev/peps/pep-0008.
 
 import os
-import pysox
-import audioop
+import io
 import wave
 import subprocess
 import contextlib
 
+import numpy as np
+
 from os import remove, fdopen
 from tempfile import mkstemp
 
+import alex.utils.dsp as dsp
 import alex.utils.various as various
 
 """ The audio module implements some basic audio data manipulation.
@@ -53,12 +55,7 @@ def load_wav(cfg, file_name):
         sample_rate = wf.getframerate()
 
         # read all the samples
-        chunk = 1024
-        wav = b''
-        wavPart = wf.readframes(chunk)
-        while wavPart:
-            wav += str(wavPart)
-            wavPart = wf.readframes(chunk)
+        wav = wf.readframes(wf.getnframes())
     except EOFError:
         raise Exception('Input wave is corrupted: End of file.')
     else:
@@ -66,58 +63,31 @@ def load_wav(cfg, file_name):
 
     # resample audio if not compatible
     if sample_rate != cfg['Audio']['sample_rate']:
-        wav, state = audioop.ratecv(wav, 2, 1, sample_rate,
-                                    cfg['Audio']['sample_rate'], None)
+        samples = np.frombuffer(wav, dtype=np.int16)
+        wav = dsp.to_pcm16(dsp.resample(samples, sample_rate, cfg['Audio']['sample_rate'])).tostring()
 
     return wav
 
 
 def convert_wav(cfg, wav):
     """
-    Convert the given WAV byte buffer into the desired sample rate
-    using SoX. Assumes mono + 16-bit sample size.
+    Convert the given WAV byte buffer into the desired sample rate.
+    Assumes mono + 16-bit sample size.
     """
-    sample_rate = cfg['Audio']['sample_rate']
-
-    # write the buffer to a temporary file
-    tmp1fh, tmp1path = mkstemp()
-    tmp1fh = fdopen(tmp1fh, 'wb')
-    tmp1fh.write(wav)
-    tmp1fh.close()
-
-    # transform the temporary file using SoX (can't do this in memory :-()
-    tmp2fh, tmp2path = mkstemp()
-    sox_in = pysox.CSoxStream(tmp1path)
-    sox_out = pysox.CSoxStream(tmp2path, 'w', pysox.CSignalInfo(sample_rate, 1, 16), fileType='wav')
-    sox_chain = pysox.CEffectsChain(sox_in, sox_out)
-    sox_chain.add_effect(pysox.CEffect("rate", [str(sample_rate)]))
-    sox_chain.flow_effects()
-    sox_out.close()
 
-    # read the transformation results back to the buffer
-    return load_wav(cfg, fdopen(tmp2fh, 'rb'))
+    return load_wav(cfg, io.BytesIO(wav))
 
 def change_tempo(cfg, tempo, wav):
     """
     Change tempo of an input WAV byte buffer.
     """
-    sample_rate = cfg['Audio']['sample_rate']
 
-    # write the buffer to a temporary file
-    tmp1fh, tmp1path = mkstemp()
-    save_wav(cfg, tmp1path, wav)
+    if tempo == 1.0 or len(wav) == 0:
+        return wav
 
-    # transform the temporary file using SoX (can't do this in memory :-()
-    tmp2fh, tmp2path = mkstemp()
-    sox_in = pysox.CSoxStream(tmp1path)
-    sox_out = pysox.CSoxStream(tmp2path, 'w', pysox.CSignalInfo(sample_rate, 1, 16), fileType='wav')
-    sox_chain = pysox.CEffectsChain(sox_in, sox_out)
-    sox_chain.add_effect(pysox.CEffect("tempo", [str(tempo)]))
-    sox_chain.flow_effects()
-    sox_out.close()
+    samples = np.frombuffer(wav, dtype=np.int16, count=len(wav) // 2)
 
-    # read the transformation results back to the buffer
-    return load_wav(cfg, fdopen(tmp2fh, 'rb'))
+    return dsp.to_pcm16(dsp.wsola(samples, tempo, cfg['Audio']['sample_rate'])).tostring()
 
 def save_wav(cfg, file_name, wav):
     """
@@ -163,6 +133,9 @@ def convert_mp3_to_wav(cfg, mp3_string):
 
     """
 
+    # SoX is needed only for decoding MP3
+    import pysox
+
     sample_rate = cfg['Audio']['sample_rate']
 
     # write the buffer to a temporary file
@@ -173,13 +146,18 @@ def convert_mp3_to_wav(cfg, mp3_string):
 
     # transform the temporary file using SoX (can't do this in memory :-()
     tmp2fh, tmp2path = mkstemp()
-    sox_in = pysox.CSoxStream(tmp1path, fileType='mp3')
-    sox_out = pysox.CSoxStream(tmp2path, 'w', pysox.CSignalInfo(sample_rate, 1, 16), fileType='wav')
-    sox_chain = pysox.CEffectsChain(sox_in, sox_out)
-    sox_chain.add_effect(pysox.CEffect("rate", [str(sample_rate)]))
-    sox_chain.flow_effects()
-    sox_out.close()
-
-    # read the transformation results back to the buffer
-    return load_wav(cfg, fdopen(tmp2fh, 'rb'))
+    try:
+        sox_in = pysox.CSoxStream(tmp1path, fileType='mp3')
+        sox_out = pysox.CSoxStream(tmp2path, 'w', pysox.CSignalInfo(sample_rate, 1, 16), fileType='wav')
+        sox_chain = pysox.CEffectsChain(sox_in, sox_out)
+        sox_chain.add_effect(pysox.CEffect("rate", [str(sample_rate)]))
+        sox_chain.flow_effects()
+        sox_out.close()
+
+        # read the transformation results back to the buffer
+        with fdopen(tmp2fh, 'rb') as f:
+            return load_wav(cfg, f)
+    finally:
+        remove(tmp1path)
+        remove(tmp2path)
 
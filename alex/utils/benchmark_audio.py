@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import audioop
+import imp
+import io
+import os
+import time
+import wave
+
+from tempfile import mkstemp
+
+import numpy as np
+
+if __name__ == '__main__':
+    import autopath
+
+from alex.utils import audio
+from alex.utils.config import as_project_path
+
+
+def load_wav_by_chunks(cfg, file_name):
+    """The reading of the audio as it was before the in-memory DSP: the samples are concatenated in chunks of 1024
+    frames and resampled by audioop.ratecv().
+
+    It serves as the reference for the speed of audio.load_wav().
+    """
+    wf = wave.open(file_name, 'r')
+    sample_rate = wf.getframerate()
+
+    chunk = 1024
+    wav = b''
+    wavPart = wf.readframes(chunk)
+    while wavPart:
+        wav += str(wavPart)
+        wavPart = wf.readframes(chunk)
+    wf.close()
+
+    if sample_rate != cfg['Audio']['sample_rate']:
+        wav, state = audioop.ratecv(wav, 2, 1, sample_rate, cfg['Audio']['sample_rate'], None)
+
+    return wav
+
+
+def sox(cfg, effect, value, wav):
+    """Transforms the audio by an effect of SoX through temporary files as the audio module did before the in-memory
+    DSP, the input is the audio in the default format or a WAV file.
+
+    It serves as the reference for the speed and the output of audio.change_tempo() and audio.convert_wav().
+    """
+    import pysox
+
+    sample_rate = cfg['Audio']['sample_rate']
+
+    tmp1fh, tmp1path = mkstemp()
+    tmp2fh, tmp2path = mkstemp()
+    try:
+        if wav.startswith(b'RIFF'):
+            with os.fdopen(tmp1fh, 'wb') as f:
+                f.write(wav)
+        else:
+            os.close(tmp1fh)
+            audio.save_wav(cfg, tmp1path, wav)
+
+        sox_in = pysox.CSoxStream(tmp1path)
+        sox_out = pysox.CSoxStream(tmp2path, 'w', pysox.CSignalInfo(sample_rate, 1, 16), fileType='wav')
+        sox_chain = pysox.CEffectsChain(sox_in, sox_out)
+        sox_chain.add_effect(pysox.CEffect(effect, [str(value)]))
+        sox_chain.flow_effects()
+        sox_out.close()
+
+        with os.fdopen(tmp2fh, 'rb') as f:
+            return audio.load_wav(cfg, f)
+    finally:
+        os.remove(tmp1path)
+        os.remove(tmp2path)
+
+
+def create_prompt(cfg, file_name, duration):
+    """Repeats the recording to a prompt of the given duration in seconds."""
+    samples = np.frombuffer(audio.load_wav(cfg, file_name), dtype=np.int16)
+    n_samples = int(duration * cfg['Audio']['sample_rate'])
+
+    return np.resize(samples, n_samples).tostring()
+
+
+def create_wav_file(wav, sample_rate):
+    f = io.BytesIO()
+    audio.save_wav({'Audio': {'sample_rate': sample_rate}}, f, wav)
+    return f.getvalue()
+
+
+def spectral_distance(wav1, wav2):
+    """The distance of the average log-magnitude spectra of the signals in dB, which does not depend on the exact
+    positions of the segments joined by WSOLA."""
+    spectra = []
+    for wav in [wav1, wav2]:
+        samples = np.frombuffer(wav, dtype=np.int16).astype(np.float64)
+        frames = samples[:len(samples) // 512 * 512].reshape(-1, 512) * np.hanning(512)
+        spectra.append(20 * np.log10(np.mean(np.abs(np.fft.rfft(frames)), axis=0) + 1e-3))
+
+    return np.sqrt(np.mean((spectra[0] - spectra[1]) ** 2))
+
+
+def snr(reference, wav):
+    reference = np.frombuffer(reference, dtype=np.int16).astype(np.float64)
+    samples = np.frombuffer(wav, dtype=np.int16).astype(np.float64)
+    n = min(len(reference), len(samples))
+    noise = np.sum((reference[:n] - samples[:n]) ** 2)
+
+    return 10 * np.log10(np.sum(reference[:n] ** 2) / max(noise, 1e-9))
+
+
+def measure(function, repeat):
+    start = time.time()
+    for i in range(repeat):
+        result = function()
+    return (time.time() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        description="""
+        Measures the change of the tempo, the conversion of the sample rate and the reading of the TTS prompts
+        of typical lengths by the in-memory DSP of the audio module.
+
+        If pysox can be imported, the times and the outputs are compared with SoX run through temporary files
+        as the audio module did before: the difference of the durations and the spectral distance for the tempo,
+        the SNR for the conversion. The reading of the prompts, which need no resampling, is compared with
+        the reading of the frames in chunks.
+      """)
+
+    parser.add_argument('-w', '--wav', default=as_project_path('tests/resources/test16k-mono.wav'),
+                        help='the recording repeated to the prompts')
+    parser.add_argument('-d', '--durations', type=float, nargs='+', default=[1.0, 3.0, 10.0],
+                        help='the durations of the prompts in seconds')
+    parser.add_argument('-t', '--tempo', type=float, default=1.2,
+                        help='the tempo')
+    parser.add_argument('-s', '--sample_rate', type=int, default=8000,
+                        help='the sample rate of the converted WAV files')
+    parser.add_argument('-r', '--repeat', type=int, default=10,
+                        help='the number of repetitions')
+    args = parser.parse_args()
+
+    cfg = {'Audio': {'sample_rate': 16000}}
+    try:
+        imp.find_module('pysox')
+        has_sox = True
+    except ImportError:
+        has_sox = False
+
+    print "=" * 120
+    print "Audio DSP benchmark: tempo %.2f, conversion from %d Hz to %d Hz" % \
+          (args.tempo, args.sample_rate, cfg['Audio']['sample_rate'])
+    for duration in args.durations:
+        wav = create_prompt(cfg, args.wav, duration)
+        prompt_file = create_wav_file(wav, cfg['Audio']['sample_rate'])
+        wav_file = create_wav_file(audio.convert_wav({'Audio': {'sample_rate': args.sample_rate}}, prompt_file),
+                                   args.sample_rate)
+
+        print "-" * 120
+        print "prompt %.1f s" % duration
+        tempo_time, tempo_wav = measure(lambda: audio.change_tempo(cfg, args.tempo, wav), args.repeat)
+        convert_time, convert_wav = measure(lambda: audio.convert_wav(cfg, wav_file), args.repeat)
+        load_time, _ = measure(lambda: audio.load_wav(cfg, io.BytesIO(prompt_file)), args.repeat)
+        chunks_time, _ = measure(lambda: load_wav_by_chunks(cfg, io.BytesIO(prompt_file)), args.repeat)
+        print "  tempo:    %8.3f ms" % (1e3 * tempo_time)
+        print "  convert:  %8.3f ms" % (1e3 * convert_time)
+        print "  load:     %8.3f ms  by chunks: %8.3f ms" % (1e3 * load_time, 1e3 * chunks_time)
+
+        if has_sox:
+            sox_tempo_time, sox_tempo_wav = measure(lambda: sox(cfg, 'tempo', args.tempo, wav), args.repeat)
+            sox_convert_time, sox_convert_wav = measure(lambda: sox(cfg, 'rate', cfg['Audio']['sample_rate'],
+                                                                    wav_file), args.repeat)
+            print "  SoX tempo:   %8.3f ms  speed-up: %6.1f  duration difference: %6.1f ms  spectral distance: %5.2f dB" % \
+                  (1e3 * sox_tempo_time, sox_tempo_time / tempo_time,
+                   1e3 * (len(tempo_wav) - len(sox_tempo_wav)) / 2 / cfg['Audio']['sample_rate'],
+                   spectral_distance(sox_tempo_wav, tempo_wav))
+            print "  SoX convert: %8.3f ms  speed-up: %6.1f  SNR: %5.1f dB" % \
+                  (1e3 * sox_convert_time, sox_convert_time / convert_time, snr(sox_convert_wav, convert_wav))
+
+    if not has_sox:
+        print "-" * 120
+        print "pysox is not installed, SoX is not measured."
+    print "=" * 120
+
+
+if __name__ == '__main__':
+    main()
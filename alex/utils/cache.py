@@ -9,14 +9,18 @@ import functools
 import os
 import os.path
 import cPickle as pickle
-import fcntl
 import hashlib
+import sqlite3
+import time
 
 from itertools import ifilterfalse
 from heapq import nsmallest
 from operator import itemgetter
 
 persistent_cache_directory = '~/.alex_persistent_cache'
+persistent_cache_max_bytes = 1024 ** 3
+persistent_cache_max_entries = 100000
+persistent_cache_shards = 16
 
 
 class Counter(dict):
@@ -154,43 +158,255 @@ def lfu_cache(maxsize=100):
     return decorator
 
 
-def get_persitent_cache_content(key):
-    key_name = os.path.join(persistent_cache_directory, '_'.join([str(i) for i in key]).replace(' ', '_'))
-    
-    try:
-        # you cannot have exlusive lock if you don't ask for writing permissions
-        # therefor use "r+" mode
-        f = open(key_name, 'r+b')
-        fcntl.lockf(f, fcntl.LOCK_EX)
-    except IOError:
-        raise KeyError
+class PersistentCacheStore(object):
+    """Bounded key-value store of the persistent cache.
+
+    The pickled values are kept in a fixed number of SQLite database files (shards) in one directory. Every shard
+    has its share of the byte and entry budget and it evicts the least recently used entries when the budget is
+    exceeded. The shards use write-ahead logging so that the readers in all hub processes do not block each other
+    nor the writers. The access times are updated at most once per atime_resolution seconds to keep reads cheap.
+
+    The per-process statistics are in hits, misses, bytes_read, bytes_written, evictions and errors.
+
+    """
+
+    def __init__(self, directory, max_bytes, max_entries, n_shards=16, atime_resolution=60.0, timeout=30.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.n_shards = n_shards
+        self.atime_resolution = atime_resolution
+        self.timeout = timeout
+
+        self.shard_max_bytes = max_bytes // n_shards
+        self.shard_max_entries = max(1, max_entries // n_shards)
+
+        # the connections cannot be shared by the forked processes
+        self._pid = None
+        self._connections = {}
+
+        self.hits = self.misses = self.bytes_read = self.bytes_written = self.evictions = self.errors = 0
+
+    def _connection(self, key):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._connections = {}
+
+        shard = int(key[-8:], 16) % self.n_shards
+        try:
+            return self._connections[shard]
+        except KeyError:
+            pass
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        conn = sqlite3.connect(os.path.join(self.directory, 'cache-%02d.sqlite' % shard), timeout=self.timeout,
+                               isolation_level=None)
+        conn.text_factory = str
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript("""
+            BEGIN IMMEDIATE;
+            CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,
+                                              atime REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS cache_atime ON cache (atime);
+            CREATE TABLE IF NOT EXISTS usage (id INTEGER PRIMARY KEY, entries INTEGER NOT NULL, bytes INTEGER NOT NULL);
+            INSERT OR IGNORE INTO usage VALUES (0, 0, 0);
+            CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+                UPDATE usage SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0;
+            END;
+            CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+                UPDATE usage SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0;
+            END;
+            COMMIT;
+        """)
+
+        self._connections[shard] = conn
+        return conn
+
+    def _legacy_file_name(self, key):
+        return os.path.join(self.directory, key)
+
+    def _get_legacy(self, key):
+        """Moves an entry stored by the old one-file-per-key cache into the store."""
+        try:
+            with open(self._legacy_file_name(key), 'rb') as f:
+                data = f.read()
+        except IOError:
+            raise KeyError(key)
+
+        value = pickle.loads(data)
+        self.set(key, value)
+        try:
+            os.remove(self._legacy_file_name(key))
+        except OSError:
+            pass
+
+        return value
+
+    def get(self, key):
+        """Returns the value stored under the key or raises KeyError.
+
+        :param key: a hexadecimal digest
+        """
+        try:
+            conn = self._connection(key)
+            row = conn.execute('SELECT value, atime FROM cache WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            row = None
+
+        if row is None:
+            try:
+                value = self._get_legacy(key)
+            except KeyError:
+                self.misses += 1
+                raise
+            self.hits += 1
+            return value
+
+        data, atime = str(row[0]), row[1]
+        now = time.time()
+        if now - atime >= self.atime_resolution:
+            try:
+                conn.execute('UPDATE cache SET atime = ? WHERE key = ?', (now, key))
+            except sqlite3.Error:
+                # a busy database only delays the recency update
+                self.errors += 1
 
-    data = pickle.load(f)
+        self.hits += 1
+        self.bytes_read += len(data)
 
-    fcntl.lockf(f, fcntl.LOCK_UN)
-    f.close()
+        return pickle.loads(data)
 
-    return data
+    def set(self, key, value):
+        """Stores the value under the key and evicts the least recently used entries of the shard over the budget.
 
+        :param key: a hexadecimal digest
+        """
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.shard_max_bytes:
+            return
 
-def set_persitent_cache_content(key, value):
-    key_name = os.path.join(persistent_cache_directory,'_'.join([str(i) for i in key]).replace(' ', '_'))
-    
-    f = open(key_name, 'wb')
-    fcntl.lockf(f, fcntl.LOCK_EX)
+        try:
+            conn = self._connection(key)
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                conn.execute('INSERT INTO cache VALUES (?, ?, ?, ?)', (key, sqlite3.Binary(data), len(data),
+                                                                       time.time()))
+                self._evict(conn)
+                conn.execute('COMMIT')
+            except:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error:
+            # the cache must not break the cached function, e.g. when the disk is full
+            self.errors += 1
+            return
+
+        self.bytes_written += len(data)
+
+    def _evict(self, conn):
+        entries, size = conn.execute('SELECT entries, bytes FROM usage WHERE id = 0').fetchone()
+        if entries <= self.shard_max_entries and size <= self.shard_max_bytes:
+            return
+
+        # evict down to 90 % of the budget so that not every insert has to evict
+        max_entries = self.shard_max_entries * 9 // 10
+        max_bytes = self.shard_max_bytes * 9 // 10
+
+        evicted = []
+        for key, key_size in conn.execute('SELECT key, size FROM cache ORDER BY atime'):
+            if entries <= max_entries and size <= max_bytes:
+                break
+            evicted.append((key,))
+            entries -= 1
+            size -= key_size
+
+        conn.executemany('DELETE FROM cache WHERE key = ?', evicted)
+        self.evictions += len(evicted)
+
+    def _shard_connections(self):
+        return [self._connection('%08x' % shard) for shard in range(self.n_shards)]
+
+    def clear(self):
+        """Removes all entries from the store."""
+        for conn in self._shard_connections():
+            conn.execute('DELETE FROM cache')
+
+    def get_stats(self):
+        """Returns the statistics of this process and the number of entries and bytes in the whole store."""
+        entries = size = 0
+        for conn in self._shard_connections():
+            shard_entries, shard_size = conn.execute('SELECT entries, bytes FROM usage WHERE id = 0').fetchone()
+            entries += shard_entries
+            size += shard_size
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'entries': entries,
+            'bytes': size,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+        }
+
+
+_persistent_cache_store = None
+
+
+def configure_persistent_cache(directory=None, max_bytes=None, max_entries=None, n_shards=None):
+    """Sets the location and the budget of the persistent cache shared by all persistent_cache decorated functions.
+    The arguments which are not given keep their values.
+
+    """
+    global persistent_cache_directory, persistent_cache_max_bytes, persistent_cache_max_entries, \
+        persistent_cache_shards, _persistent_cache_store
+
+    if directory is not None:
+        persistent_cache_directory = os.path.expanduser(directory)
+    if max_bytes is not None:
+        persistent_cache_max_bytes = max_bytes
+    if max_entries is not None:
+        persistent_cache_max_entries = max_entries
+    if n_shards is not None:
+        persistent_cache_shards = n_shards
+
+    _persistent_cache_store = None
+
+
+def get_persistent_cache_store():
+    global _persistent_cache_store
+
+    if _persistent_cache_store is None:
+        _persistent_cache_store = PersistentCacheStore(persistent_cache_directory, persistent_cache_max_bytes,
+                                                       persistent_cache_max_entries, persistent_cache_shards)
+
+    return _persistent_cache_store
 
-    data = pickle.dump(value, f)
 
-    fcntl.lockf(f, fcntl.LOCK_UN)
-    f.close()
+def get_persitent_cache_content(key):
+    return get_persistent_cache_store().get('_'.join([str(i) for i in key]).replace(' ', '_'))
+
+
+def set_persitent_cache_content(key, value):
+    get_persistent_cache_store().set('_'.join([str(i) for i in key]).replace(' ', '_'), value)
 
 
 def persistent_cache(method=False, file_prefix='', file_suffix=''):
     '''Persistent cache decorator.
 
-    It grows indefinitely.
+    The results are stored in the bounded PersistentCacheStore shared by all processes, see
+    configure_persistent_cache().
     Arguments to the cached function must be hashable.
-    Cache performance statistics stored in f.hits and f.misses.
+    Cache performance statistics stored in f.hits and f.misses, the statistics of the store are
+    returned by f.get_stats().
 
     '''
     sha = hashlib.sha1()
@@ -224,6 +440,7 @@ def persistent_cache(method=False, file_prefix='', file_suffix=''):
             return result
 
         wrapper.hits = wrapper.misses = 0
+        wrapper.get_stats = lambda: get_persistent_cache_store().get_stats()
 
         return wrapper
 
@@ -277,3 +494,4 @@ if __name__ == '__main__':
         r = f3(choice(domain), choice(domain))
 
     print(f3.hits, f3.misses)
+    print(f3.get_stats())
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# This code is PEP8-compliant. See http://www.python.org/dev/peps/pep-0008.
+
+from fractions import gcd
+
+import numpy as np
+from scipy.signal import resample_poly
+
+""" The dsp module implements the in-memory processing of audio signals in NumPy arrays.
+
+The signals are one-dimensional arrays of samples, the functions of the audio module convert
+the audio data in the default format to and from them.
+
+"""
+
+
+def to_pcm16(samples):
+    """ Rounds and clips the samples into the range of 16-bit signed integers. """
+
+    return np.clip(np.round(samples), -32768, 32767).astype(np.int16)
+
+
+def resample(samples, sample_rate, new_sample_rate):
+    """
+    Resamples the signal by a polyphase filter.
+
+    The rates are reduced by their greatest common divisor, the signal is up-sampled by the new rate,
+    low-pass filtered and down-sampled by the original rate in one pass.
+
+    :return: the resampled signal as an array of floats
+    """
+
+    samples = np.asarray(samples, dtype=np.float64)
+    if sample_rate == new_sample_rate or len(samples) == 0:
+        return samples
+
+    d = gcd(sample_rate, new_sample_rate)
+
+    return resample_poly(samples, new_sample_rate // d, sample_rate // d)
+
+
+def wsola(samples, tempo, sample_rate, segment=0.082, search=0.015, overlap=0.012):
+    """
+    Changes the tempo of the signal without changing its pitch by the waveform similarity overlap-add (WSOLA).
+
+    The output is composed of segments of the input which overlap by the given overlap. The segments are taken
+    from the input at the positions advanced by the tempo, every position is shifted within the search range
+    so that the start of the segment is the most similar to the natural continuation of the previous segment.
+    The default lengths in seconds are the defaults of the SoX tempo effect.
+
+    :return: the signal as an array of floats, which is about len(samples) / tempo long
+    """
+
+    samples = np.asarray(samples, dtype=np.float64)
+    n_samples = int(round(len(samples) / float(tempo)))
+
+    n_segment = max(int(segment * sample_rate), 2)
+    n_overlap = max(min(int(overlap * sample_rate), n_segment // 2), 1)
+    n_search = int(search * sample_rate)
+    out_step = n_segment - n_overlap
+    in_step = out_step * float(tempo)
+
+    # the input is padded so that the segments and the search windows never reach out of it
+    n_steps = n_samples // out_step + 1
+    padded = np.zeros(n_search + max(len(samples), int(n_steps * in_step)) + n_segment + 2 * n_search + out_step)
+    padded[n_search:n_search + len(samples)] = samples
+
+    fade_in = np.linspace(0.0, 1.0, n_overlap)
+    fade_out = 1.0 - fade_in
+
+    output = np.zeros(n_steps * out_step + n_segment)
+    output[:n_segment] = padded[n_search:n_search + n_segment]
+
+    # the positions are indices into the padded input
+    position = n_search
+    for i in range(1, n_steps):
+        continuation = padded[position + out_step:position + out_step + n_overlap]
+
+        start = int(round(i * in_step))
+        window = padded[start:start + 2 * n_search + n_overlap]
+        position = start + int(np.argmax(np.correlate(window, continuation, 'valid')))
+
+        out_position = i * out_step
+        output[out_position:out_position + n_overlap] *= fade_out
+        output[out_position:out_position + n_overlap] += fade_in * padded[position:position + n_overlap]
+        output[out_position + n_overlap:out_position + n_segment] = padded[position + n_overlap:position + n_segment]
+
+    return output[:n_samples]
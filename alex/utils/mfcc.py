@@ -7,6 +7,53 @@ from scipy.fftpack import dct
 from collections import deque
 
 
+class FrameBuffer:
+    """Streaming buffer of 16 bit PCM samples which cuts them into overlapping frames.
+
+    The samples are kept in a preallocated array and all complete frames are returned at once as rows of a matrix.
+    A frame is complete only when at least one sample follows it, the same as in the original per-frame loops of
+    the VADs.
+    """
+
+    def __init__(self, framesize, frameshift, capacity=16384):
+        self.framesize = framesize
+        self.frameshift = frameshift
+        self.samples = np.zeros(max(capacity, 2 * (framesize + frameshift)), dtype=np.int16)
+        self.n_samples = 0
+
+    def __len__(self):
+        return self.n_samples
+
+    def append(self, data):
+        """Append the raw 16 bit PCM data."""
+        data = np.frombuffer(data, dtype=np.int16)
+
+        if self.n_samples + len(data) > len(self.samples):
+            samples = np.zeros(2 * (self.n_samples + len(data)), dtype=np.int16)
+            samples[:self.n_samples] = self.samples[:self.n_samples]
+            self.samples = samples
+
+        self.samples[self.n_samples:self.n_samples + len(data)] = data
+        self.n_samples += len(data)
+
+    def pop_frames(self):
+        """Return all complete frames as a float matrix, one frame per row, and drop the samples which are not needed
+        for the next frames."""
+        if self.n_samples <= self.framesize:
+            return np.zeros((0, self.framesize))
+
+        n_frames = (self.n_samples - self.framesize - 1) // self.frameshift + 1
+        frames = np.lib.stride_tricks.as_strided(self.samples, shape=(n_frames, self.framesize),
+                                                 strides=(self.frameshift * self.samples.itemsize,
+                                                          self.samples.itemsize)).astype(np.float64)
+
+        consumed = n_frames * self.frameshift
+        self.samples[:self.n_samples - consumed] = self.samples[consumed:self.n_samples].copy()
+        self.n_samples -= consumed
+
+        return frames
+
+
 class MFCCKaldi:
     '''
     TODO port Kaldi mfcc to Python. Use similar parameters as
@@ -146,64 +193,74 @@ class MFCCFrontEnd:
         self.cep_lift_weights = cep_lift_weights
 
     def preemphasis(self, frame):
-        out_frame = np.zeros_like(frame)
-        out_frame[0] = frame[0] - self.preemcoef * self.prior
-        for i in range(1, len(frame)):
-            out_frame[i] = frame[i] - self.preemcoef * frame[i - 1]
+        frame = np.asarray(frame, dtype=np.float64)
 
-        self.prior = frame[-1]
+        return self.preemphasis_batch(frame[np.newaxis, :])[0]
 
-        return out_frame
+    def preemphasis_batch(self, frames):
+        """Apply the preemphasis to consecutive frames, the first sample of each frame uses the last sample
+        of the previous frame."""
+        out_frames = np.empty_like(frames)
+        if not len(frames):
+            return out_frames
 
-    def param(self, frame):
-        """Compute the MFCC coefficients in a way similar to the HTK."""
+        out_frames[0, 0] = frames[0, 0] - self.preemcoef * self.prior
+        out_frames[1:, 0] = frames[1:, 0] - self.preemcoef * frames[:-1, -1]
+        out_frames[:, 1:] = frames[:, 1:] - self.preemcoef * frames[:, :-1]
+
+        self.prior = frames[-1, -1]
+
+        return out_frames
+
+    def log_mel_spectrum(self, frames):
+        """Compute the log mel spectra of a batch of frames, one frame per row."""
+        frames = np.asarray(frames, dtype=np.float64)
         # zero mean
         if self.zmeansource:
-            frame = frame - np.mean(frame)
+            frames = frames - np.mean(frames, axis=1)[:, np.newaxis]
         # preemphasis
-        frame = self.preemphasis(frame)
+        frames = self.preemphasis_batch(frames)
         # apply hamming window
         if self.usehamming:
-            frame = self.hamming * frame
+            frames = self.hamming * frames
 
-        complex_spectrum = np.fft.rfft(frame)
-#    print "LCS", len(complex_spectrum)
+        complex_spectrum = np.fft.rfft(frames, axis=1)
         power_spectrum = complex_spectrum.real * complex_spectrum.real + \
             complex_spectrum.imag * complex_spectrum.imag
         # compute only power spectrum if required
         if not self.usepower:
             power_spectrum = np.sqrt(power_spectrum)
 
-#    print "SPS",power_spectrum.shape
         mel_spectrum = np.dot(power_spectrum, self.mel_filter_bank)
         # apply mel floor
-        for i in range(len(mel_spectrum)):
-            if mel_spectrum[i] < 1.0:
-                mel_spectrum[i] = 1.0
-        mel_spectrum = np.log(mel_spectrum)
-        
-        if self.mel_banks_only:
-            mfcc = mel_spectrum
-            self.mfcc_queue.append(mel_spectrum)
-        else:
-            cepstrum = dct(mel_spectrum, type=2, norm='ortho')
-            c0 = cepstrum[0]
-            htk_cepstrum = cepstrum[1:self.numceps + 1]
-            # cepstral liftering
-            cep_lift_mfcc = self.cep_lift_weights * htk_cepstrum
-
-            if self.usec0:
-                mfcc = np.append(cep_lift_mfcc, c0)
-            else:
-                mfcc = cep_lift_mfcc
+        np.maximum(mel_spectrum, 1.0, out=mel_spectrum)
 
-            # compute delta and acceleration coefficients if requested
-            self.mfcc_queue.append(mfcc)
+        return np.log(mel_spectrum)
+
+    def cepstrum(self, mel_spectrum):
+        """Compute the liftered cepstra from a batch of log mel spectra."""
+        cepstrum = dct(mel_spectrum, type=2, norm='ortho', axis=-1)
+        c0 = cepstrum[:, :1]
+        htk_cepstrum = cepstrum[:, 1:self.numceps + 1]
+        # cepstral liftering
+        cep_lift_mfcc = self.cep_lift_weights * htk_cepstrum
+
+        if self.usec0:
+            return np.hstack((cep_lift_mfcc, c0))
 
-#        print len(self.mfcc_queue)
+        return cep_lift_mfcc
 
+    def add_dynamic_features(self, mfcc):
+        """Append the delta, acceleration, and the previous frames coefficients to the coefficients of one frame.
+
+        The frames must be passed in order since the history is kept in the queues.
+        """
+        self.mfcc_queue.append(mfcc)
+
+        features = [mfcc, ]
+        if not self.mel_banks_only:
+            # compute delta and acceleration coefficients if requested
             if self.usedelta:
-#      print "LMQ", len(self.mfcc_queue)
                 if len(self.mfcc_queue) >= 2:
                     delta = np.zeros_like(mfcc)
                     for i in range(1, len(self.mfcc_queue)):
@@ -214,6 +271,8 @@ class MFCCFrontEnd:
                 else:
                     delta = np.zeros_like(mfcc)
 
+                features.append(delta)
+
             if self.useacc:
                 if len(self.mfcc_delta_queue) >= 2:
                     acc = np.zeros_like(mfcc)
@@ -224,15 +283,30 @@ class MFCCFrontEnd:
                 else:
                     acc = np.zeros_like(mfcc)
 
-            if self.usedelta:
-                mfcc = np.append(mfcc, delta)
-            if self.useacc:
-                mfcc = np.append(mfcc, acc)
+                features.append(acc)
 
         for i in range(self.n_last_frames):
-            if len(self.mfcc_queue) > i + 1 :
-                mfcc = np.append(mfcc, self.mfcc_queue[-1-i-1])
+            if len(self.mfcc_queue) > i + 1:
+                features.append(self.mfcc_queue[-1 - i - 1])
             else:
-                mfcc = np.append(mfcc, np.zeros_like(self.mfcc_queue[-1]))
+                features.append(np.zeros_like(mfcc))
+
+        return np.concatenate(features)
+
+    def param_batch(self, frames):
+        """Compute the MFCC coefficients of consecutive frames, one frame per row.
+
+        It gives the same results as calling param() for each frame; however, the spectral analysis of all frames
+        is computed at once.
+        """
+        features = self.log_mel_spectrum(frames)
+        if not self.mel_banks_only:
+            features = self.cepstrum(features)
+
+        return np.array([self.add_dynamic_features(mfcc) for mfcc in features], dtype=np.float32)
+
+    def param(self, frame):
+        """Compute the MFCC coefficients in a way similar to the HTK."""
+        frame = np.asarray(frame, dtype=np.float64)
 
-        return mfcc.astype(np.float32)
+        return self.param_batch(frame[np.newaxis, :])[0]
@@ -8,8 +8,10 @@ Implements useful classes for handling multiprocessing implementation of
 the Alex system.
 """
 
+import errno
 import functools
 import multiprocessing
+import select
 import threading
 import fcntl
 import time
@@ -21,6 +23,43 @@ import traceback
 
 from datetime import datetime
 
+# the longest time a main loop blocks without any input, it bounds the reaction time to the close event and timers
+MAIN_LOOP_MAX_WAIT_TIME = 0.1
+
+
+def wait_for_connections(connections, timeout):
+    """
+    Blocks until at least one of the connections has data to be read or the timeout expires.
+
+    This is a select based equivalent of ``multiprocessing.connection.wait`` which is not available in Python 2.
+    Any object with the ``fileno()`` method can be used, e.g. ends of ``multiprocessing.Pipe`` or the reader end of
+    a ``multiprocessing.Queue``.
+
+    :param connections: a list of connections
+    :param timeout: the maximum time to wait in seconds
+    :return: a list of connections which are ready to be read
+    """
+    try:
+        ready, _, _ = select.select(connections, [], [], timeout)
+    except select.error as e:
+        if e.args[0] != errno.EINTR:
+            raise
+        ready = []
+
+    return ready
+
+
+def get_main_loop_wait_time(cfg):
+    """
+    Returns the maximum time a main loop waits for its input. If the event driven main loops are switched off in
+    the configuration, None is returned and the main loops sleep for ``cfg['Hub']['main_loop_sleep_time']``
+    and poll their connections as they used to.
+    """
+    if not cfg['Hub'].get('event_driven', True):
+        return None
+
+    return cfg['Hub'].get('main_loop_max_wait_time', MAIN_LOOP_MAX_WAIT_TIME)
+
 
 def local_lock():
     """This decorator makes the decorated function thread safe.
@@ -3,6 +3,7 @@
 # This code is mostly PEP8-compliant. See
 # http://www.python.org/dev/peps/pep-0008.
 
+import json
 import multiprocessing
 import time
 import os
@@ -15,17 +16,28 @@ import wave
 from datetime import datetime
 from collections import deque
 
-from alex.utils.mproc import etime
+from alex.utils.mproc import etime, wait_for_connections, get_main_loop_wait_time
 from alex.utils.exdec import catch_ioerror
 from alex.utils.exceptions import SessionLoggerException, SessionClosedException
 from alex.utils.procname import set_proc_name
 
+SESSION_XML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<dialogue>
+</dialogue>
+"""
+SESSION_JOURNAL = 'session.journal'
+
 
 class SessionLogger(multiprocessing.Process):
     """
     This is a multiprocessing-safe logger. It should be used by Alex to log
     information according the SDC 2010 XML format.
 
+    The session log is kept in memory and every change is appended to the session journal. The session.xml file
+    is written only when the session ends, when a new session starts, when the logger is closed, or when
+    write_session_xml() is called. If the logger is killed, the session.xml file can be recovered from the journal
+    by recover_session_xml().
+
     Date and times should also include time zone.
 
     Times should be in seconds from the beginning of the dialogue.
@@ -46,6 +58,16 @@ class SessionLogger(multiprocessing.Process):
         self.queue = multiprocessing.Queue()
         self._queue = deque()
 
+        self._last_session_start_time = 0
+        self._last_session_end_time = 0
+
+        # counters shared with the other processes, see get_queue_stats()
+        self._queue_depth = multiprocessing.Value('i', 0, lock=False)
+        self._lag = multiprocessing.Value('d', 0.0, lock=False)
+        self._max_lag = multiprocessing.Value('d', 0.0, lock=False)
+        self._processed = multiprocessing.Value('i', 0, lock=False)
+        self._coalesced = multiprocessing.Value('i', 0, lock=False)
+
     def set_close_event(self, close_event):
         self.close_event = close_event
 
@@ -92,19 +114,20 @@ class SessionLogger(multiprocessing.Process):
     def _session_start(self, output_dir):
         """ Records the target directory and creates the template call log.
         """
+        if self._is_open:
+            # the previous session was not ended, save its log before it is forgotten
+            self._close_session()
 
         self._session_dir_name = output_dir
 
         f = open(os.path.join(self._session_dir_name, 'session.xml'), "w", 0)
-        f.write("""<?xml version="1.0" encoding="UTF-8"?>
-<dialogue>
-</dialogue>
-""")
+        f.write(SESSION_XML_TEMPLATE)
         f.write('\n')
         f.close()
 
         self._session_start_time = time.time()
         self._read_session_xml()
+        self._open_journal()
         self._is_open = True
 
     def _flush(self):
@@ -126,7 +149,13 @@ class SessionLogger(multiprocessing.Process):
         """
 
         self._flush()
+        self._close_session()
+
+    def _close_session(self):
+        """Saves the session xml file and forgets the session."""
         self._write_session_xml()
+        self._journal.close()
+        self._journal = None
         self._session_dir_name = ''
         self._doc = None
         self._is_open = False
@@ -142,15 +171,30 @@ class SessionLogger(multiprocessing.Process):
         return s + '\n'
 
     def _read_session_xml(self):
-        """Opens the session xml file.
+        """Opens the session xml file and indexes its elements.
         """
         with open(os.path.join(self._session_dir_name, 'session.xml'), "r+", 0) as f:
             # fcntl.lockf(self._f, fcntl.LOCK_EX)
             self._doc = xml.dom.minidom.parse(f)
             # fcntl.lockf(f, fcntl.LOCK_UN)
 
+        els = self._doc.getElementsByTagName("dialogue")
+        self._dialogue = els[0] if els else None
+        self._header_el = None
+        self._last_turn = {}
+        self._turn_counts = {}
+        self._recs = {}
+        self._rec_turns = {}
+        self._dialogue_recs = {}
+
+        self._elements = [self._dialogue, ]
+        self._element_ids = {id(self._dialogue): 0}
+
     def _write_session_xml(self):
         """Saves the self._doc self._document into the session xml file.
+
+        The file is written only at the end of the session or on demand, e.g. by calling write_session_xml() of
+        the session logger. All changes of the document are logged in the session journal meanwhile.
         """
         with open(os.path.join(self._session_dir_name, 'session.xml'), "r+", 0) as f:
             # fcntl.lockf(self._f, fcntl.LOCK_EX)
@@ -169,21 +213,72 @@ class SessionLogger(multiprocessing.Process):
             f.write(x)
             # fcntl.lockf(f, fcntl.LOCK_UN)
 
+    def _open_journal(self):
+        self._journal = open(os.path.join(self._session_dir_name, SESSION_JOURNAL), "w")
+
+    def _add_element(self, el):
+        """Assigns the journal id to an element of the document."""
+        self._element_ids[id(el)] = len(self._elements)
+        self._elements.append(el)
+
+    def _log_append(self, parent, el, first=False):
+        """Logs a new element of the document, including its sub-elements, into the session journal.
+
+        :param parent: the parent element of the new element
+        :param el: the new element
+        :param first: whether the new element was inserted before all other children of the parent
+        """
+        self._add_element(el)
+        self._log_journal({'op': 'append', 'parent': self._element_ids[id(parent)], 'first': first,
+                           'xml': el.toxml()})
+
+    def _log_set_attribute(self, el, name, value):
+        """Sets the attribute of an existing element and logs it into the session journal."""
+        el.setAttribute(name, value)
+        self._log_journal({'op': 'set', 'id': self._element_ids[id(el)], 'name': name, 'value': value})
+
+    def _log_journal(self, entry):
+        self._journal.write(json.dumps(entry))
+        self._journal.write('\n')
+        self._journal.flush()
+
+    def _replay_journal(self):
+        """Applies all changes logged in the session journal to the document."""
+        with open(os.path.join(self._session_dir_name, SESSION_JOURNAL), "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # the last entry may be incomplete if the logger was killed
+                    break
+
+                if entry['op'] == 'append':
+                    parent = self._elements[entry['parent']]
+                    el = self._doc.importNode(xml.dom.minidom.parseString(entry['xml'].encode('utf-8')).documentElement,
+                                              True)
+                    if entry['first'] and parent.firstChild:
+                        parent.insertBefore(el, parent.firstChild)
+                    else:
+                        parent.appendChild(el)
+                    self._add_element(el)
+                elif entry['op'] == 'set':
+                    self._elements[entry['id']].setAttribute(entry['name'], entry['value'])
+
     @etime('seslog_config')
     @catch_ioerror
     def _config(self, cfg):
         """ Adds the config tag to the session log.
         """
-        els = self._doc.getElementsByTagName("dialogue")
+        dialogue = self._dialogue
 
-        if els:
-            if els[0].firstChild:
-                config = els[0].insertBefore(self._doc.createElement("config"), els[0].firstChild)
+        if dialogue:
+            if dialogue.firstChild:
+                config = dialogue.insertBefore(self._doc.createElement("config"), dialogue.firstChild)
             else:
-                config = els[0].appendChild(self._doc.createElement("config"))
+                config = dialogue.appendChild(self._doc.createElement("config"))
             config.appendChild(self._doc.createComment(self._cfg_formatter(cfg)))
 
-        self._write_session_xml()
+            self._log_append(dialogue, config, first=True)
 
     @etime('seslog_header')
     @catch_ioerror
@@ -191,10 +286,10 @@ class SessionLogger(multiprocessing.Process):
         """ Adds host, date, system, and version info into the header element.
         The host and date will be derived automatically.
         """
-        els = self._doc.getElementsByTagName("dialogue")
+        dialogue = self._dialogue
 
-        if els:
-            header = els[0].appendChild(self._doc.createElement("header"))
+        if dialogue:
+            header = dialogue.appendChild(self._doc.createElement("header"))
             host = header.appendChild(self._doc.createElement("host"))
             host.appendChild(self._doc.createTextNode(socket.gethostname()))
             date = header.appendChild(self._doc.createElement("date"))
@@ -205,19 +300,19 @@ class SessionLogger(multiprocessing.Process):
             version = header.appendChild(self._doc.createElement("version"))
             version.appendChild(self._doc.createTextNode(version_txt))
 
-        self._write_session_xml()
+            self._log_append(dialogue, header)
+            if self._header_el is None:
+                self._header_el = header
 
     @etime('seslog_input_source')
     @catch_ioerror
     def _input_source(self, input_source):
         """Adds the input_source optional tag to the header."""
-        els = self._doc.getElementsByTagName("header")
-
-        if els:
-            i_s = els[0].appendChild(self._doc.createElement("input_source"))
+        if self._header_el:
+            i_s = self._header_el.appendChild(self._doc.createElement("input_source"))
             i_s.setAttribute("type", input_source)
 
-        self._write_session_xml()
+            self._log_append(self._header_el, i_s)
 
     @etime('seslog_dialogue_rec_start')
     # @catch_ioerror - do not add! VIO catches the IOError
@@ -229,37 +324,30 @@ class SessionLogger(multiprocessing.Process):
         function is called.
 
         """
-        els = self._doc.getElementsByTagName("dialogue")
+        dialogue = self._dialogue
 
-        if els:
-            da = els[0].appendChild(self._doc.createElement("dialogue_rec"))
+        if dialogue:
+            da = dialogue.appendChild(self._doc.createElement("dialogue_rec"))
             if speaker:
                 da.setAttribute("speaker", speaker)
             da.setAttribute("fname", fname)
             da.setAttribute("starttime", self._get_time_str())
+
+            self._log_append(dialogue, da)
+            self._dialogue_recs[fname] = da
         else:
-            self._write_session_xml()
             raise SessionLoggerException(("Missing dialogue element for %s speaker") % speaker)
 
-        self._write_session_xml()
-
     @etime('seslog_dialogue_rec_end')
     # @catch_ioerror - do not add! VIO catches the IOError
     def _dialogue_rec_end(self, fname):
         """ Stores the end time in the dialogue_rec element with fname file.
         """
-        els = self._doc.getElementsByTagName("dialogue_rec")
-
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("fname") == fname:
-                els[i].setAttribute("endtime", self._get_time_str())
-                break
-        else:
-            self._write_session_xml()
+        try:
+            self._log_set_attribute(self._dialogue_recs[fname], "endtime", self._get_time_str())
+        except KeyError:
             raise SessionLoggerException("Missing dialogue_rec element for %s fname" % fname)
 
-        self._write_session_xml()
-
     @etime('seslog_evaluation')
     @catch_ioerror
     def _evaluation(self, num_turns, task_success, user_sat, score):
@@ -267,17 +355,7 @@ class SessionLogger(multiprocessing.Process):
         raise SessionLoggerException("Not implemented")
 
     def _turn_count(self, speaker):
-        trns = self._doc.getElementsByTagName("turn")
-        counter = 0
-
-        if trns:
-            for i in range(trns.length):
-                if trns[i].getAttribute("speaker") == speaker:
-                    counter += 1
-
-            return counter
-
-        return 0
+        return self._turn_counts.get(speaker, 0)
 
     @etime('seslog_turn')
     @catch_ioerror
@@ -286,56 +364,48 @@ class SessionLogger(multiprocessing.Process):
 
         The turn_number for the speaker is automatically computed.
         """
-        els = self._doc.getElementsByTagName("dialogue")
+        dialogue = self._dialogue
         turn_number = self._turn_count(speaker) + 1
 
-        if els:
-            turn = els[0].appendChild(self._doc.createElement("turn"))
+        if dialogue:
+            turn = dialogue.appendChild(self._doc.createElement("turn"))
             turn.setAttribute("speaker", speaker)
             turn.setAttribute("turn_number", unicode(turn_number))
             turn.setAttribute("time", self._get_time_str())
 
-        self._write_session_xml()
+            self._log_append(dialogue, turn)
+            self._last_turn[speaker] = turn
+            self._turn_counts[speaker] = turn_number
 
     @etime('seslog_dialogue_act')
     @catch_ioerror
     def _dialogue_act(self, speaker, dialogue_act):
         """ Adds the dialogue_act element to the last "speaker" turn.
         """
-        els = self._doc.getElementsByTagName("turn")
-
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("speaker") == speaker:
-                da = els[i].appendChild(self._doc.createElement("dialogue_act"))
-                da.setAttribute("time", self._get_time_str())
-                da.appendChild(self._doc.createTextNode(unicode(dialogue_act)))
-                break
-        else:
-            self._write_session_xml()
-            raise SessionLoggerException(("Missing turn element for %s speaker") % speaker)
+        turn = self._last_turn_element(speaker)
 
-        self._write_session_xml()
+        da = turn.appendChild(self._doc.createElement("dialogue_act"))
+        da.setAttribute("time", self._get_time_str())
+        da.appendChild(self._doc.createTextNode(unicode(dialogue_act)))
+
+        self._log_append(turn, da)
 
     @etime('seslog_text')
     @catch_ioerror
     def _text(self, speaker, text, cost=None):
         """ Adds the text (prompt) element to the last "speaker" turn.
         """
-        els = self._doc.getElementsByTagName("turn")
-
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("speaker") == speaker:
-                da = els[i].appendChild(self._doc.createElement("text"))
-                da.setAttribute("time", self._get_time_str())
-                if cost:
-                    da.setAttribute("cost", unicode(cost))
-                da.appendChild(self._doc.createTextNode(unicode(text)))
-                break
-        else:
-            self._write_session_xml()
+        turn = self._last_turn.get(speaker)
+        if turn is None:
             raise SessionLoggerException("Missing turn element for {spkr} speaker".format(spkr=speaker))
 
-        self._write_session_xml()
+        da = turn.appendChild(self._doc.createElement("text"))
+        da.setAttribute("time", self._get_time_str())
+        if cost:
+            da.setAttribute("cost", unicode(cost))
+        da.appendChild(self._doc.createTextNode(unicode(text)))
+
+        self._log_append(turn, da)
 
     @etime('seslog_rec_start')
     @catch_ioerror
@@ -344,19 +414,17 @@ class SessionLogger(multiprocessing.Process):
         "speaker" turn.
 
         """
-        els = self._doc.getElementsByTagName("turn")
-
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("speaker") == speaker:
-                da = els[i].appendChild(self._doc.createElement("rec"))
-                da.setAttribute("fname", fname)
-                da.setAttribute("starttime", self._get_time_str())
-                break
-        else:
-            self._write_session_xml()
+        turn = self._last_turn.get(speaker)
+        if turn is None:
             raise SessionLoggerException(("Missing turn element for the {spkr} speaker".format(spkr=speaker)))
 
-        self._write_session_xml()
+        da = turn.appendChild(self._doc.createElement("rec"))
+        da.setAttribute("fname", fname)
+        da.setAttribute("starttime", self._get_time_str())
+
+        self._log_append(turn, da)
+        self._recs[fname] = da
+        self._rec_turns[fname] = turn
 
         self._rec_started[fname] = wave.open(os.path.join(self._session_dir_name, fname), 'w')
         self._rec_started[fname].setnchannels(1)
@@ -369,7 +437,7 @@ class SessionLogger(multiprocessing.Process):
         """Write into open file recording.
         """
         try:
-            self._rec_started[fname].writeframes(bytearray(data_rec))
+            self._rec_started[fname].writeframes(bytearray(getattr(data_rec, 'payload', data_rec)))
         except KeyError:
             raise SessionLoggerException("rec_write: missing rec element %s" % fname)
 
@@ -379,16 +447,11 @@ class SessionLogger(multiprocessing.Process):
         """ Stores the end time in the rec element with fname file.
         """
         try:
-            els = self._doc.getElementsByTagName("rec")
-
-            for i in range(els.length - 1, -1, -1):
-                if els[i].getAttribute("fname") == fname:
-                    els[i].setAttribute("endtime", self._get_time_str())
-                    break
-            else:
+            if fname not in self._recs:
                 raise SessionLoggerException(("Missing rec element for the {fname} fname.".format(fname=fname)))
 
-            self._write_session_xml()
+            self._log_set_attribute(self._recs[fname], "endtime", self._get_time_str())
+
             self._rec_started[fname].close()
             self._rec_started[fname] = None
         except KeyError:
@@ -406,6 +469,30 @@ class SessionLogger(multiprocessing.Process):
 
         return False
 
+    def _find_rec_turn(self, speaker, fname):
+        """Finds the last speaker turn which includes the recording with fname.
+
+        The index of the turns is used if possible, the document is searched only when the recording was added to
+        a turn of another speaker.
+        """
+        if fname == "*":
+            turn = self._last_turn.get(speaker)
+        else:
+            turn = self._rec_turns.get(fname)
+            if turn is not None and turn.getAttribute("speaker") != speaker:
+                els = self._doc.getElementsByTagName("turn")
+
+                for i in range(els.length - 1, -1, -1):
+                    if els[i].getAttribute("speaker") == speaker and self._include_rec(els[i], fname):
+                        return els[i]
+
+                turn = None
+
+        if turn is None:
+            raise SessionLoggerException(("Missing turn element for %s speaker") % speaker)
+
+        return turn
+
     @etime('seslog_asr')
     @catch_ioerror
     def _asr(self, speaker, fname, nblist, confnet=None):
@@ -413,35 +500,28 @@ class SessionLogger(multiprocessing.Process):
 
         alex Extension: It can also store the confusion network representation.
         """
-        els = self._doc.getElementsByTagName("turn")
+        turn = self._find_rec_turn(speaker, fname)
 
-        for el_idx in range(els.length - 1, -1, -1):
-            if els[el_idx].getAttribute("speaker") == speaker and self._include_rec(els[el_idx], fname):
-                asr = els[el_idx].appendChild(self._doc.createElement("asr"))
+        asr = turn.appendChild(self._doc.createElement("asr"))
 
-                for prob, hyp in nblist:
-                    hyp_el = asr.appendChild(self._doc.createElement("hypothesis"))
-                    hyp_el.setAttribute("p", "{0:.3f}".format(prob))
-                    hyp_el.appendChild(self._doc.createTextNode(unicode(hyp)))
+        for prob, hyp in nblist:
+            hyp_el = asr.appendChild(self._doc.createElement("hypothesis"))
+            hyp_el.setAttribute("p", "{0:.3f}".format(prob))
+            hyp_el.appendChild(self._doc.createTextNode(unicode(hyp)))
 
-                if confnet:
-                    cn = asr.appendChild(self._doc.createElement("confnet"))
+        if confnet:
+            cn = asr.appendChild(self._doc.createElement("confnet"))
 
-                    for alts in confnet:
-                        was = cn.appendChild(
-                            self._doc.createElement("word_alternatives"))
+            for alts in confnet:
+                was = cn.appendChild(
+                    self._doc.createElement("word_alternatives"))
 
-                        for prob, word in alts:
-                            wa = was.appendChild(self._doc.createElement("word"))
-                            wa.setAttribute("p", "{0:.3f}".format(prob))
-                            wa.appendChild(self._doc.createTextNode(unicode(word)))
-
-                break
-        else:
-            self._write_session_xml()
-            raise SessionLoggerException(("Missing turn element for %s speaker") % speaker)
+                for prob, word in alts:
+                    wa = was.appendChild(self._doc.createElement("word"))
+                    wa.setAttribute("p", "{0:.3f}".format(prob))
+                    wa.appendChild(self._doc.createTextNode(unicode(word)))
 
-        self._write_session_xml()
+        self._log_append(turn, asr)
 
     @etime('seslog_slu')
     @catch_ioerror
@@ -452,74 +532,56 @@ class SessionLogger(multiprocessing.Process):
         The confnet must be an instance of DialogueActConfusionNetwork.
 
         """
-        els = self._doc.getElementsByTagName("turn")
+        turn = self._find_rec_turn(speaker, fname)
 
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("speaker") == speaker and self._include_rec(els[i], fname):
-                asr = els[i].appendChild(self._doc.createElement("slu"))
+        asr = turn.appendChild(self._doc.createElement("slu"))
 
-                for p, h in nblist:
-                    hyp = asr.appendChild(self._doc.createElement("interpretation"))
-                    hyp.setAttribute("p", "%.3f" % p)
-                    hyp.appendChild(self._doc.createTextNode(unicode(h)))
+        for p, h in nblist:
+            hyp = asr.appendChild(self._doc.createElement("interpretation"))
+            hyp.setAttribute("p", "%.3f" % p)
+            hyp.appendChild(self._doc.createTextNode(unicode(h)))
 
-                if confnet:
-                    cn = asr.appendChild(self._doc.createElement("confnet"))
+        if confnet:
+            cn = asr.appendChild(self._doc.createElement("confnet"))
 
-                    for p, dai in confnet:
-                        sas = cn.appendChild(self._doc.createElement("dai_alternatives"))
+            for p, dai in confnet:
+                sas = cn.appendChild(self._doc.createElement("dai_alternatives"))
 
-                        daia = sas.appendChild(self._doc.createElement("dai"))
-                        daia.setAttribute("p", "%.3f" % p)
-                        daia.appendChild(self._doc.createTextNode(unicode(dai)))
+                daia = sas.appendChild(self._doc.createElement("dai"))
+                daia.setAttribute("p", "%.3f" % p)
+                daia.appendChild(self._doc.createTextNode(unicode(dai)))
 
-                        daia = sas.appendChild(self._doc.createElement("dai"))
-                        daia.setAttribute("p", "%.3f" % (1 - p))
-                        daia.appendChild(self._doc.createTextNode("null()"))
+                daia = sas.appendChild(self._doc.createElement("dai"))
+                daia.setAttribute("p", "%.3f" % (1 - p))
+                daia.appendChild(self._doc.createTextNode("null()"))
 
-                break
-        else:
-            self._write_session_xml()
-            raise SessionLoggerException(("Missing turn element for %s speaker") % speaker)
-
-        self._write_session_xml()
+        self._log_append(turn, asr)
 
     @etime('seslog_barge_in')
     @catch_ioerror
     def _barge_in(self, speaker, tts_time=False, asr_time=False):
         """Add the optional barge-in element to the last speaker turn."""
-        els = self._doc.getElementsByTagName("turn")
-
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("speaker") == speaker:
-                da = els[i].appendChild(self._doc.createElement("barge-in"))
-                da.setAttribute("time", self._get_time_str())
-                if tts_time:
-                    da.setAttribute("tts_time", self._get_time_str())
-                if asr_time:
-                    da.setAttribute("asr_time", self._get_time_str())
-                break
-        else:
-            raise SessionLoggerException(("Missing turn element for %s speaker") % speaker)
+        turn = self._last_turn_element(speaker)
 
-        self._write_session_xml()
+        da = turn.appendChild(self._doc.createElement("barge-in"))
+        da.setAttribute("time", self._get_time_str())
+        if tts_time:
+            da.setAttribute("tts_time", self._get_time_str())
+        if asr_time:
+            da.setAttribute("asr_time", self._get_time_str())
+
+        self._log_append(turn, da)
 
     @etime('seslog_hangup')
     @catch_ioerror
     def _hangup(self, speaker):
         """ Adds the user hangup element to the last user turn.
         """
-        els = self._doc.getElementsByTagName("turn")
+        turn = self._last_turn_element(speaker)
 
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("speaker") == speaker:
-                els[i].appendChild(self._doc.createElement("hangup"))
-                break
-        else:
-            self._write_session_xml()
-            raise SessionLoggerException(("Missing turn element for %s speaker") % speaker)
+        da = turn.appendChild(self._doc.createElement("hangup"))
 
-        self._write_session_xml()
+        self._log_append(turn, da)
 
     ########################################################################
     ## The following functions define functionality above what was set in ##
@@ -530,15 +592,11 @@ class SessionLogger(multiprocessing.Process):
         """ Finds the XML element in the given open XML session
         which corresponds to the last turn for the given speaker.
 
-        Closes the XML and throws an exception if the element cannot be found.
+        Throws an exception if the element cannot be found.
         """
-        els = self._doc.getElementsByTagName("turn")
-
-        for i in range(els.length - 1, -1, -1):
-            if els[i].getAttribute("speaker") == speaker:
-                return els[i]
-        else:
-            self._write_session_xml()
+        try:
+            return self._last_turn[speaker]
+        except KeyError:
             raise SessionLoggerException(("Missing turn element for %s speaker") % speaker)
 
     @etime('seslog_dialogue_state')
@@ -565,7 +623,7 @@ class SessionLogger(multiprocessing.Process):
                 sl.setAttribute("name", "%s" % slot_name)
                 sl.appendChild(self._doc.createTextNode(unicode(slot_value)))
 
-        self._write_session_xml()
+            self._log_append(turn, ds)
 
     @etime('seslog_external_data_file')
     @catch_ioerror
@@ -582,88 +640,143 @@ class SessionLogger(multiprocessing.Process):
         el = turn.appendChild(self._doc.createElement("external"))
         el.setAttribute("type", ftype)
         el.setAttribute("fname", os.path.basename(fname))
-        self._write_session_xml()
+        self._log_append(turn, el)
         # write the file data
         if data is not None:
             with open(fname, 'w') as fh:
                 fh.write(data)
 
+    def get_queue_stats(self):
+        """Returns the counters of the logger process: the number of calls waiting in the queue, the lag of the last
+        processed call behind the time it was logged, the maximum lag, the number of processed calls, and
+        the number of rec_write calls merged into a preceding write.
+
+        It can be called from any process.
+        """
+        return {
+            'queue_depth': self._queue_depth.value,
+            'lag': self._lag.value,
+            'max_lag': self._max_lag.value,
+            'processed': self._processed.value,
+            'coalesced': self._coalesced.value,
+        }
+
+    def _drain_queue(self):
+        """Moves all calls from the inter-process queue into the local queue."""
+        while not self.queue.empty():
+            self._queue.append(self.queue.get())
+
+        self._queue_depth.value = len(self._queue)
+
+    def _process_queue(self):
+        """Processes all calls in the local queue.
+
+        The consecutive rec_write calls for the same file are merged into one write.
+        """
+        while self._queue:
+            cmd, args, kw, cmd_time = self._queue.popleft()
+
+            if cmd == 'rec_write' and not kw and len(args) == 2:
+                fname, data_rec = args
+                data = None
+                while self._queue and self._queue[0][0] == 'rec_write' and not self._queue[0][2] and \
+                        len(self._queue[0][1]) == 2 and self._queue[0][1][0] == fname:
+                    if data is None:
+                        data = bytearray(getattr(data_rec, 'payload', data_rec))
+                    next_data_rec = self._queue.popleft()[1][1]
+                    data.extend(getattr(next_data_rec, 'payload', next_data_rec))
+                    self._coalesced.value += 1
+                if data is not None:
+                    args = (fname, data)
+
+            self._dispatch(cmd, args, kw, cmd_time)
+
+            lag = time.time() - cmd_time
+            self._lag.value = lag
+            self._max_lag.value = max(self._max_lag.value, lag)
+            self._processed.value += 1
+            self._queue_depth.value = len(self._queue)
+
+    def _dispatch(self, cmd, args, kw, cmd_time):
+        """Calls the logging method for one queued call."""
+        attr = '_'+cmd
+        try:
+            if cmd == 'session_start':
+                self._last_session_start_time = time.time()
+            elif cmd == 'session_end':
+                self._last_session_start_time = time.time()
+
+            if not self._is_open and cmd != 'session_start':
+                session_start_found = False
+                while time.time() - cmd_time < 3.0 and not session_start_found:
+                    # these are probably commands for the new un-opened session
+                    for i, (_cmd, _args, _kw, _cmd_time) in enumerate(self._queue):
+                        if _cmd == 'session_start':
+                            print "SessionLogger: finally found session start"
+                            self._session_start(*_args,**_kw)
+                            del self._queue[i]
+                            session_start_found = True
+                            break
+                    else:
+                        time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                        self._drain_queue()
+
+                if not session_start_found and (self._last_session_end_time - cmd_time < 2.0):
+                    # just silently ignore because these are likely the be commands for the already
+                    # closed session
+
+                    # print "SessionLogger: should be silent"
+                    # print "SessionLogger: calling method", cmd, "when the session is not open"
+                    # print '             ', [a for a in args if isinstance(a, basestring) and len(a) < 80]
+                    return
+
+                if not session_start_found:
+                    print "SessionLogger: no session start found"
+                    print "SessionLogger: calling method", cmd, "when the session is not open"
+                    print '             ', [a for a in args if isinstance(a, basestring) and len(a) < 80]
+                    return
+
+            cf = SessionLogger.__dict__[attr]
+            cf(self, *args, **kw)
+        except AttributeError:
+            print "SessionLogger: unknown method", cmd
+            self.close_event.set()
+            raise
+        except SessionLoggerException as e:
+            if cmd == 'rec_write':
+                print "Exception when logging:", cmd
+                print e
+            else:
+                print "Exception when logging:", cmd, args, kw
+                print e
+        except SessionClosedException as e:
+            print "Exception when logging:", cmd, args, kw
+            print e
+
     def run(self):
         try:
             set_proc_name("Alex_SessionLogger")
-            last_session_start_time = 0
-            last_session_end_time = 0
 
             while 1:
                 # Check the close event.
                 if self.close_event.is_set():
                     print 'Received close event in: %s' % multiprocessing.current_process().name
+                    if self._is_open:
+                        self._write_session_xml()
                     return
 
-                time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                # wait for the logged calls, the reader end of the queue is a pipe connection which can be waited for
+                wait_time = get_main_loop_wait_time(self.cfg)
+                if wait_time is None:
+                    time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
+                else:
+                    wait_for_connections([self.queue._reader], wait_time)
 
                 s = (time.time(), time.clock())
 
-                while not self.queue.empty():
-                    self._queue.append(self.queue.get())
-
-                if len(self._queue):
-                    cmd, args, kw, cmd_time = self._queue.popleft()
-
-                    attr = '_'+cmd
-                    try:
-                        if cmd == 'session_start':
-                            last_session_start_time = time.time()
-                        elif cmd == 'session_end':
-                            last_session_start_time = time.time()
-
-
-                        if not self._is_open and cmd != 'session_start':
-                            session_start_found = False
-                            while time.time() - cmd_time < 3.0 and not session_start_found:
-                                # these are probably commands for the new un-opened session
-                                for i, (_cmd, _args, _kw, _cmd_time) in enumerate(self._queue):
-                                    if _cmd == 'session_start':
-                                        print "SessionLogger: finally found session start"
-                                        self._session_start(*_args,**_kw)
-                                        del self._queue[i]
-                                        session_start_found = True
-                                        break
-                                else:
-                                    time.sleep(self.cfg['Hub']['main_loop_sleep_time'])
-
-                            if not session_start_found and (last_session_end_time - cmd_time < 2.0):
-                                # just silently ignore because these are likely the be commands for the already
-                                # closed session
-
-                                # print "SessionLogger: should be silent"
-                                # print "SessionLogger: calling method", cmd, "when the session is not open"
-                                # print '             ', [a for a in args if isinstance(a, basestring) and len(a) < 80]
-                                continue
-
-
-                            if not session_start_found:
-                                print "SessionLogger: no session start found"
-                                print "SessionLogger: calling method", cmd, "when the session is not open"
-                                print '             ', [a for a in args if isinstance(a, basestring) and len(a) < 80]
-                                continue
-
-                        cf = SessionLogger.__dict__[attr]
-                        cf(self, *args, **kw)
-                    except AttributeError:
-                        print "SessionLogger: unknown method", cmd
-                        self.close_event.set()
-                        raise
-                    except SessionLoggerException as e:
-                        if cmd == 'rec_write':
-                            print "Exception when logging:", cmd
-                            print e
-                        else:
-                            print "Exception when logging:", cmd, args, kw
-                            print e
-                    except SessionClosedException:
-                        print "Exception when logging:", cmd, args, kw
-                        print e
+                # process all calls received so far, not only one call per wakeup
+                self._drain_queue()
+                self._process_queue()
 
                 d = (time.time() - s[0], time.clock() - s[1])
                 if d[0] > 0.200:
@@ -680,3 +793,19 @@ class SessionLogger(multiprocessing.Process):
 
         print 'Exiting: %s. Setting close event' % multiprocessing.current_process().name
         self.close_event.set()
+
+
+def recover_session_xml(output_dir):
+    """Writes the session.xml file from the session journal, e.g. when the session logger was killed before
+    the session ended.
+
+    :param output_dir: the directory of the session log
+    """
+    sl = SessionLogger()
+    sl._session_dir_name = output_dir
+    with open(os.path.join(output_dir, 'session.xml'), "w") as f:
+        f.write(SESSION_XML_TEMPLATE)
+        f.write('\n')
+    sl._read_session_xml()
+    sl._replay_journal()
+    sl._write_session_xml()
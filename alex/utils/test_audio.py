@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    import autopath
+
+import io
+import unittest
+import wave
+
+import numpy as np
+
+from alex.utils import audio, dsp
+
+CFG = {'Audio': {'sample_rate': 16000}}
+
+
+def sine(frequency, sample_rate, duration):
+    return 10000.0 * np.sin(2 * np.pi * frequency * np.arange(int(duration * sample_rate)) / float(sample_rate))
+
+
+def dominant_frequency(samples, sample_rate):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.argmax(spectrum) * sample_rate / float(len(samples))
+
+
+def create_wav_file(samples, sample_rate):
+    f = io.BytesIO()
+    wf = wave.open(f, 'wb')
+    wf.setnchannels(1)
+    wf.setsampwidth(2)
+    wf.setframerate(sample_rate)
+    wf.writeframes(dsp.to_pcm16(samples).tostring())
+    wf.close()
+    return f.getvalue()
+
+
+class TestAudio(unittest.TestCase):
+    def test_resample(self):
+        for sample_rate in [8000, 44100]:
+            samples = dsp.resample(sine(440.0, sample_rate, 1.0), sample_rate, 16000)
+            self.assertEqual(len(samples), 16000)
+            # the signal is the same sine wave sampled at the new rate apart from the edges
+            self.assertLess(np.max(np.abs(samples - sine(440.0, 16000, 1.0))[100:-100]), 100.0)
+
+    def test_wsola(self):
+        samples = sine(300.0, 16000, 2.0) + 0.5 * sine(1200.0, 16000, 2.0)
+        for tempo in [0.8, 1.3]:
+            output = dsp.wsola(samples, tempo, 16000)
+            self.assertEqual(len(output), int(round(len(samples) / tempo)))
+            # the pitch is kept
+            self.assertAlmostEqual(dominant_frequency(output, 16000), 300.0, delta=2.0)
+            self.assertLess(np.max(np.abs(output)), 1.1 * np.max(np.abs(samples)))
+
+    def test_change_tempo(self):
+        wav = dsp.to_pcm16(sine(440.0, 16000, 1.0)).tostring()
+        self.assertIs(audio.change_tempo(CFG, 1.0, wav), wav)
+        self.assertEqual(len(audio.change_tempo(CFG, 2.0, wav)), len(wav) // 2)
+
+    def test_load_and_convert_wav(self):
+        samples = sine(440.0, 8000, 0.5)
+        wav_file = create_wav_file(samples, 8000)
+
+        wav = audio.convert_wav(CFG, wav_file)
+        self.assertEqual(wav, audio.load_wav(CFG, io.BytesIO(wav_file)))
+        self.assertEqual(wav, dsp.to_pcm16(dsp.resample(dsp.to_pcm16(samples), 8000, 16000)).tostring())
+
+        self.assertEqual(audio.load_wav({'Audio': {'sample_rate': 8000}}, io.BytesIO(wav_file)),
+                         dsp.to_pcm16(samples).tostring())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    import autopath
+
+import cPickle as pickle
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+import alex.utils.cache as cache
+from alex.utils.cache import PersistentCacheStore
+
+
+def read_and_write(directory, n):
+    store = PersistentCacheStore(directory, 10 ** 6, 1000, n_shards=4)
+    for i in range(n):
+        key = '%056x' % (i % 50)
+        try:
+            assert store.get(key) == i % 50
+        except KeyError:
+            store.set(key, i % 50)
+
+
+class TestPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        cache.configure_persistent_cache('~/.alex_persistent_cache')
+
+    def test_decorator(self):
+        cache.configure_persistent_cache(self.directory)
+
+        class A(object):
+            calls = 0
+
+            @cache.persistent_cache(True, 'A.f.')
+            def f(self, x, y=0):
+                A.calls += 1
+                return 3 * x + y
+
+        a = A()
+        self.assertEqual([a.f(i % 5, y=1) for i in range(20)], [3 * (i % 5) + 1 for i in range(20)])
+        self.assertEqual(A.calls, 5)
+        self.assertEqual((a.f.hits, a.f.misses), (15, 5))
+
+        stats = a.f.get_stats()
+        self.assertEqual(stats['entries'], 5)
+        self.assertEqual(stats['hits'], 15)
+        self.assertTrue(stats['bytes_read'] > 0)
+
+    def test_lru_eviction(self):
+        store = PersistentCacheStore(self.directory, 10 ** 6, 10, n_shards=1, atime_resolution=0.0)
+        for i in range(10):
+            store.set('%056x' % i, i)
+        # the first entry is used recently
+        self.assertEqual(store.get('%056x' % 0), 0)
+        store.set('%056x' % 10, 10)
+
+        stats = store.get_stats()
+        self.assertEqual(stats['entries'], 9)
+        self.assertEqual(stats['evictions'], 2)
+        self.assertEqual(store.get('%056x' % 0), 0)
+        self.assertRaises(KeyError, store.get, '%056x' % 1)
+        self.assertRaises(KeyError, store.get, '%056x' % 2)
+        self.assertEqual(store.get('%056x' % 3), 3)
+
+    def test_byte_budget(self):
+        store = PersistentCacheStore(self.directory, 10000, 1000, n_shards=2)
+        value = 'x' * 1000
+        for i in range(100):
+            store.set('%056x' % i, value)
+        # a value larger than the shard is not stored at all
+        store.set('%056x' % 100, 'x' * 6000)
+
+        stats = store.get_stats()
+        self.assertTrue(stats['bytes'] <= 10000)
+        self.assertEqual(stats['bytes_written'], 100 * len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+        self.assertRaises(KeyError, store.get, '%056x' % 100)
+
+    def test_legacy_files(self):
+        key = '%056x' % 7
+        with open(os.path.join(self.directory, key), 'wb') as f:
+            pickle.dump([1, 2, 3], f)
+
+        store = PersistentCacheStore(self.directory, 10 ** 6, 1000)
+        self.assertEqual(store.get(key), [1, 2, 3])
+        self.assertFalse(os.path.exists(os.path.join(self.directory, key)))
+        self.assertEqual(store.get(key), [1, 2, 3])
+
+    def test_processes(self):
+        processes = [multiprocessing.Process(target=read_and_write, args=(self.directory, 500)) for i in range(4)]
+        for p in processes:
+            p.start()
+        for p in processes:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+
+        store = PersistentCacheStore(self.directory, 10 ** 6, 1000, n_shards=4)
+        self.assertEqual(store.get_stats()['entries'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+if __name__ == "__main__":
+    import autopath
+
+import unittest
+
+import numpy as np
+
+from alex.utils.mfcc import MFCCFrontEnd, FrameBuffer
+
+
+class TestMFCC(unittest.TestCase):
+    def setUp(self):
+        rnd = np.random.RandomState(0)
+        self.samples = (rnd.randn(8000) * 1000.0).astype(np.int16)
+
+    def test_frame_buffer(self):
+        # the frames must be the same as cut by the original loop over a list of samples
+        expected = []
+        samples = []
+        frame_buffer = FrameBuffer(512, 160, capacity=600)
+        frames = []
+        for i in range(0, len(self.samples), 300):
+            samples.extend(self.samples[i:i + 300])
+            while len(samples) > 512:
+                expected.append(samples[:512])
+                samples = samples[160:]
+
+            frame_buffer.append(self.samples[i:i + 300].tostring())
+            frames.extend(frame_buffer.pop_frames())
+
+            self.assertEqual(len(frame_buffer), len(samples))
+
+        self.assertEqual(np.array(frames).tolist(), np.array(expected, dtype=np.float64).tolist())
+
+    def test_param_batch(self):
+        frames = [self.samples[i:i + 512] for i in range(0, len(self.samples) - 512, 160)]
+
+        for kwargs in [{}, {'usec0': True, 'n_last_frames': 2},
+                       {'mel_banks_only': True, 'usedelta': False, 'useacc': False, 'n_last_frames': 5}]:
+            front_end = MFCCFrontEnd(**kwargs)
+            expected = np.array([front_end.param(frame) for frame in frames])
+
+            front_end = MFCCFrontEnd(**kwargs)
+            mfcc = np.vstack([front_end.param_batch(frames[i:i + 3]) for i in range(0, len(frames), 3)])
+
+            self.assertEqual(mfcc.dtype, np.float32)
+            self.assertTrue(np.array_equal(mfcc, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,15 +2,21 @@
 # -*- coding: utf-8 -*-
 
 import unittest
+import multiprocessing
 import os
+import shutil
+import tempfile
+import time
+import wave
 
 if __name__ == "__main__":
     import autopath
 
 from alex.components.asr.utterance import UtteranceConfusionNetwork
+from alex.components.hub.messages import Frame
 from alex.components.slu.da import DialogueActItem, DialogueActConfusionNetwork
 from alex.utils.config import Config
-from alex.utils.sessionlogger import SessionLogger
+from alex.utils.sessionlogger import SessionLogger, recover_session_xml
 from alex.utils.mproc import SystemLogger
 
 
@@ -97,5 +103,91 @@ class TestSessionLogger(unittest.TestCase):
             sl.rec_end("user2.wav")
             sl.hangup("user")
 
+    def test_session_journal(self):
+        # run the logging methods directly, as they are called in the logger process
+        sess_dir = tempfile.mkdtemp()
+        try:
+            sl = SessionLogger()
+            sl.set_cfg({'Audio': {'sample_rate': 16000}})
+            sl._session_start(sess_dir)
+            sl._header("Default alex", "1.0")
+
+            for i in range(3):
+                sl._turn("system")
+                sl._text("system", "Hello & <welcome>.")
+                sl._turn("user")
+                sl._rec_start("user", "user%d.wav" % i)
+                sl._rec_end("user%d.wav" % i)
+            sl._slu("user", "user1.wav", [(1.0, "hello()")], None)
+            sl._hangup("user")
+            sl._write_session_xml()
+
+            with open(os.path.join(sess_dir, 'session.xml')) as f:
+                session_xml = f.read()
+
+            turns = sl._doc.getElementsByTagName("turn")
+            self.assertEqual([t.getAttribute("turn_number") for t in turns], ['1', '1', '2', '2', '3', '3'])
+            self.assertEqual(len(turns[3].getElementsByTagName("slu")), 1)
+            self.assertEqual(len(turns[5].getElementsByTagName("hangup")), 1)
+
+            # the session xml written from the journal must be the same
+            recover_session_xml(sess_dir)
+            with open(os.path.join(sess_dir, 'session.xml')) as f:
+                self.assertEqual(f.read(), session_xml)
+        finally:
+            shutil.rmtree(sess_dir)
+
+    def test_stress(self):
+        # replay the calls of a 10 minute dialogue with 60 user turns, each with 10 seconds of recorded audio,
+        # as fast as possible
+        n_turns, n_frames = 60, 625
+        sess_dir = tempfile.mkdtemp()
+        try:
+            sl = SessionLogger()
+            sl.set_cfg({'Audio': {'sample_rate': 16000}, 'Hub': {'main_loop_sleep_time': 0.005}})
+            sl.set_close_event(multiprocessing.Event())
+            sl.start()
+
+            n_calls = 0
+            start = time.time()
+            sl.session_start(sess_dir)
+            sl.header("Default alex", "1.0")
+            n_calls += 2
+            frame = Frame(b'\0\0' * 256)
+            for i in range(n_turns):
+                sl.turn("system")
+                sl.text("system", "Hello.")
+                sl.turn("user")
+                sl.rec_start("user", "user%d.wav" % i)
+                for j in range(n_frames):
+                    sl.rec_write("user%d.wav" % i, frame)
+                sl.rec_end("user%d.wav" % i)
+                sl.slu("user", "user%d.wav" % i, [(1.0, "hello()")], None)
+                n_calls += 6 + n_frames
+
+            while time.time() - start < 60.0:
+                stats = sl.get_queue_stats()
+                if stats['processed'] + stats['coalesced'] >= n_calls:
+                    break
+                time.sleep(0.05)
+
+            sl.close_event.set()
+            sl.join(10.0)
+
+            self.assertEqual(stats['processed'] + stats['coalesced'], n_calls)
+            self.assertEqual(stats['queue_depth'], 0)
+            self.assertGreater(stats['coalesced'], 0)
+            # the logger keeps up with the dialogue, it never falls seconds behind
+            self.assertLess(stats['max_lag'], 5.0)
+
+            wf = wave.open(os.path.join(sess_dir, "user%d.wav" % (n_turns - 1)))
+            self.assertEqual(wf.getnframes(), n_frames * 256)
+            wf.close()
+
+            with open(os.path.join(sess_dir, 'session.xml')) as f:
+                self.assertEqual(f.read().count('<slu>'), n_turns)
+        finally:
+            shutil.rmtree(sess_dir)
+
 if __name__ == '__main__':
     unittest.main()